@@ -3,6 +3,7 @@
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
 import config
+import strategies
 
 # Binance Testnet URL
 TESTNET_URL = "https://testnet.binance.vision"
@@ -35,23 +36,21 @@ def get_balance(asset="USDT"):
         return {"status": "error", "message": str(e)}
 
 # ---------------------------
-# Levels Function (Dummy + Example)
+# Levels Function ("fixed_levels" strategy, strategies.py)
 # ---------------------------
+levels_engine = strategies.StrategyEngine(names=("fixed_levels",), client_factory=lambda: client)
+
 def get_levels(symbol):
     try:
-        klines = client.get_klines(symbol=symbol, interval=config.INTERVAL, limit=20)
-        closes = [float(x[4]) for x in klines]
-        last_close = closes[-1]
-
-        entry = round(last_close, 2)
-        stop_loss = round(entry * 0.99, 2)
-        target = round(entry * 1.02, 2)
+        res = levels_engine.run(symbol, config.INTERVAL)["fixed_levels"]
+        if "error" in res:
+            return {"status": "error", "message": res["error"]}
 
         return {
             "symbol": symbol,
-            "entry": entry,
-            "stop_loss": stop_loss,
-            "target": target
+            "entry": res["entry"],
+            "stop_loss": res["sl"],
+            "target": res["tp"]
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -0,0 +1,256 @@
+# backfill.py
+# Concurrent, resumable historical kline download into the local candle store (candle_store.py).
+#   - [start, end) is cut into PAGE_CANDLES-candle pages on a fixed grid (same pages on every run)
+#   - WORKERS pages are in flight at once, all drawing from one request-weight budget
+#     (WEIGHT_PER_MIN, kept under Binance's per-IP limit; the x-mbx-used-weight-1m header and
+#     429 / 418 answers slow everything down)
+#   - every page is checked (order, duplicates, candles outside the page, gaps) before it is written
+#   - a single writer stores each page together with its checkpoint row (candle_store.backfill_pages),
+#     so an interrupted run resumes with the pages it hasn't finished; gaps the exchange really has
+#     are recorded, not refetched forever
+# Usage:
+#   python backfill.py BTCUSDT,ETHUSDT 1m 2024-01-01 [2025-01-01] [--workers 8] [--mainnet]
+
+import asyncio
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import candle_store
+import config
+
+PAGE_CANDLES = 1000                 # get_klines max limit
+KLINES_WEIGHT = 2                   # request weight of one get_klines call (spot)
+WEIGHT_PER_MIN = getattr(config, "BACKFILL_WEIGHT_PER_MIN", 4800)   # exchange limit is 6000 / min / IP
+WORKERS = getattr(config, "BACKFILL_WORKERS", 8)
+MAX_ATTEMPTS = 5
+GAP_REFETCH = 1                     # refetch a page with gaps this many times before accepting them
+
+Page = namedtuple("Page", "symbol interval start end")
+Report = namedtuple("Report", "pages skipped candles gaps duplicates requests failed seconds")
+
+
+def to_ms(value):
+    """ ms int, "2024-01-01" or "2024-01-01T12:00" (UTC) -> ms """
+    if isinstance(value, (int, float)):
+        return int(value)
+    if str(value).isdigit():
+        return int(value)
+    dt = datetime.fromisoformat(str(value))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def plan(store, symbol, interval, start_ms, end_ms):
+    """
+    -> (pages of [start_ms, end_ms) not checkpointed yet, pages skipped because they are)
+    grid = multiples of PAGE_CANDLES candles since the epoch, so reruns with other bounds line up
+    """
+    iv = candle_store.interval_ms(interval)
+    step = iv * PAGE_CANDLES
+    start_ms = -(-start_ms // iv) * iv   # first candle open at or after start
+    done = store.pages_done(symbol, interval, start_ms, end_ms)
+    pages, skipped = [], 0
+    for grid in range(start_ms // step * step, end_ms, step):
+        a, b = max(grid, start_ms), min(grid + step, end_ms)
+        if a >= b:
+            continue
+        if any(ds <= a and de >= b for ds, de in done):
+            skipped += 1
+        else:
+            pages.append(Page(symbol, interval, a, b))
+    return pages, skipped
+
+
+def check_page(page, klines):
+    """ -> (klines sorted and deduplicated inside the page, missing candles, duplicates dropped) """
+    iv = candle_store.interval_ms(page.interval)
+    by_open = {}
+    inside = 0
+    for k in klines:
+        t = int(k[0])
+        if page.start <= t < page.end:
+            inside += 1
+            by_open[t] = k
+    rows = [by_open[t] for t in sorted(by_open)]
+    expected = (page.end - page.start + iv - 1) // iv
+    return rows, expected - len(rows), inside - len(rows)
+
+
+class WeightBudget:
+    """ token bucket over request weight, refilled continuously (WEIGHT_PER_MIN per 60 s) """
+
+    def __init__(self, per_min=WEIGHT_PER_MIN):
+        self.per_min = per_min
+        self.tokens = float(per_min) / 6    # small initial burst, not a full minute's worth
+        self.at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def take(self, weight):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.per_min, self.tokens + (now - self.at) * self.per_min / 60.0)
+                self.at = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((weight - self.tokens) * 60.0 / self.per_min)
+
+    def server_used(self, used_1m):
+        """ x-mbx-used-weight-1m: the IP's weight this minute, other programs included """
+        if used_1m is not None and used_1m >= self.per_min:
+            self.pause(60 - time.time() % 60)   # wait for the exchange's minute to roll over
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class Backfill:
+    def __init__(self, client, store=None, workers=WORKERS, budget=None, progress=None):
+        """
+        client: binance AsyncClient (or anything with an async get_klines)
+        progress(page, rows, gaps): called after each page is stored
+        """
+        self.client = client
+        self.store = store or candle_store.CandleStore()
+        self.workers = workers
+        self.budget = budget or WeightBudget()
+        self.progress = progress
+        self._writer = ThreadPoolExecutor(max_workers=1)   # one SQLite writer, never blocks the fetchers
+        self.counts = dict(pages=0, skipped=0, candles=0, gaps=0, duplicates=0, requests=0, failed=0)
+
+    async def run(self, symbols, interval, start_ms, end_ms):
+        t0 = time.monotonic()
+        end_ms = min(end_ms, int(time.time() * 1000))
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        for symbol in symbols:
+            pages, skipped = await loop.run_in_executor(self._writer, plan, self.store, symbol, interval,
+                                                        start_ms, end_ms)
+            self.counts["skipped"] += skipped
+            for p in pages:
+                queue.put_nowait(p)
+        tasks = [asyncio.create_task(self._worker(queue)) for _ in range(min(self.workers, queue.qsize()))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+        c = self.counts
+        return Report(c["pages"], c["skipped"], c["candles"], c["gaps"], c["duplicates"], c["requests"], c["failed"],
+                      round(time.monotonic() - t0, 1))
+
+    async def _worker(self, queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                page = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                rows, gaps, dupes = await self._fetch_page(page)
+            except Exception as e:
+                self.counts["failed"] += 1
+                print(f"Backfill {page.symbol} {page.interval} @ {page.start}: {e}")
+                continue
+            open_candle = page.end > int(time.time() * 1000) - candle_store.interval_ms(page.interval)
+            if open_candle:
+                # still-forming candle: store it, but leave the page unchecked so the next run redoes it
+                await loop.run_in_executor(self._writer, self.store.write, page.symbol, page.interval, rows)
+            else:
+                await loop.run_in_executor(self._writer, self.store.write_page, page.symbol, page.interval,
+                                           page.start, page.end, rows, gaps, dupes)
+            self.counts["pages"] += 1
+            self.counts["candles"] += len(rows)
+            self.counts["gaps"] += gaps
+            self.counts["duplicates"] += dupes
+            if self.progress:
+                self.progress(page, len(rows), gaps)
+
+    async def _fetch_page(self, page):
+        attempt, refetches = 0, 0
+        while True:
+            await self.budget.take(KLINES_WEIGHT)
+            self.counts["requests"] += 1
+            try:
+                klines = await self.client.get_klines(symbol=page.symbol, interval=page.interval,
+                                                      startTime=page.start, endTime=page.end - 1, limit=PAGE_CANDLES)
+            except Exception as e:
+                attempt += 1
+                status = getattr(e, "status_code", None)
+                if status in (429, 418):   # over the limit (418 = IP banned for a while): everyone waits
+                    self.budget.pause(_retry_after(e) or 60)
+                elif status is not None and status < 500:
+                    raise   # bad symbol / interval: retrying won't help
+                if attempt >= MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(min(30, 2 ** attempt))
+                continue
+            self.budget.server_used(_used_weight(self.client))
+            rows, gaps, dupes = check_page(page, klines)
+            # a page that ends before the symbol was listed is legitimately empty; a hole in the
+            # middle may be a short answer, so ask again before believing it
+            if gaps and rows and refetches < GAP_REFETCH and len(klines) < PAGE_CANDLES:
+                refetches += 1
+                continue
+            return rows, gaps, dupes
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+
+
+def _used_weight(client):
+    resp = getattr(client, "response", None)
+    try:
+        return int(resp.headers.get("x-mbx-used-weight-1m"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _retry_after(e):
+    try:
+        return float(e.response.headers.get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+async def _main(symbols, interval, start_ms, end_ms, workers, testnet):
+    from binance import AsyncClient
+    client = await AsyncClient.create(config.API_KEY, config.API_SECRET, testnet=testnet)
+    job = Backfill(client, workers=workers,
+                   progress=lambda p, n, g: print(f"{p.symbol} {p.interval} "
+                                                  f"{datetime.fromtimestamp(p.start / 1000, timezone.utc):%Y-%m-%d %H:%M} "
+                                                  f"{n} candles" + (f", {g} missing" if g else "")))
+    try:
+        return await job.run(symbols, interval, start_ms, end_ms)
+    finally:
+        job.close()
+        await client.close_connection()
+
+
+if __name__ == "__main__":
+    args, workers, argv = [], WORKERS, iter(sys.argv[1:])
+    for a in argv:
+        if a == "--workers":
+            workers = int(next(argv))
+        elif not a.startswith("--"):
+            args.append(a)
+    if len(args) < 3:
+        print("usage: python backfill.py SYMBOL[,SYMBOL...] INTERVAL START [END] [--workers N] [--mainnet]")
+        sys.exit(2)
+    symbols = [s.strip().upper() for s in args[0].split(",") if s.strip()]
+    end = to_ms(args[3]) if len(args) > 3 else int(time.time() * 1000)
+    report = asyncio.run(_main(symbols, args[1], to_ms(args[2]), end, workers, testnet="--mainnet" not in sys.argv))
+    print(f"Backfill: {report.pages} pages ({report.skipped} already done), {report.candles} candles, "
+          f"{report.gaps} missing, {report.duplicates} duplicates dropped, {report.requests} requests, "
+          f"{report.failed} failed, {report.seconds}s")
+    sys.exit(1 if report.failed else 0)
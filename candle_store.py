@@ -0,0 +1,150 @@
+# candle_store.py
+# Local candle storage (SQLite, one row per (symbol, interval, open_time)) + CSV import.
+# Rows are kept in Binance kline order so anything that consumes client.get_klines() output
+# can consume the store too:
+#   [open_time, open, high, low, close, volume, close_time, quote_volume, trades, taker_base, taker_quote, ignore]
+
+import csv
+import os
+import sqlite3
+import threading
+
+import config
+
+# candle interval -> seconds
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800, "12h": 43200,
+    "1d": 86400, "3d": 259200, "1w": 604800,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    open_time INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    close_time INTEGER,
+    quote_volume REAL,
+    trades INTEGER,
+    PRIMARY KEY (symbol, interval, open_time)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS backfill_pages (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    page_start INTEGER NOT NULL,
+    page_end INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    gaps INTEGER NOT NULL,
+    duplicates INTEGER NOT NULL,
+    PRIMARY KEY (symbol, interval, page_start)
+) WITHOUT ROWID;
+"""
+
+
+def interval_ms(interval):
+    return INTERVAL_SECONDS[interval] * 1000
+
+
+def _row(k):
+    """ kline list (strings or numbers, 7..12 columns) -> typed tuple for the candles table """
+    return (int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]),
+            int(k[6]), float(k[7]) if len(k) > 7 else 0.0, int(k[8]) if len(k) > 8 else 0)
+
+
+class CandleStore:
+    def __init__(self, path=None):
+        self.path = path or getattr(config, "CANDLE_DB", "data/candles.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._local = threading.local()   # one connection per thread
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def write(self, symbol, interval, klines):
+        """ upsert klines (re-writing the still-open last candle is expected) """
+        rows = [(symbol, interval) + _row(k) for k in klines]
+        if not rows:
+            return 0
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO candles(symbol, interval, open_time, open, high, low, close, volume, "
+                "close_time, quote_volume, trades) VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+        return len(rows)
+
+    def write_page(self, symbol, interval, page_start, page_end, klines, gaps=0, duplicates=0):
+        """ backfill.py: a checked page of klines + its checkpoint row, in one transaction """
+        rows = [(symbol, interval) + _row(k) for k in klines]
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO candles(symbol, interval, open_time, open, high, low, close, volume, "
+                "close_time, quote_volume, trades) VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+            conn.execute("INSERT OR REPLACE INTO backfill_pages VALUES (?,?,?,?,?,?,?)",
+                         (symbol, interval, int(page_start), int(page_end), len(rows), gaps, duplicates))
+        return len(rows)
+
+    def pages_done(self, symbol, interval, start_ms, end_ms):
+        """ [(page_start, page_end)] already backfilled that overlap [start_ms, end_ms) """
+        return self._conn().execute(
+            "SELECT page_start, page_end FROM backfill_pages WHERE symbol = ? AND interval = ? AND page_start < ? "
+            "AND page_end > ?", (symbol, interval, int(end_ms), int(start_ms))).fetchall()
+
+    def load(self, symbol, interval, start_ms=None, end_ms=None, limit=None):
+        """ klines with start_ms <= open_time < end_ms, oldest first (limit keeps the newest) """
+        where, params = ["symbol = ?", "interval = ?"], [symbol, interval]
+        if start_ms is not None:
+            where.append("open_time >= ?")
+            params.append(int(start_ms))
+        if end_ms is not None:
+            where.append("open_time < ?")
+            params.append(int(end_ms))
+        sql = ("SELECT open_time, open, high, low, close, volume, close_time, quote_volume, trades FROM candles WHERE "
+               + " AND ".join(where))
+        if limit:
+            sql = f"SELECT * FROM ({sql} ORDER BY open_time DESC LIMIT ?) ORDER BY open_time"
+            params.append(int(limit))
+        else:
+            sql += " ORDER BY open_time"
+        return [list(r) + [0.0, 0.0, "0"] for r in self._conn().execute(sql, params)]
+
+    def span(self, symbol, interval):
+        """ (first_open_time, last_open_time, count) or None """
+        row = self._conn().execute(
+            "SELECT MIN(open_time), MAX(open_time), COUNT(*) FROM candles WHERE symbol = ? AND interval = ?",
+            (symbol, interval)).fetchone()
+        return row if row and row[2] else None
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def load_csv(path):
+    """
+    Kline CSV (Binance data-portal layout, header optional) -> klines, oldest first.
+    Millisecond or microsecond timestamps are both accepted.
+    """
+    klines = []
+    with open(path, newline="") as f:
+        for rec in csv.reader(f):
+            if not rec or not rec[0].strip().lstrip("-").isdigit():
+                continue   # header / blank line
+            k = _row(rec)
+            if k[0] > 10 ** 14:   # microseconds (newer spot dumps)
+                k = (k[0] // 1000,) + k[1:6] + (k[6] // 1000,) + k[7:]
+            klines.append(list(k) + [0.0, 0.0, "0"])
+    klines.sort(key=lambda k: k[0])
+    return klines
@@ -0,0 +1,158 @@
+# chart_lod.py
+# Level-of-detail candle series for the Tk chart.
+# Keeps OHLCV in numpy buffers plus a pyramid of pre-aggregated levels (each level merges FACTOR
+# bars of the level below: open=first, high=max, low=min, close=last, volume=sum). A view of any
+# size is reduced to <= one bucket per pixel by reading the coarsest level that still has >= 1
+# bar per bucket, so drawing cost depends on the screen width, not on the history length.
+
+import math
+
+import numpy as np
+
+FACTOR = 4
+FIELDS = ("t", "o", "h", "l", "c", "v")
+
+
+class _Level:
+    """ growable column buffers (amortized O(1) append, in-place tail rewrite) """
+
+    def __init__(self, capacity=1024):
+        self.n = 0
+        self.cols = {f: np.empty(capacity, dtype=np.int64 if f == "t" else np.float64) for f in FIELDS}
+
+    def reserve(self, n):
+        cap = len(self.cols["t"])
+        if n <= cap:
+            return
+        cap = max(n, cap * 2)
+        for f, a in self.cols.items():
+            grown = np.empty(cap, dtype=a.dtype)
+            grown[:self.n] = a[:self.n]
+            self.cols[f] = grown
+
+    def write(self, start, data):
+        """ overwrite from index `start` with `data` (dict of equal-length arrays), truncating the rest """
+        m = len(data["t"])
+        self.reserve(start + m)
+        for f in FIELDS:
+            self.cols[f][start:start + m] = data[f]
+        self.n = start + m
+
+    def __getitem__(self, f):
+        return self.cols[f][:self.n]
+
+
+def _aggregate(src, start, stop, group):
+    """ merge src[start:stop] in groups of `group` bars -> dict of arrays """
+    idx = np.arange(start, stop, group)
+    if len(idx) == 0:
+        return {f: src[f][:0] for f in FIELDS}
+    rel = idx - start
+    last = np.minimum(idx + group, stop) - 1
+    return {
+        "t": src["t"][last],                                   # close time of the bucket
+        "o": src["o"][idx],
+        "h": np.maximum.reduceat(src["h"][start:stop], rel),
+        "l": np.minimum.reduceat(src["l"][start:stop], rel),
+        "c": src["c"][last],
+        "v": np.add.reduceat(src["v"][start:stop], rel),
+    }
+
+
+class LODSeries:
+    def __init__(self):
+        self.levels = [_Level()]
+
+    def __len__(self):
+        return self.levels[0].n
+
+    @property
+    def base(self):
+        return self.levels[0]
+
+    # -------------------------
+    # Loading / updating
+    # -------------------------
+    def set_data(self, t, o, h, l, c, v):
+        self.levels = [_Level(max(1024, len(t)))]
+        self.levels[0].write(0, {"t": t, "o": o, "h": h, "l": l, "c": c, "v": v})
+        self._rebuild_from(0)
+
+    def merge(self, t, o, h, l, c, v):
+        """
+        Merge bars sorted by time: bars newer than the first incoming time are replaced
+        (the still-forming candle), older history is kept. Only the touched tail of every
+        level is recomputed -> a live tick costs O(levels * FACTOR).
+        """
+        t = np.asarray(t, dtype=np.int64)
+        if len(t) == 0:
+            return
+        base = self.base
+        if base.n and t[0] < base["t"][0]:
+            # incoming data reaches further back than what we have: rebuild everything
+            keep = base["t"] > t[-1]
+            self.set_data(*(np.concatenate([np.asarray(x), base[f][keep]]) for x, f in zip((t, o, h, l, c, v), FIELDS)))
+            return
+        start = int(np.searchsorted(base["t"], t[0], side="left"))
+        base.write(start, {"t": t, "o": np.asarray(o, float), "h": np.asarray(h, float),
+                           "l": np.asarray(l, float), "c": np.asarray(c, float), "v": np.asarray(v, float)})
+        self._rebuild_from(start)
+
+    def prepend(self, t, o, h, l, c, v):
+        """ older history (on-demand load while panning left) """
+        base = self.base
+        t = np.asarray(t, dtype=np.int64)
+        if base.n:
+            keep = t < base["t"][0]
+            cols = [np.asarray(x)[keep] for x in (t, o, h, l, c, v)]
+            cols = [np.concatenate([x, base[f]]) for x, f in zip(cols, FIELDS)]
+        else:
+            cols = [t, o, h, l, c, v]
+        added = len(cols[0]) - base.n
+        self.set_data(*cols)
+        return added
+
+    def _rebuild_from(self, start):
+        k = 1
+        while True:
+            below = self.levels[k - 1]
+            if below.n <= FACTOR:
+                del self.levels[k:]
+                return
+            if k == len(self.levels):
+                self.levels.append(_Level(below.n // FACTOR + 16))
+            j0 = (start // FACTOR ** (k - 1)) // FACTOR   # first level-k bar touched
+            self.levels[k].write(j0, _aggregate(below, j0 * FACTOR, below.n, FACTOR))
+            start = j0 * FACTOR ** k
+            k += 1
+
+    # -------------------------
+    # Query
+    # -------------------------
+    def buckets(self, i0, i1, max_buckets):
+        """
+        View over base bars [i0, i1) reduced to <= max_buckets buckets.
+        Returns dict with x (bucket centre, in base-bar units), width (base bars per bucket),
+        t (close time ms), o/h/l/c/v arrays.
+        """
+        n = len(self)
+        i0, i1 = max(0, int(i0)), min(n, int(math.ceil(i1)))
+        if i1 <= i0:
+            return {"x": np.empty(0), "width": 1, **{f: self.base[f][:0] for f in FIELDS}}
+        per = (i1 - i0) / max(1, max_buckets)
+        k = 0
+        while k + 1 < len(self.levels) and FACTOR ** (k + 1) <= per:
+            k += 1
+        scale = FACTOR ** k
+        lvl = self.levels[k]
+        j0, j1 = i0 // scale, min(lvl.n, -(-i1 // scale))
+        group = max(1, int(math.ceil((j1 - j0) / max(1, max_buckets))))
+        out = _aggregate(lvl, j0, j1, group)
+        starts = np.arange(j0, j1, group)
+        width = group * scale
+        out["x"] = starts * scale + (width - 1) / 2.0
+        out["width"] = width
+        return out
+
+    def index_of_time(self, t_ms):
+        return int(np.searchsorted(self.base["t"], t_ms, side="left"))
@@ -12,3 +12,21 @@ SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "XRPUSDT"]
 
 # Candle interval (1m, 5m, 15m, 1h...)
 INTERVAL = "5m"
+
+# Event bus consumers (events.py)
+EVENT_LOG_FILE = "logs/events.jsonl"   # rotating JSON-lines log of signals / orders / fills / errors
+WEBHOOK_URL = None                     # e.g. "http://127.0.0.1:8765/" (python events.py runs a stand-in)
+DESKTOP_NOTIFY = True
+
+# Trade journal (journal.py)
+JOURNAL_DB = "data/journal.sqlite3"
+
+# Local candle store (candle_store.py) used by replay / chart history / backfill
+CANDLE_DB = "data/candles.sqlite3"
+
+# exchangeInfo filter cache (exchange_meta.py)
+EXCHANGE_INFO_FILE = "data/exchange_info.json"
+EXCHANGE_INFO_TTL_SEC = 6 * 3600
+
+# Local market-data hub (hub.py): one exchange connection shared by every app on this machine
+HUB_SOCKET = "/tmp/cryptobot-hub.sock"
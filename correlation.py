@@ -0,0 +1,257 @@
+# correlation.py
+# Rolling return correlation / covariance across every watched symbol, kept up to date candle by candle.
+#   - one log return per symbol per closed candle, aligned on the candle open time; the last `window`
+#     rows live in a ring (rows x symbols)
+#   - running sums S (per symbol) and cross products P = sum(r r^T) (symbols x symbols): a new row is
+#     added and the row falling out of the window subtracted, O(N^2) per candle and no pass over the
+#     window (well under 1 ms for 200 symbols); every `window` rows P and S are rebuilt exactly so rounding
+#     never piles up
+#   - a candle row is complete once every symbol has reported it; a symbol that is MAX_LAG_BARS behind
+#     the newest candle (no trades, late data, delisted) counts as a zero return for that row
+#   - symbols can be added at any time (arrays grow); pairs with fewer than MIN_OBS returns in the
+#     window have correlation 0 (unknown, never a reason to down-weight)
+# weigh() turns a list of signals into groups of "the same bet" and per-signal weights, so four BUYs
+# on BTC / ETH / BNB / XRP count as roughly one position instead of four.
+# Feeding:
+#   update({symbol: klines}, now_ms)  -> closed candles of a whole scan pass (merged in time order)
+#   on_close(symbol, open_time, close) -> one closed candle from a stream
+
+import math
+import threading
+import time
+
+import numpy as np
+
+import candle_store
+import config
+
+WINDOW = getattr(config, "CORR_WINDOW", 240)            # candles (4h of 1m candles)
+MIN_OBS = getattr(config, "CORR_MIN_OBS", 30)            # real returns a symbol needs in the window
+GROUP_CORR = getattr(config, "CORR_GROUP", 0.7)          # same-bet threshold for weigh() groups
+MAX_LAG_BARS = 2                                         # a row waits this many candles for late symbols
+
+
+class RollingCorrelation:
+    def __init__(self, interval, window=WINDOW, min_obs=MIN_OBS, capacity=32):
+        self.interval = interval
+        self.iv = candle_store.interval_ms(interval)
+        self.window = window
+        self.min_obs = min_obs
+        self._lock = threading.RLock()
+        self.symbols = []                       # column order
+        self._index = {}                        # symbol -> column
+        self._cap = capacity
+        self._rows = np.zeros((window, capacity))             # ring of return rows
+        self._seen = np.zeros((window, capacity), np.int32)   # 1 where the return is real, 0 where filled in
+        self._sum = np.zeros(capacity)
+        self._prod = np.zeros((capacity, capacity))
+        self._obs = np.zeros(capacity, np.int64)
+        self._head = 0                          # next ring slot
+        self.n = 0                              # rows in the window
+        self._last_close = {}                   # symbol -> (open_time, close) of its newest candle
+        self._pending = {}                      # open_time -> {column: return}
+        self._committed = None                  # open time of the newest committed row
+        self._newest = None                     # newest open time any symbol reported
+        self.counts = {"rows": 0, "late": 0, "filled": 0, "resyncs": 0}
+
+    # -------------------------
+    # Symbols
+    # -------------------------
+    def add(self, symbol):
+        """ -> column of symbol (created with an empty history if new) """
+        with self._lock:
+            return self._add(symbol)
+
+    def _add(self, symbol):
+        i = self._index.get(symbol)
+        if i is not None:
+            return i
+        i = len(self.symbols)
+        if i == self._cap:
+            self._grow(self._cap * 2)
+        self.symbols.append(symbol)
+        self._index[symbol] = i
+        return i
+
+    def _grow(self, cap):
+        old = self._cap
+        rows = np.zeros((self.window, cap))
+        rows[:, :old] = self._rows
+        seen = np.zeros((self.window, cap), np.int32)
+        seen[:, :old] = self._seen
+        prod = np.zeros((cap, cap))
+        prod[:old, :old] = self._prod
+        self._rows, self._seen, self._prod = rows, seen, prod
+        self._sum = np.concatenate([self._sum, np.zeros(cap - old)])
+        self._obs = np.concatenate([self._obs, np.zeros(cap - old, np.int64)])
+        self._cap = cap
+
+    # -------------------------
+    # Candles in
+    # -------------------------
+    def update(self, klines_by_symbol, now_ms=None):
+        """ {symbol: get_klines() rows}: closed candles not seen yet, fed in time order across symbols """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        bars = []
+        with self._lock:
+            for symbol, klines in klines_by_symbol.items():
+                last = self._last_close.get(symbol)
+                after = last[0] if last else None
+                for k in klines:
+                    t = int(k[0])
+                    if (after is None or t > after) and int(k[6]) < now_ms:
+                        bars.append((t, symbol, float(k[4])))
+            bars.sort()
+            for t, symbol, close in bars:
+                self._on_close(symbol, t, close)
+        return len(bars)
+
+    def on_close(self, symbol, open_time, close):
+        with self._lock:
+            self._on_close(symbol, int(open_time), float(close))
+
+    def _on_close(self, symbol, t, close):
+        i = self._add(symbol)
+        last = self._last_close.get(symbol)
+        self._last_close[symbol] = (t, close)
+        if last is None or t <= last[0] or close <= 0 or last[1] <= 0:
+            return   # first candle of a symbol only sets the reference price
+        if self._committed is not None and t <= self._committed:
+            self.counts["late"] += 1   # its row is already in the window
+            return
+        self._pending.setdefault(t, {})[i] = math.log(close / last[1])
+        self._newest = t if self._newest is None else max(self._newest, t)
+        self._commit_ready()
+
+    def _commit_ready(self):
+        for t in sorted(self._pending):
+            row = self._pending[t]
+            if len(row) < len(self.symbols) and t > self._newest - MAX_LAG_BARS * self.iv:
+                return   # still waiting for the rest of this candle
+            del self._pending[t]
+            self.counts["filled"] += len(self.symbols) - len(row)
+            self._commit(row)
+            self._committed = t
+
+    def _commit(self, row):
+        """ ring slot <- new row; sums / cross products updated by the difference only """
+        n = len(self.symbols)
+        r = np.zeros(n)
+        seen = np.zeros(n, np.int32)
+        cols = np.fromiter(row.keys(), np.int64, len(row))
+        r[cols] = np.fromiter(row.values(), np.float64, len(row))
+        seen[cols] = 1
+        h = self._head
+        if self.n == self.window:
+            old = self._rows[h, :n]
+            self._sum[:n] -= old
+            self._prod[:n, :n] -= np.outer(old, old)
+            self._obs[:n] -= self._seen[h, :n]
+        self._rows[h, :n] = r
+        self._seen[h, :n] = seen
+        self._sum[:n] += r
+        self._prod[:n, :n] += np.outer(r, r)
+        self._obs[:n] += seen
+        self._head = (h + 1) % self.window
+        self.n = min(self.n + 1, self.window)
+        self.counts["rows"] += 1
+        if self.counts["rows"] % self.window == 0:
+            self._resync()
+
+    def _resync(self):
+        """ exact sums from the ring (cost of one full pass, once per `window` rows) """
+        n = len(self.symbols)
+        rows = self._rows[:self.n, :n] if self.n < self.window else self._rows[:, :n]
+        self._sum[:n] = rows.sum(axis=0)
+        self._prod[:n, :n] = rows.T @ rows
+        self.counts["resyncs"] += 1
+
+    # -------------------------
+    # Matrices out
+    # -------------------------
+    def covariance(self, symbols=None):
+        """ -> (symbols, sample covariance of their returns); zeros until there are two rows """
+        with self._lock:
+            idx = self._columns(symbols)
+            return [self.symbols[i] for i in idx], self._cov(idx)
+
+    def correlation(self, symbols=None):
+        """ -> (symbols, correlation matrix); 0 for pairs without MIN_OBS real returns, 1 on the diagonal """
+        with self._lock:
+            idx = self._columns(symbols)
+            cov = self._cov(idx)
+            std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+            ok = (std > 0) & (self._obs[idx] >= self.min_obs)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = cov / np.outer(std, std)
+            corr[~(ok[:, None] & ok[None, :])] = 0.0
+            np.clip(corr, -1.0, 1.0, out=corr)
+            np.fill_diagonal(corr, 1.0)
+            return [self.symbols[i] for i in idx], corr
+
+    def corr(self, a, b):
+        _, m = self.correlation([a, b])
+        return float(m[0, 1]) if len(m) == 2 else 0.0
+
+    def _columns(self, symbols):
+        if symbols is None:
+            return np.arange(len(self.symbols))
+        return np.array([self._index[s] for s in symbols if s in self._index], np.int64)
+
+    def _cov(self, idx):
+        k = len(idx)
+        if self.n < 2 or k == 0:
+            return np.zeros((k, k))
+        s = self._sum[idx]
+        p = self._prod[np.ix_(idx, idx)]
+        return (p - np.outer(s, s) / self.n) / (self.n - 1)
+
+    # -------------------------
+    # Signals
+    # -------------------------
+    def weigh(self, signals, threshold=GROUP_CORR):
+        """
+        signals: [(symbol, "BUY" / "SELL"), ...] -> [{"symbol", "signal", "group", "group_size", "weight"}]
+        Two signals are the same bet when their returns move together in the traded direction
+        (corr * dir_a * dir_b >= threshold: BUY/BUY on correlated pairs, or BUY/SELL on inversely
+        correlated ones). weight = 1 / (1 + sum of the positive same-direction correlations to the other
+        signals): an independent signal keeps 1.0, four signals that are one bet get about 0.25 each.
+        """
+        signals = [(s, side) for s, side in signals if side in ("BUY", "SELL")]
+        if not signals:
+            return []
+        _, corr = self.correlation()
+        idx = [self._index.get(s) for s, _ in signals]
+        n = len(signals)
+        d = np.array([1.0 if side == "BUY" else -1.0 for _, side in signals])
+        same = np.zeros((n, n))
+        known = [k for k in range(n) if idx[k] is not None]
+        if known:
+            cols = [idx[k] for k in known]
+            same[np.ix_(known, known)] = corr[np.ix_(cols, cols)]
+        same *= np.outer(d, d)
+        np.fill_diagonal(same, 0.0)
+        weight = 1.0 / (1.0 + np.clip(same, 0.0, None).sum(axis=1))
+
+        parent = list(range(n))   # union-find over same-bet pairs
+
+        def root(a):
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            return a
+        for a, b in zip(*np.nonzero(np.triu(same >= threshold, 1))):
+            parent[root(a)] = root(b)
+        groups, out = {}, []
+        for k in range(n):
+            groups.setdefault(root(k), len(groups) + 1)
+        sizes = {}
+        for k in range(n):
+            sizes[root(k)] = sizes.get(root(k), 0) + 1
+        for k, (symbol, side) in enumerate(signals):
+            out.append({"symbol": symbol, "signal": side, "group": groups[root(k)],
+                        "group_size": sizes[root(k)], "weight": round(float(weight[k]), 3)})
+        return out
+
+    def stats(self):
+        return {**self.counts, "symbols": len(self.symbols), "window_rows": self.n, "pending": len(self._pending)}
@@ -0,0 +1,273 @@
+# dashboard.py
+# Multi-symbol live dashboard: a grid of mini price tiles with sparklines.
+# One aggregate source feeds every tile:
+#   - RestTickerFeed:   one bulk get_symbol_ticker() (all prices) per tick + one bulk get_ticker()
+#                       (24h stats) every STATS_EVERY_SEC, never a per-symbol request
+#   - StreamTickerFeed: one "!miniTicker@arr" websocket stream (all symbols, ~1/s)
+# Feeds only overwrite a shared snapshot dict; the Tk side redraws once per tick on a timer and
+# touches only tiles whose price changed. All tiles live on one Canvas (no widget per tile).
+
+import threading
+import time
+import tkinter as tk
+from collections import deque
+
+TICK_SEC = 1.0
+STATS_EVERY_SEC = 30
+SPARK_POINTS = 120          # price history kept per tile
+TILE_W, TILE_H = 150, 64
+TILE_PAD = 6
+UP, DOWN, FLAT = "#4caf50", "#f44336", "#bbbbbb"
+
+
+class TickerSnapshot:
+    """ latest price / 24h change per symbol, written by a feed thread, read by the UI """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prices = {}        # symbol -> last price
+        self.change_pct = {}    # symbol -> 24h change %
+        self.quote_volume = {}  # symbol -> 24h quote volume
+        self.version = 0
+        self.updated_at = None
+
+    def update(self, prices=None, change_pct=None, quote_volume=None):
+        with self._lock:
+            if prices:
+                self.prices.update(prices)
+            if change_pct:
+                self.change_pct.update(change_pct)
+            if quote_volume:
+                self.quote_volume.update(quote_volume)
+            self.version += 1
+            self.updated_at = time.time()
+
+    def read(self):
+        with self._lock:
+            return self.version, dict(self.prices), dict(self.change_pct), dict(self.quote_volume)
+
+
+class RestTickerFeed:
+    def __init__(self, client_factory, snapshot, tick_sec=TICK_SEC):
+        self.client_factory = client_factory
+        self.snapshot = snapshot
+        self.tick_sec = tick_sec
+        self.requests = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="dashboard-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        next_stats = 0.0
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            try:
+                client = self.client_factory()
+                if t0 >= next_stats:
+                    # 24h stats for every symbol in one call (also carries lastPrice)
+                    stats = client.get_ticker()
+                    self.requests += 1
+                    self.snapshot.update(
+                        prices={s["symbol"]: float(s["lastPrice"]) for s in stats},
+                        change_pct={s["symbol"]: float(s["priceChangePercent"]) for s in stats},
+                        quote_volume={s["symbol"]: float(s["quoteVolume"]) for s in stats})
+                    next_stats = t0 + STATS_EVERY_SEC
+                else:
+                    prices = client.get_symbol_ticker()   # no symbol -> all symbols, one request
+                    self.requests += 1
+                    self.snapshot.update(prices={p["symbol"]: float(p["price"]) for p in prices})
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+            self._stop.wait(max(0.0, self.tick_sec - (time.monotonic() - t0)))
+
+
+class StreamTickerFeed:
+    """ all-market mini ticker stream via python-binance's ThreadedWebsocketManager """
+
+    def __init__(self, api_key, api_secret, snapshot, testnet=True):
+        self.snapshot = snapshot
+        self.messages = 0
+        self.last_error = None
+        from binance import ThreadedWebsocketManager
+        self._twm = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret, testnet=testnet)
+
+    def _on_msg(self, msg):
+        if isinstance(msg, dict) and msg.get("e") == "error":
+            self.last_error = msg.get("m")
+            return
+        self.messages += 1
+        prices, change = {}, {}
+        for m in msg:
+            c, o = float(m["c"]), float(m["o"])
+            prices[m["s"]] = c
+            change[m["s"]] = (c - o) / o * 100.0 if o else 0.0
+        self.snapshot.update(prices=prices, change_pct=change,
+                             quote_volume={m["s"]: float(m["q"]) for m in msg})
+
+    def start(self):
+        self._twm.start()
+        self._twm.start_miniticker_socket(callback=self._on_msg)
+
+    def stop(self):
+        self._twm.stop()
+
+
+class DashboardWindow(tk.Toplevel):
+    """
+    symbols: list of symbols to show, or None for every USDT pair the feed reports.
+    on_select(symbol) is called when a tile is clicked.
+    """
+
+    def __init__(self, master, feed, snapshot, symbols=None, on_select=None, tick_sec=TICK_SEC):
+        super().__init__(master)
+        self.title("📈 Market Dashboard")
+        self.configure(bg="#121212")
+        self.geometry("980x560")
+        self.feed = feed
+        self.snapshot = snapshot
+        self.symbols = list(symbols) if symbols else None
+        self.on_select = on_select
+        self.tick_ms = int(tick_sec * 1000)
+        self.history = {}       # symbol -> deque of prices (sparkline)
+        self.tiles = {}         # symbol -> dict of canvas item ids
+        self.order = []         # symbols in grid order
+        self._seen_version = -1
+        self.redraws = 0
+        self.redraw_ms = 0.0
+
+        self.status = tk.Label(self, text="waiting for data…", fg="#aaaaaa", bg="#121212", anchor="w")
+        self.status.pack(side="bottom", fill="x", padx=8, pady=4)
+        self.canvas = tk.Canvas(self, bg="#121212", highlightthickness=0)
+        self.canvas.pack(side="top", fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda e: self._layout())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.feed.start()
+        self.after(self.tick_ms, self._tick)
+
+    # -------------------------
+    # Layout
+    # -------------------------
+    def _cols(self):
+        width = max(self.canvas.winfo_width(), TILE_W + 2 * TILE_PAD)
+        return max(1, width // (TILE_W + TILE_PAD))
+
+    def _tile_origin(self, i):
+        cols = self._cols()
+        r, c = divmod(i, cols)
+        return TILE_PAD + c * (TILE_W + TILE_PAD), TILE_PAD + r * (TILE_H + TILE_PAD)
+
+    def _create_tile(self, symbol):
+        cv = self.canvas
+        self.tiles[symbol] = {
+            "rect": cv.create_rectangle(0, 0, 0, 0, fill="#1e1e1e", outline="#333333", tags=("tile", symbol)),
+            "sym": cv.create_text(0, 0, text=symbol, anchor="nw", fill="white", font=("Arial", 9, "bold"), tags=("tile", symbol)),
+            "price": cv.create_text(0, 0, text="-", anchor="ne", fill="white", font=("Consolas", 10), tags=("tile", symbol)),
+            "chg": cv.create_text(0, 0, text="", anchor="ne", fill=FLAT, font=("Consolas", 8), tags=("tile", symbol)),
+            "spark": cv.create_line(0, 0, 0, 0, fill=FLAT, width=1, tags=("tile", symbol)),
+        }
+        self.order.append(symbol)
+        self._place(symbol, len(self.order) - 1)
+
+    def _place(self, symbol, i):
+        x, y = self._tile_origin(i)
+        t, cv = self.tiles[symbol], self.canvas
+        cv.coords(t["rect"], x, y, x + TILE_W, y + TILE_H)
+        cv.coords(t["sym"], x + 6, y + 4)
+        cv.coords(t["price"], x + TILE_W - 6, y + 4)
+        cv.coords(t["chg"], x + TILE_W - 6, y + 20)
+        self._draw_spark(symbol)
+
+    def _layout(self):
+        for i, sym in enumerate(self.order):
+            self._place(sym, i)
+        if self.order:
+            _, y = self._tile_origin(len(self.order) - 1)
+            self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), y + TILE_H + TILE_PAD))
+
+    def _draw_spark(self, symbol):
+        hist = self.history.get(symbol)
+        t = self.tiles[symbol]
+        if not hist or len(hist) < 2:
+            return
+        x0, y0, x1, _ = self.canvas.coords(t["rect"])
+        top, bottom = y0 + 34, y0 + TILE_H - 6
+        lo, hi = min(hist), max(hist)
+        span = (hi - lo) or 1.0
+        step = (x1 - x0 - 12) / (SPARK_POINTS - 1)
+        start = SPARK_POINTS - len(hist)
+        pts = []
+        for i, p in enumerate(hist):
+            pts.append(x0 + 6 + (start + i) * step)
+            pts.append(bottom - (p - lo) / span * (bottom - top))
+        self.canvas.coords(t["spark"], *pts)
+        self.canvas.itemconfig(t["spark"], fill=UP if hist[-1] >= hist[0] else DOWN)
+
+    # -------------------------
+    # Update (one merged redraw per tick)
+    # -------------------------
+    def _tick(self):
+        if not self.winfo_exists():
+            return
+        version, prices, change, qvol = self.snapshot.read()
+        if version != self._seen_version:
+            self._seen_version = version
+            t0 = time.perf_counter()
+            self._apply(prices, change, qvol)
+            self.redraw_ms = (time.perf_counter() - t0) * 1000
+            self.redraws += 1
+        err = getattr(self.feed, "last_error", None)
+        count = getattr(self.feed, "requests", getattr(self.feed, "messages", 0))
+        self.status.config(text=f"{len(self.order)} tiles | redraw {self.redraw_ms:.1f} ms | feed updates {count}"
+                                + (f" | error: {err}" if err else ""))
+        self.after(self.tick_ms, self._tick)
+
+    def _apply(self, prices, change, qvol):
+        symbols = self.symbols
+        if symbols is None:
+            # every USDT pair, busiest first (order fixed once the tile exists)
+            symbols = sorted((s for s in prices if s.endswith("USDT")), key=lambda s: -qvol.get(s, 0.0))
+        added = False
+        for sym in symbols:
+            price = prices.get(sym)
+            if price is None:
+                continue
+            new = sym not in self.tiles
+            if new:
+                self._create_tile(sym)
+                added = True
+            hist = self.history.setdefault(sym, deque(maxlen=SPARK_POINTS))
+            if hist and hist[-1] == price and sym in change and not new:
+                continue  # nothing changed for this tile
+            hist.append(price)
+            t = self.tiles[sym]
+            self.canvas.itemconfig(t["price"], text=f"{price:.8g}")
+            pct = change.get(sym)
+            if pct is not None:
+                self.canvas.itemconfig(t["chg"], text=f"{pct:+.2f}%", fill=UP if pct > 0 else DOWN if pct < 0 else FLAT)
+            self._draw_spark(sym)
+        if added:
+            self._layout()
+
+    def _on_click(self, event):
+        item = self.canvas.find_closest(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        tags = self.canvas.gettags(item[0]) if item else ()
+        sym = next((t for t in tags if t in self.tiles), None)
+        if sym and self.on_select:
+            self.on_select(sym)
+
+    def close(self):
+        self.feed.stop()
+        self.destroy()
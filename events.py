@@ -0,0 +1,293 @@
+# events.py
+# In-process event bus: strategy signals, orders/fills and errors are published here and fanned out
+# to pluggable consumers (rotating file, local webhook, GUI panel, desktop notifier).
+#
+# Every subscription owns a bounded queue + its own worker thread, so publish() never blocks the
+# scan/trade path. When a queue is full the subscription's policy decides what to lose:
+#   "drop_oldest" - keep the newest events (default)
+#   "drop_new"    - keep what is queued, drop the incoming event
+#   "merge"       - events with the same merge key (topic + symbol) replace the pending one
+#   "keep_all"    - lose nothing: the queue grows past maxsize (audit trails like the trade journal)
+
+import json
+import logging
+import logging.handlers
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import OrderedDict, deque
+
+import config
+
+# topics used across the app
+SIGNAL = "signal"     # strategy result (signal/confidence/reason/levels)
+ORDER = "order"       # market order sent / acknowledged
+OCO = "oco"           # OCO bracket placed
+OCO_DONE = "oco_done" # OCO bracket finished (one leg filled / cancelled)
+FILL = "fill"         # execution(s) reported by the exchange
+ERROR = "error"       # API / worker errors
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEW = "drop_new"
+MERGE = "merge"
+KEEP_ALL = "keep_all"
+
+
+class Event:
+    __slots__ = ("topic", "ts", "data")
+
+    def __init__(self, topic, data, ts=None):
+        self.topic = topic
+        self.ts = ts if ts is not None else time.time()
+        self.data = data
+
+    @property
+    def merge_key(self):
+        return (self.topic, self.data.get("symbol"))
+
+    def to_dict(self):
+        return {"topic": self.topic, "ts": self.ts, **self.data}
+
+    def to_json(self):
+        # numpy / Decimal values -> str instead of failing the consumer
+        return json.dumps(self.to_dict(), default=str)
+
+    def __repr__(self):
+        return f"Event({self.topic!r}, {self.data!r})"
+
+
+class Subscription:
+    """ bounded queue + worker thread delivering events to one consumer callable """
+
+    def __init__(self, consumer, topics=None, maxsize=256, policy=DROP_OLDEST, name=None):
+        if policy not in (DROP_OLDEST, DROP_NEW, MERGE, KEEP_ALL):
+            raise ValueError(f"unknown backpressure policy: {policy}")
+        self.consumer = consumer
+        self.topics = set(topics) if topics else None
+        self.maxsize = maxsize
+        self.policy = policy
+        self.name = name or getattr(consumer, "__name__", consumer.__class__.__name__)
+        self.delivered = 0
+        self.dropped = 0
+        self.merged = 0
+        self.errors = 0
+        self._pending = OrderedDict() if policy == MERGE else deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"bus-{self.name}", daemon=True)
+        self._thread.start()
+
+    def wants(self, event):
+        return self.topics is None or event.topic in self.topics
+
+    def offer(self, event):
+        """ never blocks: enqueue, merge or drop according to policy """
+        with self._cond:
+            if self._closed:
+                return False
+            q = self._pending
+            if self.policy == MERGE:
+                key = event.merge_key
+                if key in q:
+                    q[key] = event          # keep queue position, newest payload
+                    self.merged += 1
+                    return True
+                if len(q) >= self.maxsize:
+                    q.popitem(last=False)
+                    self.dropped += 1
+                q[key] = event
+            else:
+                if len(q) >= self.maxsize and self.policy != KEEP_ALL:
+                    if self.policy == DROP_NEW:
+                        self.dropped += 1
+                        return False
+                    q.popleft()
+                    self.dropped += 1
+                q.append(event)
+            self._cond.notify()
+            return True
+
+    def _next(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            if self.policy == MERGE:
+                return self._pending.popitem(last=False)[1]
+            return self._pending.popleft()
+
+    def _run(self):
+        while True:
+            event = self._next()
+            if event is None:
+                return
+            try:
+                self.consumer(event)
+                self.delivered += 1
+            except Exception as e:
+                # a broken consumer must not take the bus down
+                self.errors += 1
+                print(f"[events] consumer {self.name} failed: {e}", file=sys.stderr)
+
+    def close(self, timeout=2.0):
+        """ stop accepting events, let the worker drain what is queued """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        close = getattr(self.consumer, "close", None)
+        if close:
+            close()
+
+    def stats(self):
+        with self._cond:
+            queued = len(self._pending)
+        return {"name": self.name, "queued": queued, "delivered": self.delivered,
+                "dropped": self.dropped, "merged": self.merged, "errors": self.errors}
+
+
+class EventBus:
+    def __init__(self):
+        self._subs = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, consumer, topics=None, maxsize=256, policy=DROP_OLDEST, name=None):
+        sub = Subscription(consumer, topics=topics, maxsize=maxsize, policy=policy, name=name)
+        with self._lock:
+            self._subs = self._subs + [sub]
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs = [s for s in self._subs if s is not sub]
+        sub.close()
+
+    def publish(self, topic, **data):
+        """ fan out to every interested subscription; O(subscribers), never waits on a consumer """
+        event = Event(topic, data)
+        for sub in self._subs:   # copy-on-write list, no lock needed to iterate
+            if sub.wants(event):
+                sub.offer(event)
+        return event
+
+    def stats(self):
+        return [s.stats() for s in self._subs]
+
+    def close(self):
+        with self._lock:
+            subs, self._subs = self._subs, []
+        for s in subs:
+            s.close()
+
+
+# process-wide bus used by gui.py / scanner.py
+BUS = EventBus()
+publish = BUS.publish
+
+
+# ---------------------------------------------------------
+# Consumers
+# ---------------------------------------------------------
+class RotatingFileConsumer:
+    """ one JSON line per event, rotated by size """
+
+    def __init__(self, path="logs/events.jsonl", max_bytes=5_000_000, backups=5):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def __call__(self, event):
+        record = logging.LogRecord("events", logging.INFO, __file__, 0, event.to_json(), None, None)
+        self._handler.emit(record)
+
+    def close(self):
+        self._handler.close()
+
+
+class WebhookConsumer:
+    """ POST each event as JSON to a (local) webhook endpoint """
+
+    def __init__(self, url, timeout=2.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, event):
+        req = urllib.request.Request(self.url, data=event.to_json().encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            resp.read()
+
+
+class DesktopNotifier:
+    """ desktop notification via plyer, notify-send (Linux) or osascript (macOS); prints otherwise """
+
+    def __init__(self, app_name="Crypto Bot"):
+        self.app_name = app_name
+        self._plyer = None
+        try:
+            from plyer import notification
+            self._plyer = notification
+        except Exception:
+            pass
+
+    @staticmethod
+    def format(event):
+        d = event.data
+        if event.topic == SIGNAL:
+            return f"{d.get('symbol')} {d.get('signal')}", f"conf={d.get('confidence')} {d.get('reason', '')}"
+        if event.topic == ERROR:
+            return "Error", str(d.get("message", ""))
+        return f"{event.topic.upper()} {d.get('symbol', '')}", ", ".join(f"{k}={v}" for k, v in d.items() if k != "symbol")
+
+    def __call__(self, event):
+        if event.topic == SIGNAL and event.data.get("signal") not in ("BUY", "SELL"):
+            return  # only actionable signals are worth a popup
+        title, message = self.format(event)
+        if self._plyer is not None:
+            self._plyer.notify(title=title, message=message, app_name=self.app_name, timeout=5)
+        elif sys.platform.startswith("linux") and shutil.which("notify-send"):
+            subprocess.run(["notify-send", title, message], timeout=5, check=False)
+        elif sys.platform == "darwin":
+            script = f'display notification {json.dumps(message)} with title {json.dumps(title)}'
+            subprocess.run(["osascript", "-e", script], timeout=5, check=False)
+        else:
+            print(f"[notify] {title}: {message}")
+
+
+def attach_default_consumers(bus=BUS):
+    """ file log always; webhook / desktop notifications when enabled in config.py """
+    subs = [bus.subscribe(RotatingFileConsumer(getattr(config, "EVENT_LOG_FILE", "logs/events.jsonl")),
+                          maxsize=4096, name="file")]
+    url = getattr(config, "WEBHOOK_URL", None)
+    if url:
+        subs.append(bus.subscribe(WebhookConsumer(url), maxsize=256, name="webhook"))
+    if getattr(config, "DESKTOP_NOTIFY", True):
+        subs.append(bus.subscribe(DesktopNotifier(), topics=(SIGNAL, FILL, ERROR), maxsize=16, policy=MERGE, name="notifier"))
+    return subs
+
+
+def serve_webhook_standin(host="127.0.0.1", port=8765):
+    """ tiny local endpoint that prints whatever the WebhookConsumer posts (dev stand-in) """
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            print(body.decode("utf-8", "replace"))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    print(f"Webhook stand-in listening on http://{host}:{port}/")
+    HTTPServer((host, port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    serve_webhook_standin()
@@ -0,0 +1,177 @@
+# exchange_meta.py
+# Per-symbol trading rules from exchangeInfo + exchange clock offset, shared by every order path.
+#   - filters (tick size, step size, min qty, min notional, OCO allowed) are fetched once,
+#     persisted to disk as JSON and reused until EXCHANGE_INFO_TTL_SEC expires
+#   - prices / quantities are rounded with Decimal to the symbol's tick / step, so orders are valid
+#     on the first attempt instead of guessing "6 or 8 decimals"
+#   - the server-time offset is measured periodically (RTT midpoint) and pushed into the clients'
+#     timestamp_offset, so signed requests don't depend on the local clock
+# Usage: exchange_meta.META.ensure(client); f = META.get("BTCUSDT"); f.price(x), f.qty(q)
+
+import json
+import os
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+import config
+
+INFO_FILE = getattr(config, "EXCHANGE_INFO_FILE", "data/exchange_info.json")
+INFO_TTL_SEC = getattr(config, "EXCHANGE_INFO_TTL_SEC", 6 * 3600)
+TIME_SYNC_SEC = 300          # server-time offset refresh
+
+
+def _fmt(d):
+    """ Decimal -> plain string the API accepts (no exponent, no trailing zeros) """
+    s = format(d, "f")
+    return s.rstrip("0").rstrip(".") if "." in s else s
+
+
+class SymbolFilters:
+    __slots__ = ("symbol", "status", "tick_size", "step_size", "min_qty", "max_qty", "min_notional", "oco_allowed")
+
+    def __init__(self, symbol, status="TRADING", tick_size="0", step_size="0", min_qty="0", max_qty="0",
+                 min_notional="0", oco_allowed=True):
+        self.symbol = symbol
+        self.status = status
+        self.tick_size = Decimal(str(tick_size))
+        self.step_size = Decimal(str(step_size))
+        self.min_qty = Decimal(str(min_qty))
+        self.max_qty = Decimal(str(max_qty))
+        self.min_notional = Decimal(str(min_notional))
+        self.oco_allowed = bool(oco_allowed)
+
+    @classmethod
+    def from_exchange_info(cls, s):
+        f = {x["filterType"]: x for x in s.get("filters", [])}
+        lot = f.get("LOT_SIZE", {})
+        notional = f.get("NOTIONAL") or f.get("MIN_NOTIONAL") or {}
+        return cls(s["symbol"], s.get("status", "TRADING"),
+                   tick_size=f.get("PRICE_FILTER", {}).get("tickSize", "0"),
+                   step_size=lot.get("stepSize", "0"), min_qty=lot.get("minQty", "0"), max_qty=lot.get("maxQty", "0"),
+                   min_notional=notional.get("minNotional", "0"), oco_allowed=s.get("ocoAllowed", False))
+
+    def to_dict(self):
+        return {"symbol": self.symbol, "status": self.status, "tick_size": str(self.tick_size),
+                "step_size": str(self.step_size), "min_qty": str(self.min_qty), "max_qty": str(self.max_qty),
+                "min_notional": str(self.min_notional), "oco_allowed": self.oco_allowed}
+
+    # -------------------------
+    # Rounding (returns strings, ready for the API)
+    # -------------------------
+    def price(self, p):
+        """ nearest valid price """
+        d = Decimal(str(p))
+        if self.tick_size > 0:
+            d = (d / self.tick_size).quantize(Decimal(1), rounding=ROUND_HALF_UP) * self.tick_size
+        return _fmt(d)
+
+    def qty(self, q):
+        """ quantity floored to the step (never more than the user asked for) """
+        d = Decimal(str(q))
+        if self.step_size > 0:
+            d = (d / self.step_size).to_integral_value(rounding=ROUND_DOWN) * self.step_size
+        return _fmt(d)
+
+    def check(self, qty, price):
+        """ reason string if (already rounded) qty @ price would be rejected by the exchange, else None """
+        if self.status != "TRADING":
+            return f"{self.symbol} is {self.status}"
+        q = Decimal(str(qty))
+        if q <= 0 or q < self.min_qty:
+            return f"qty {qty} below min qty {_fmt(self.min_qty)}"
+        if self.max_qty > 0 and q > self.max_qty:
+            return f"qty {qty} above max qty {_fmt(self.max_qty)}"
+        if price and self.min_notional > 0 and q * Decimal(str(price)) < self.min_notional:
+            return f"notional {float(q * Decimal(str(price))):.4f} below min notional {_fmt(self.min_notional)}"
+        return None
+
+
+class ExchangeMeta:
+    def __init__(self, path=INFO_FILE, ttl=INFO_TTL_SEC):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.symbols = {}          # symbol -> SymbolFilters
+        self.fetched_at = None     # epoch sec of the exchangeInfo snapshot
+        self.time_offset_ms = 0    # server time - local time
+        self.time_synced_at = None
+
+    @property
+    def fresh(self):
+        return self.fetched_at is not None and time.time() - self.fetched_at < self.ttl
+
+    def get(self, symbol):
+        return self.symbols.get(symbol)
+
+    # -------------------------
+    # exchangeInfo (disk cache + TTL)
+    # -------------------------
+    def load_disk(self):
+        """ True if a cache file within TTL was loaded """
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return False
+        if time.time() - data.get("fetched_at", 0) >= self.ttl:
+            return False
+        self.symbols = {s["symbol"]: SymbolFilters(**s) for s in data.get("symbols", [])}
+        self.fetched_at = data["fetched_at"]
+        return True
+
+    def update(self, info):
+        """ raw get_exchange_info() response -> index + disk cache """
+        symbols = {s["symbol"]: SymbolFilters.from_exchange_info(s) for s in info.get("symbols", [])}
+        self.symbols, self.fetched_at = symbols, time.time()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"fetched_at": self.fetched_at, "symbols": [f.to_dict() for f in symbols.values()]}, fh)
+        os.replace(tmp, self.path)
+
+    def ensure(self, client=None):
+        """ make sure filters are loaded and within TTL (disk first, then one exchangeInfo call) """
+        if self.fresh:
+            return
+        with self._lock:
+            if self.fresh or self.load_disk():
+                return
+            if client is None:
+                raise RuntimeError("exchange info not loaded")
+            self.update(client.get_exchange_info())
+
+    def apply_to_risk(self, engine):
+        for sym, f in self.symbols.items():
+            engine.set_symbol_filters(sym, min_qty=float(f.min_qty) or None, step_size=float(f.step_size) or None,
+                                      min_notional=float(f.min_notional) or None)
+
+    # -------------------------
+    # Server time
+    # -------------------------
+    @property
+    def time_sync_due(self):
+        return self.time_synced_at is None or time.time() - self.time_synced_at > TIME_SYNC_SEC
+
+    def set_server_time(self, server_ms, sent_at, received_at, *clients):
+        """ offset from one get_server_time() round trip (local times in epoch sec), applied to clients """
+        local_mid_ms = (sent_at + received_at) / 2 * 1000
+        self.time_offset_ms = int(server_ms - local_mid_ms)
+        self.time_synced_at = time.time()
+        self.apply_offset(*clients)
+        return self.time_offset_ms
+
+    def apply_offset(self, *clients):
+        for c in clients:
+            if c is not None:
+                c.timestamp_offset = self.time_offset_ms
+
+    def sync_time(self, client):
+        """ blocking variant (sync client) """
+        t0 = time.time()
+        server = client.get_server_time()["serverTime"]
+        return self.set_server_time(server, t0, time.time(), client)
+
+
+# one cache per process, shared by every order path
+META = ExchangeMeta()
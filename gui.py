@@ -2,74 +2,219 @@
 # Advanced Crypto Trading GUI with Candlestick Chart, Volume, Live Update and OCO orders (Testnet)
 # Author: ChatGPT (upgraded for user)
 # Requirements: python-binance, pandas, matplotlib
+#
+# Fast startup: only tkinter is imported up-front. pandas / matplotlib / binance / strategy are
+# loaded in a background thread once the window is on screen (or on first use by a worker),
+# and the chart area shows a placeholder until they are ready.
+
+import time
+import asyncio
+_MODULE_T0 = time.perf_counter()
 
 import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import time
 import math
-import pandas as pd
-import matplotlib
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.patches import Rectangle
-import matplotlib.dates as mdates
-
-# Binance client
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
 
 import config  # must contain API_KEY and API_SECRET
-# add strategy module (create strategy.py as provided earlier)
-import strategy
+import startup
+import events
+import journal
+import risk
+import candle_store
+import replay
+import dashboard
+import io_core
+import exchange_meta
+import paper
+import memwatch
+import swing_levels
+import positions
+
 # ---------------------------------------------------------
 # CONFIG / TUNEABLE PARAMETERS (edit here)
 # ---------------------------------------------------------
 UPDATE_INTERVAL_SEC = 3            # live price / chart refresh interval
-CANDLES_LIMIT = 60                 # how many candles to fetch for chart
+CANDLES_LIMIT = 60                 # how many candles to fetch per refresh
 DEFAULT_INTERVAL = "5m"            # default timeframe for levels/chart
 SL_PCT = 0.01                      # stop loss percent (1% default)
 TP_PCT = 0.02                      # take profit percent (2% default)
 CHART_CANDLE_WIDTH_MIN = 0.7       # relative candle width
+FAST_STARTUP = True                # show window first, load charting/exchange stacks in background
+RISK_SYNC_SEC = 60                 # refresh risk engine balances from get_account() this often
+RECORD_CANDLES = True              # keep fetched candles in the local store (replay / history)
+REPLAY_STORE_DAYS = 7              # "From store" replays this much recorded history
+REPLAY_SPEEDS = ["1", "10", "60", "100", "300", "1000"]
+CHART_HISTORY_BARS = 20000         # bars loaded from the local store when the chart (re)opens a symbol
+CHART_HISTORY_CHUNK = 20000        # older bars loaded per step while panning left
+CHART_DEFAULT_VIEW = 120           # bars visible after a symbol change
+CHART_MIN_VIEW = 10
+CHART_PX_PER_BUCKET = 3            # level-of-detail: at most one candle per this many pixels
+SR_LEVELS = 3                      # swing support / resistance levels drawn on each side of the price
+DASHBOARD_ALL_USDT = False         # dashboard shows every USDT pair instead of the symbol list
+ORDER_TIMEOUT_SEC = 10             # sync client (orders): hard HTTP timeout, never retried
+LATENCY_REPORT_SEC = 30            # log refresh p50/p95/p99 this often
+PAPER_TRADING = False              # start with orders going to the local paper broker (paper.py)
+DASHBOARD_STREAM = False           # dashboard fed by the all-market websocket instead of bulk REST polling
+MEMWATCH = False                   # start with allocation tracking (tracemalloc) on; also toggled from the Memory panel
+MEMWATCH_SAMPLE_SEC = 60           # memory snapshot interval (RSS always, top growth sites when tracking)
+USE_HUB = True                     # read candles / tickers through a running hub.py instead of the exchange
+TRAIL_PCT = 0.0                    # trailing stop distance (%) for new brackets; 0 = fixed stop (set per bracket in Positions)
+LOG_MAX_LINES = 2000               # log box keeps this many lines (older ones are dropped)
 # ---------------------------------------------------------
 
-# init client for testnet
-client = Client(config.API_KEY, config.API_SECRET)
-# Force testnet endpoint (important)
-client.API_URL = 'https://testnet.binance.vision/api'
+STARTUP = startup.StartupTimer(t0=_MODULE_T0)
+
+# heavy modules, bound by _load_heavy_modules() (see LazyLoader in startup.py)
+pd = None
+matplotlib = None
+plt = None
+FigureCanvasTkAgg = None
+Rectangle = None
+mdates = None
+np = None
+LineCollection = None
+PolyCollection = None
+FuncFormatter = None
+chart_lod = None
+indicator_cache = None
+Client = None
+strategy = None
+strategies = None
+hub = None
+
+
+class BinanceAPIException(Exception):
+    """ placeholder until binance.exceptions is imported (rebound by _load_heavy_modules) """
+
+
+def _load_heavy_modules():
+    global pd, matplotlib, plt, FigureCanvasTkAgg, Rectangle, mdates, Client, BinanceAPIException, strategy, strategies
+    global np, LineCollection, PolyCollection, FuncFormatter, chart_lod, indicator_cache, hub
+    pd = STARTUP.timed_import("pandas")
+    matplotlib = STARTUP.timed_import("matplotlib")
+    matplotlib.use("TkAgg")
+    plt = STARTUP.timed_import("matplotlib.pyplot")
+    FigureCanvasTkAgg = STARTUP.timed_import("matplotlib.backends.backend_tkagg").FigureCanvasTkAgg
+    Rectangle = STARTUP.timed_import("matplotlib.patches").Rectangle
+    mdates = STARTUP.timed_import("matplotlib.dates")
+    np = STARTUP.timed_import("numpy")
+    collections_ = STARTUP.timed_import("matplotlib.collections")
+    LineCollection, PolyCollection = collections_.LineCollection, collections_.PolyCollection
+    FuncFormatter = STARTUP.timed_import("matplotlib.ticker").FuncFormatter
+    chart_lod = STARTUP.timed_import("chart_lod")
+    indicator_cache = STARTUP.timed_import("indicator_cache")
+    # Binance client
+    Client = STARTUP.timed_import("binance.client").Client
+    BinanceAPIException = STARTUP.timed_import("binance.exceptions").BinanceAPIException
+    # add strategy module (create strategy.py as provided earlier)
+    strategy = STARTUP.timed_import("strategy")
+    strategies = STARTUP.timed_import("strategies")
+    hub = STARTUP.timed_import("hub")
+    STARTUP.mark("modules_loaded")
+
+
+heavy = startup.LazyLoader(_load_heavy_modules)
+
+# client for testnet, created on first use (not at import time)
+client = None
+_client_lock = threading.Lock()
+
+# paper-trading broker (paper.py); when set, every order path talks to it instead of the exchange
+paper_broker = None
+
+def get_client():
+    """ order/account client: the paper broker in paper mode, the testnet client otherwise """
+    if paper_broker is not None:
+        return paper_broker
+    return get_live_client()
+
+def get_live_client():
+    global client
+    with _client_lock:
+        if client is None:
+            heavy.ensure()
+            client = Client(config.API_KEY, config.API_SECRET, requests_params={"timeout": ORDER_TIMEOUT_SEC})
+            # Force testnet endpoint (important)
+            client.API_URL = 'https://testnet.binance.vision/api'
+            exchange_meta.META.apply_offset(client)
+            STARTUP.mark("client_ready")
+        return client
+
+async def make_async_client():
+    """ async twin of get_client() for the I/O core (io_core.py) """
+    AsyncClient = STARTUP.timed_import("binance").AsyncClient
+    return await AsyncClient.create(config.API_KEY, config.API_SECRET, testnet=True)
+
+# read-only data source override (replay mode); orders always use get_client() (exchange or paper broker)
+data_client_override = None
+
+def get_data_client():
+    return data_client_override or get_hub() or get_live_client()
+
+def get_hub():
+    """ client of the local market-data hub (hub.py) when one is running, else None """
+    if not USE_HUB or hub is None:
+        return None
+    return hub.shared()
+
+_store = None
+
+def get_candle_store():
+    global _store
+    if _store is None:
+        _store = candle_store.CandleStore()
+    return _store
 
 # helper: convert kline -> DataFrame
+def klines_to_df(klines):
+    """ raw klines -> DataFrame indexed by close datetime with columns: open, high, low, close, volume """
+    if not klines:
+        return pd.DataFrame()
+    df = pd.DataFrame(klines, columns=[
+        "open_time", "open", "high", "low", "close", "volume",
+        "close_time", "quote_av", "trades", "taker_base_av", "taker_quote_av", "ignore"
+    ])
+    # cast types
+    df["open"] = df["open"].astype(float)
+    df["high"] = df["high"].astype(float)
+    df["low"] = df["low"].astype(float)
+    df["close"] = df["close"].astype(float)
+    df["volume"] = df["volume"].astype(float)
+    df["datetime"] = pd.to_datetime(df["close_time"], unit="ms")
+    df.set_index("datetime", inplace=True)
+    return df[["open", "high", "low", "close", "volume"]]
+
 def fetch_ohlcv_df(symbol: str, interval: str = DEFAULT_INTERVAL, limit: int = CANDLES_LIMIT):
     """
     Returns DataFrame indexed by datetime with columns: open, high, low, close, volume
     """
-    try:
-        klines = client.get_klines(symbol=symbol, interval=interval, limit=limit)
-        if not klines:
-            return pd.DataFrame()
-        df = pd.DataFrame(klines, columns=[
-            "open_time", "open", "high", "low", "close", "volume",
-            "close_time", "quote_av", "trades", "taker_base_av", "taker_quote_av", "ignore"
-        ])
-        # cast types
-        df["open"] = df["open"].astype(float)
-        df["high"] = df["high"].astype(float)
-        df["low"] = df["low"].astype(float)
-        df["close"] = df["close"].astype(float)
-        df["volume"] = df["volume"].astype(float)
-        df["datetime"] = pd.to_datetime(df["close_time"], unit="ms")
-        df.set_index("datetime", inplace=True)
-        return df[["open", "high", "low", "close", "volume"]]
-    except Exception as e:
-        raise
+    klines = get_data_client().get_klines(symbol=symbol, interval=interval, limit=limit)
+    record_klines(symbol, interval, klines)
+    return klines_to_df(klines)
 
-def compute_levels(df: pd.DataFrame):
-    """ Simple level computation: entry = last close, SL = entry*(1-SL_PCT), TP = entry*(1+TP_PCT) """
+def record_klines(symbol, interval, klines):
+    """ keep live candles in the local store (never replayed ones) """
+    if RECORD_CANDLES and klines and data_client_override is None:
+        try:
+            get_candle_store().write(symbol, interval, klines)
+        except Exception as e:
+            print(f"Candle store write failed: {e}")
+
+def compute_levels(df: "pd.DataFrame", symbol=None):
+    """
+    Simple level computation: entry = last close, SL = entry*(1-SL_PCT), TP = entry*(1+TP_PCT)
+    Rounded to the symbol's tick size when exchange info is loaded.
+    """
     if df is None or df.empty:
         return None
     last = float(df["close"].iloc[-1])
+    f = exchange_meta.META.get(symbol) if symbol else None
+    if f is not None:
+        entry = float(f.price(last))
+        return {"entry": entry, "sl": float(f.price(entry * (1 - SL_PCT))),
+                "tp": float(f.price(entry * (1 + TP_PCT))), "close": last}
     entry = round(last, 8) if last < 1 else round(last, 6)
     sl = round(entry * (1 - SL_PCT), 8) if entry < 1 else round(entry * (1 - SL_PCT), 6)
     tp = round(entry * (1 + TP_PCT), 8) if entry < 1 else round(entry * (1 + TP_PCT), 6)
@@ -176,6 +321,38 @@ class CryptoAppUI:
         # add this after the existing buttons (so it sits with other buttons)
         self.strategy_btn = tk.Button(ctrl, text="🔎 Scan Strategy", bg="#ff9800", fg="black", command=self.on_scan_strategy)
         self.strategy_btn.grid(row=0, column=14, padx=8)
+        self.history_btn = tk.Button(ctrl, text="📜 History", bg="#607d8b", fg="white", command=self.on_show_history)
+        self.history_btn.grid(row=0, column=15, padx=8)
+        self.dashboard_btn = tk.Button(ctrl, text="🧮 Dashboard", bg="#00897b", fg="white", command=self.on_show_dashboard)
+        self.dashboard_btn.grid(row=0, column=16, padx=8)
+
+        # Replay controls (second row)
+        tk.Label(ctrl, text="Replay:", fg="white", bg="#121212").grid(row=1, column=0, padx=6, pady=(6, 0), sticky="w")
+        tk.Button(ctrl, text="📂 CSV…", command=self.on_replay_csv).grid(row=1, column=1, padx=4, pady=(6, 0))
+        tk.Button(ctrl, text="🗄 Store", command=self.on_replay_store).grid(row=1, column=2, padx=4, pady=(6, 0))
+        tk.Label(ctrl, text="Speed x", fg="white", bg="#121212").grid(row=1, column=3, padx=4, pady=(6, 0), sticky="e")
+        self.replay_speed_var = tk.StringVar(value="60")
+        speed_cb = ttk.Combobox(ctrl, textvariable=self.replay_speed_var, values=REPLAY_SPEEDS, width=6)
+        speed_cb.grid(row=1, column=4, padx=4, pady=(6, 0))
+        speed_cb.bind("<<ComboboxSelected>>", lambda e: self.on_replay_speed())
+        speed_cb.bind("<Return>", lambda e: self.on_replay_speed())
+        self.replay_play_btn = tk.Button(ctrl, text="⏸", width=3, command=self.on_replay_toggle, state="disabled")
+        self.replay_play_btn.grid(row=1, column=5, padx=4, pady=(6, 0))
+        self.replay_step_btn = tk.Button(ctrl, text="⏭", width=3, command=self.on_replay_step, state="disabled")
+        self.replay_step_btn.grid(row=1, column=6, padx=4, pady=(6, 0))
+        self.replay_stop_btn = tk.Button(ctrl, text="⏹", width=3, command=self.on_replay_stop, state="disabled")
+        self.replay_stop_btn.grid(row=1, column=7, padx=4, pady=(6, 0))
+        self.replay_scan_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(ctrl, text="Scan each bar", variable=self.replay_scan_var, fg="white", bg="#121212",
+                       selectcolor="#333333", activebackground="#121212").grid(row=1, column=8, columnspan=2, padx=4, pady=(6, 0))
+        self.replay_lbl = tk.Label(ctrl, text="live", fg="#aaaaaa", bg="#121212")
+        self.replay_lbl.grid(row=1, column=10, columnspan=5, padx=6, pady=(6, 0), sticky="w")
+        self.paper_var = tk.BooleanVar(value=PAPER_TRADING)
+        tk.Checkbutton(ctrl, text="📝 Paper trading", variable=self.paper_var, command=self.on_paper_toggle,
+                       fg="white", bg="#121212", selectcolor="#333333",
+                       activebackground="#121212").grid(row=1, column=15, columnspan=2, padx=4, pady=(6, 0), sticky="w")
+        tk.Button(ctrl, text="🧠 Memory", command=self.on_show_memory).grid(row=1, column=17, padx=4, pady=(6, 0))
+        tk.Button(ctrl, text="📌 Positions", command=self.on_show_positions).grid(row=1, column=18, padx=4, pady=(6, 0))
 
 
         # Middle frame: levels + price + order history
@@ -197,6 +374,8 @@ class CryptoAppUI:
         # price label
         self.price_lbl = tk.Label(lv_frame, text="Price: -", bg="#1e1e1e", fg="white", font=("Arial", 13, "bold"))
         self.price_lbl.pack(anchor="w", padx=12, pady=10)
+        self.latency_lbl = tk.Label(lv_frame, text="Refresh p99: -", bg="#1e1e1e", fg="#888888", font=("Arial", 9))
+        self.latency_lbl.pack(anchor="w", padx=12)
 
         # right: order history / logs
         logs_frame = tk.Frame(mid, bg="#1e1e1e")
@@ -206,31 +385,164 @@ class CryptoAppUI:
         self.log_box = tk.Text(logs_frame, height=8, bg="#0d0d0d", fg="lime", font=("Consolas", 10))
         self.log_box.pack(fill="both", expand=True, padx=6, pady=6)
 
+        # far right: live signals / fills / errors fed by the event bus (events.py)
+        sig_frame = tk.Frame(mid, bg="#1e1e1e")
+        sig_frame.pack(side="left", padx=6, pady=6, fill="y")
+        tk.Label(sig_frame, text="Signals & Fills", bg="#1e1e1e", fg="white", font=("Arial", 12, "bold")).pack(anchor="w", padx=6, pady=6)
+        self.signal_list = tk.Listbox(sig_frame, height=8, width=42, bg="#0d0d0d", fg="#ffcc66", font=("Consolas", 9))
+        self.signal_list.pack(fill="both", expand=True, padx=6, pady=6)
+
         # bottom: chart + volume
-        chart_frame = tk.Frame(master, bg="#121212")
-        chart_frame.pack(side="top", fill="both", expand=True, padx=12, pady=6)
+        self.chart_frame = tk.Frame(master, bg="#121212")
+        self.chart_frame.pack(side="top", fill="both", expand=True, padx=12, pady=6)
+        # placeholder until matplotlib is loaded (see _build_chart)
+        self.chart_placeholder = tk.Label(self.chart_frame, text="Loading chart…", bg="#121212", fg="#888888", font=("Arial", 14))
+        self.chart_placeholder.pack(fill="both", expand=True)
+        self.price_lbl.config(text="Price: loading…")
+        self.fig = None
+        self.canvas = None
 
-        # create matplotlib figure with two axes (candles + volume)
+        # internal state
+        self.current_df = None
+        self.replay = None
+        self._replay_frame_pending = False
+        self.replay_frames_dropped = 0
+        self.auto_running = True
+        self.update_interval = UPDATE_INTERVAL_SEC
+
+        # event bus consumers: file / webhook / desktop notifier + this window's signals panel
+        self.bus_subs = events.attach_default_consumers()
+        self.bus_subs.append(events.BUS.subscribe(
+            lambda ev: self.master.after(0, lambda: self._on_bus_event(ev)),
+            topics=(events.SIGNAL, events.ORDER, events.OCO, events.FILL, events.ERROR),
+            maxsize=64, policy=events.MERGE, name="gui"))
+        # persistent trade journal (batched SQLite writes on its own thread)
+        self.journal = journal.TradeJournal()
+        self.bus_subs.append(self.journal.attach())
+        # pre-trade risk engine keeps positions / OCO counts from the same events
+        self.bus_subs.append(risk.ENGINE.attach())
+        self._risk_synced_at = 0.0
+        self.history_win = None
+        self.dashboard_win = None
+        # allocation tracking for long sessions (memwatch.py), sampled from the auto-updater
+        self.memwatch = memwatch.MemWatch()
+        self.memory_win = None
+        self._mem_sampled_at = time.time()
+        if MEMWATCH:
+            self.memwatch.start()
+
+        # all exchange I/O goes through one asyncio loop (prioritized queue, stale work cancelled)
+        self._refresh_job = None
+        self._meta_loading = False
+        self._paper = None
+        self._latency_logged_at = time.time()
+        self.io = io_core.IOCore(make_async_client, dispatch=lambda fn: self.master.after(0, fn)).start()
+        # open brackets, driven by execution reports (user data stream / paper broker), trailing + amend
+        self.positions = positions.PositionMonitor(
+            get_client, execute=lambda fn: self.io.submit_blocking(fn, io_core.PRIORITY_ORDER),
+            rules=exchange_meta.META.get,
+            publish_order=lambda o, s, side, q: self._publish_order(o, s, side, q, source="bracket close"))
+        self.positions_win = None
+        self._user_stream = None
+        self._bracket_symbols = ()
+        self.symbol_var.trace_add("write", lambda *a: self._on_selection_change())
+        self.interval_var.trace_add("write", lambda *a: self._on_selection_change())
+        if PAPER_TRADING:
+            self.on_paper_toggle()
+
+        # first frame is painted once Tk gets idle after building the widgets
+        master.after_idle(self._on_first_frame)
+        if FAST_STARTUP:
+            heavy.start_background(
+                on_done=lambda: self.master.after(0, self._on_heavy_ready),
+                on_error=lambda e: self.master.after(0, lambda: self._on_heavy_error(e)),
+            )
+        else:
+            heavy.ensure()
+            self._on_heavy_ready()
+
+    # -------------------------
+    # Startup (deferred heavy imports)
+    # -------------------------
+    def _on_first_frame(self):
+        self.master.update_idletasks()
+        STARTUP.mark("first_frame")
+
+    def _on_heavy_error(self, e):
+        self.chart_placeholder.config(text=f"Chart unavailable: {e}")
+        self.log(f"Startup error: {e}")
+
+    def _on_heavy_ready(self):
+        """ runs on the Tk main thread once pandas/matplotlib/binance are imported """
+        self._build_chart()
+        STARTUP.mark("chart_ready")
+        self.log(f"Startup timings -> {STARTUP.summary()}")
+        print("Startup timings:", STARTUP.summary())
+        # start background auto-updater
+        self.start_auto_updater()
+
+    def _build_chart(self):
+        self.chart_placeholder.destroy()
+        # create matplotlib figure with three axes (candles + RSI + volume)
         self.fig = plt.Figure(figsize=(10, 4), facecolor="#121212")
-        self.ax_candle = self.fig.add_axes([0.05, 0.25, 0.9, 0.7], facecolor="#121212")
-        self.ax_vol = self.fig.add_axes([0.05, 0.05, 0.9, 0.18], facecolor="#121212", sharex=self.ax_candle)
+        self.ax_candle = self.fig.add_axes([0.06, 0.45, 0.92, 0.49], facecolor="#121212")
+        self.ax_rsi = self.fig.add_axes([0.06, 0.31, 0.92, 0.12], facecolor="#121212", sharex=self.ax_candle)
+        self.ax_vol = self.fig.add_axes([0.06, 0.14, 0.92, 0.15], facecolor="#121212", sharex=self.ax_candle)
         # tidy styles
-        for ax in (self.ax_candle, self.ax_vol):
+        for ax in (self.ax_candle, self.ax_rsi, self.ax_vol):
             ax.tick_params(axis='x', colors='white')
             ax.tick_params(axis='y', colors='white')
             for spine in ax.spines.values():
                 spine.set_color('#333333')
 
-        self.canvas = FigureCanvasTkAgg(self.fig, master=chart_frame)
+        # candles / volume are three collections updated in place (no per-bar artists)
+        self.wick_lc = LineCollection([], linewidths=0.8)
+        self.body_pc = PolyCollection([], linewidths=0)
+        self.vol_pc = PolyCollection([], linewidths=0)
+        self.ax_candle.add_collection(self.wick_lc)
+        self.ax_candle.add_collection(self.body_pc)
+        self.ax_vol.add_collection(self.vol_pc)
+        self.ax_vol.xaxis.set_major_formatter(FuncFormatter(self._format_x))
+        self.ax_vol.tick_params(axis='x', rotation=45, labelsize=8, colors='white')
+        self.ax_candle.tick_params(axis='x', labelbottom=False)
+        self.ax_rsi.tick_params(axis='x', labelbottom=False)
+        self.ax_rsi.tick_params(axis='y', labelsize=7)
+        self.ax_rsi.set_ylim(0, 100)
+        self.ax_rsi.set_yticks([30, 70])
+        for y in (30, 70):
+            self.ax_rsi.axhline(y, color="#555555", linewidth=0.6, linestyle=":")
+        # indicator overlays (values from indicator_cache, only the newest bar is recomputed per tick)
+        self.overlay_lines = {
+            "EMA_20": self.ax_candle.plot([], [], color="#ffeb3b", linewidth=1.0, label="EMA 20")[0],
+            "EMA_50": self.ax_candle.plot([], [], color="#03a9f4", linewidth=1.0, label="EMA 50")[0],
+            "VWAP": self.ax_candle.plot([], [], color="#e040fb", linewidth=1.0, linestyle="--", label="VWAP")[0],
+            "RSI": self.ax_rsi.plot([], [], color="#ff9800", linewidth=1.0)[0],
+        }
+        self.level_line = self.ax_candle.axhline(0, color="#ff9800", linewidth=1.0, linestyle="--", visible=False)
+        # nearest swing support / resistance (swing_levels.py), one collection for all levels
+        self.sr_lc = LineCollection([], linewidths=0.9, linestyles="dotted")
+        self.ax_candle.add_collection(self.sr_lc)
+        self.swings = None
+        legend = self.ax_candle.legend(loc="upper left", fontsize=7, facecolor="#1e1e1e", edgecolor="#333333", labelcolor="white")
+        legend.set_zorder(5)
+        self.ind_cache = indicator_cache.IndicatorCache()
+        self.breakout_levels = {}   # symbol -> (level, "BUY"/"SELL") from detect_breakout_retest
+        self._up_rgba = matplotlib.colors.to_rgba_array("#4caf50")
+        self._down_rgba = matplotlib.colors.to_rgba_array("#f44336")
+        self.series = chart_lod.LODSeries()
+        self.series_key = None
+        self.view = (0.0, float(CHART_DEFAULT_VIEW))
+        self.history_exhausted = False
+        self._drag = None
+        self._chart_title = None
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.chart_frame)
         self.canvas.get_tk_widget().pack(fill="both", expand=True)
-
-        # internal state
-        self.current_df = pd.DataFrame()
-        self.auto_running = True
-        self.update_interval = UPDATE_INTERVAL_SEC
-
-        # start background auto-updater
-        self.start_auto_updater()
+        # mouse pan (drag) / zoom (wheel)
+        self.canvas.mpl_connect("scroll_event", self._on_chart_scroll)
+        self.canvas.mpl_connect("button_press_event", self._on_chart_press)
+        self.canvas.mpl_connect("motion_notify_event", self._on_chart_motion)
+        self.canvas.mpl_connect("button_release_event", self._on_chart_release)
 
     # -------------------------
     # Logging utility
@@ -238,42 +550,184 @@ class CryptoAppUI:
     def log(self, msg):
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.log_box.insert(tk.END, f"[{ts}] {msg}\n")
+        lines = int(self.log_box.index("end-1c").split(".")[0])
+        if lines > LOG_MAX_LINES:
+            self.log_box.delete("1.0", f"{lines - LOG_MAX_LINES}.0")
         self.log_box.see(tk.END)
 
+    # -------------------------
+    # Event bus
+    # -------------------------
+    SIGNAL_PANEL_MAX = 200
+
+    def _on_bus_event(self, ev):
+        d = ev.data
+        ts = datetime.fromtimestamp(ev.ts).strftime("%H:%M:%S")
+        if ev.topic == events.SIGNAL:
+            text = f"{ts} {d.get('symbol')} {d.get('signal')} conf={d.get('confidence')} {d.get('reason', '')}"
+        elif ev.topic == events.FILL:
+            text = f"{ts} FILL {d.get('symbol')} {d.get('side')} {d.get('qty')} @ {d.get('price')}"
+        elif ev.topic == events.ERROR:
+            text = f"{ts} ERROR {d.get('source', '')}: {d.get('message')}"
+        else:
+            text = f"{ts} {ev.topic.upper()} {d.get('symbol')} {d.get('side', '')} {d.get('status', '')}"
+        self.signal_list.insert(0, text)
+        if self.signal_list.size() > self.SIGNAL_PANEL_MAX:
+            self.signal_list.delete(self.SIGNAL_PANEL_MAX, tk.END)
+
+    def _publish_order(self, order, symbol, side, qty, source):
+        """ publish market order + its fills on the bus (called from trade workers) """
+        events.publish(events.ORDER, symbol=symbol, side=side, qty=qty, type="MARKET", source=source,
+                       order_id=order.get("orderId"), status=order.get("status"),
+                       quote_qty=order.get("cummulativeQuoteQty"))
+        for f in order.get("fills", []):
+            events.publish(events.FILL, symbol=symbol, side=side, order_id=order.get("orderId"),
+                           price=safe_float(f.get("price")), qty=safe_float(f.get("qty")),
+                           commission=safe_float(f.get("commission")), commission_asset=f.get("commissionAsset"),
+                           trade_id=f.get("tradeId"))
+
+    def _publish_oco(self, oco, symbol, side, qty, tp_price, sl_price, stop_limit_price, source):
+        events.publish(events.OCO, symbol=symbol, side=side, qty=qty, tp=tp_price, sl=sl_price,
+                       stop_limit=stop_limit_price, source=source,
+                       order_list_id=(oco or {}).get("orderListId"),
+                       legs=[{"order_id": r.get("orderId"), "type": r.get("type"), "price": r.get("price"),
+                              "stop_price": r.get("stopPrice"), "status": r.get("status")}
+                             for r in (oco or {}).get("orderReports", [])])
+
+    def _track_bracket(self, oco, symbol, side, qty, entry, tp_price, sl_price, stop_limit_price, source):
+        """ hand a placed OCO to the position monitor (the paper broker publishes its own fills) """
+        if oco:
+            self.positions.track(oco, symbol, side, qty, entry, tp_price, sl_price, stop_limit_price,
+                                 trail_pct=TRAIL_PCT, publish=paper_broker is None, source=source)
+
     # -------------------------
     # Background updater
     # -------------------------
-    def _background_loop(self):
-        while self.auto_running:
-            try:
-                self.fetch_and_update(show_levels=False)
-            except Exception as ex:
-                # schedule log update on main thread
-                self.master.after(0, lambda: self.log(f"Auto-update error: {ex}"))
-            time.sleep(self.update_interval)
+    def _auto_tick(self):
+        if not self.auto_running:
+            return
+        if self.replay is None:   # replay drives the UI instead
+            if self._refresh_job is None or self._refresh_job.finished:
+                self._refresh_job = self.request_refresh()   # a slow refresh is never superseded by the timer
+            self._sync_exchange_meta()
+            self._sync_bracket_streams()
+            if time.time() - self._latency_logged_at > LATENCY_REPORT_SEC:
+                self._latency_logged_at = time.time()
+                self._log_latency()
+            if time.time() - self._risk_synced_at > RISK_SYNC_SEC:
+                self._risk_synced_at = time.time()
+                if paper_broker is not None:
+                    risk.ENGINE.apply_account(paper_broker.get_account())
+                    risk.ENGINE.apply_open_orders(paper_broker.get_open_orders())
+                else:
+                    async def risk_job(c):
+                        # open orders too: the OCO count is recounted from the exchange, not only from events
+                        return await asyncio.gather(self.io.request("get_account"), self.io.request("get_open_orders"))
+                    self.io.submit(risk_job, io_core.PRIORITY_BACKGROUND, key="risk_sync",
+                                   on_done=self._apply_risk_sync,
+                                   on_error=lambda e: self.log(f"Risk sync error: {e}"))
+        if time.time() - self._mem_sampled_at > MEMWATCH_SAMPLE_SEC:
+            self._mem_sampled_at = time.time()
+            self._sample_memory()
+        self.master.after(int(self.update_interval * 1000), self._auto_tick)
+
+    def _apply_risk_sync(self, result):
+        account, open_orders = result
+        risk.ENGINE.apply_account(account)
+        risk.ENGINE.apply_open_orders(open_orders)
 
     def start_auto_updater(self):
-        t = threading.Thread(target=self._background_loop, daemon=True)
-        t.start()
+        self._auto_tick()
+
+    def _sync_exchange_meta(self):
+        """ exchangeInfo filters (disk cache, TTL) + server-time offset, refreshed in the background """
+        meta = exchange_meta.META
+        if meta.time_sync_due:
+            async def time_job(c):
+                t0 = time.time()
+                st = await self.io.request("get_server_time")
+                return meta.set_server_time(st["serverTime"], t0, time.time(), c, client)
+            self.io.submit(time_job, io_core.PRIORITY_BACKGROUND, key="time_sync",
+                           on_error=lambda e: self.log(f"Server time sync error: {e}"))
+        if not meta.fresh and not self._meta_loading:
+            self._meta_loading = True
+
+            async def info_job(c):
+                if not await asyncio.to_thread(meta.load_disk):
+                    info = await self.io.request("get_exchange_info")
+                    await asyncio.to_thread(meta.update, info)
+                return len(meta.symbols)
+
+            def loaded(n):
+                self._meta_loading = False
+                meta.apply_to_risk(risk.ENGINE)
+                self.log(f"Exchange info: {n} symbols (tick/step/min notional), clock offset {meta.time_offset_ms} ms")
+
+            def failed(e):
+                self._meta_loading = False
+                self.log(f"Exchange info error: {e}")
+            self.io.submit(info_job, io_core.PRIORITY_BACKGROUND, key="exchange_info", on_done=loaded, on_error=failed)
+
+    def _log_latency(self):
+        rep = self.io.latency_report()
+        r = rep.get("refresh")
+        if r and r["n"]:
+            self.latency_lbl.config(text=f"Refresh p50/p95/p99: {r['p50_ms']:.0f}/{r['p95_ms']:.0f}/{r['p99_ms']:.0f} ms")
+        k = rep.get("get_klines")
+        if k and (k["timeouts"] or k["hedges"] or k["retries"] or k["breaker"] != "closed"):
+            self.log(f"get_klines: p99 {k['p99_ms']} ms, timeouts {k['timeouts']}, hedges {k['hedges']} "
+                     f"(won {k['hedge_wins']}), retries {k['retries']}, breaker {k['breaker']}")
 
     def stop_auto_updater(self):
         self.auto_running = False
 
+    def _on_selection_change(self):
+        """ symbol / interval switched: fetch right away, superseding the in-flight fetch for the old one """
+        if self.canvas is not None and self.replay is None:
+            self.request_refresh(priority=io_core.PRIORITY_USER)
+
     # -------------------------
     # Fetch and update UI
     # -------------------------
-    def fetch_and_update(self, show_levels=False):
+    def request_refresh(self, show_levels=False, priority=io_core.PRIORITY_REFRESH):
         symbol = self.symbol_var.get()
         interval = self.interval_var.get()
-        try:
-            df = fetch_ohlcv_df(symbol=symbol, interval=interval, limit=CANDLES_LIMIT)
-            self.current_df = df
-            # schedule UI update in main thread
-            self.master.after(0, lambda: self.update_ui_from_df(df, show_levels))
-        except BinanceAPIException as e:
-            self.master.after(0, lambda: self.log(f"Binance API error: {e}"))
-        except Exception as e:
-            self.master.after(0, lambda: self.log(f"Fetch error: {e}"))
+
+        async def fetch(c):
+            src = data_client_override
+            if src is not None:
+                return src.get_klines(symbol=symbol, interval=interval, limit=CANDLES_LIMIT)
+            h = get_hub()
+            if h is not None:   # shared candles, no exchange request of our own
+                klines = await asyncio.to_thread(h.get_klines, symbol=symbol, interval=interval, limit=CANDLES_LIMIT)
+            else:
+                klines = await self.io.request("get_klines", symbol=symbol, interval=interval, limit=CANDLES_LIMIT)
+            await asyncio.to_thread(record_klines, symbol, interval, klines)
+            return klines
+
+        t0 = time.perf_counter()
+        return self.io.submit(fetch, priority, key="levels" if show_levels else "chart",
+                              on_done=lambda klines: self._on_klines(symbol, interval, klines, show_levels, t0),
+                              on_error=lambda e: self._on_fetch_error(symbol, e))
+
+    def _on_klines(self, symbol, interval, klines, show_levels, t0):
+        if (symbol, interval) != (self.symbol_var.get(), self.interval_var.get()):
+            return  # user switched away while this was in flight
+        self.io.record("refresh", time.perf_counter() - t0)   # queue wait + fetch, as the user sees it
+        if paper_broker is not None:
+            paper_broker.on_klines(symbol, klines)   # match resting paper orders
+        if klines:
+            self.positions.on_price(symbol, klines[-1][4])   # trailing stops of brackets on this symbol
+        df = klines_to_df(klines)
+        self.current_df = df
+        self.update_ui_from_df(df, show_levels)
+
+    def _on_fetch_error(self, symbol, e):
+        events.publish(events.ERROR, symbol=symbol, source="fetch", message=str(e))
+        if isinstance(e, BinanceAPIException):
+            self.log(f"Binance API error: {e}")
+        else:
+            self.log(f"Fetch error: {e}")
 
     def update_ui_from_df(self, df, show_levels=False):
         # update price
@@ -282,6 +736,8 @@ class CryptoAppUI:
         else:
             last_price = float(df["close"].iloc[-1])
             self.price_lbl.config(text=f"Price: {last_price:.6f}")
+            if self.replay is None:
+                risk.ENGINE.update_price(self.symbol_var.get(), last_price)
         # update chart
         try:
             self.draw_chart(df)
@@ -289,7 +745,7 @@ class CryptoAppUI:
             self.log(f"Chart draw error: {e}")
         # optionally compute levels
         if show_levels:
-            levels = compute_levels(df)
+            levels = compute_levels(df, self.symbol_var.get())
             if levels:
                 self.entry_lbl.config(text=f"Entry: {levels['entry']}")
                 self.sl_lbl.config(text=f"Stop Loss: {levels['sl']}")
@@ -302,81 +758,303 @@ class CryptoAppUI:
     # Draw chart (candles + volume)
     # -------------------------
     def draw_chart(self, df):
-        self.ax_candle.clear()
-        self.ax_vol.clear()
-        if df is None or df.empty:
-            self.ax_candle.set_title("No data", color="white")
+        if self.canvas is None:
+            return  # chart stack still loading
+        key = self._chart_key()
+        if key != self.series_key:
+            self._reset_series(key)
+        if df is not None and not df.empty:
+            at_end = self.view[1] >= len(self.series) - 0.5
+            self.series.merge(df.index.values.astype("datetime64[ms]").astype(np.int64), df["open"].values, df["high"].values,
+                              df["low"].values, df["close"].values, df["volume"].values)
+            if at_end or len(self.series) <= CHART_DEFAULT_VIEW:
+                # follow the live edge unless the user panned away from it
+                width = self.view[1] - self.view[0]
+                self.view = (len(self.series) - width, float(len(self.series)))
+            self._update_swings()
+        self._render_chart()
+
+    @staticmethod
+    def _kline_columns(klines):
+        a = np.asarray([k[:7] for k in klines], dtype=float)
+        return a[:, 6].astype(np.int64), a[:, 1], a[:, 2], a[:, 3], a[:, 4], a[:, 5]
+
+    def _history_klines(self, limit, before_close_ms=None):
+        """ older candles for the chart: replay buffer in replay mode, local store otherwise """
+        symbol, interval = self.series_key[0], self.series_key[1]
+        if self.replay is not None:
+            kl = self.replay.klines[:self.replay.cursor]
+            if before_close_ms is not None:
+                kl = [k for k in kl if k[6] < before_close_ms]
+            return kl[-limit:]
+        end_ms = None
+        if before_close_ms is not None:
+            end_ms = before_close_ms + 1 - candle_store.interval_ms(interval)
+        try:
+            return get_candle_store().load(symbol, interval, end_ms=end_ms, limit=limit)
+        except Exception as e:
+            self.log(f"History load error: {e}")
+            return []
+
+    def _reset_series(self, key):
+        if self.series_key is not None:
+            self.ind_cache.drop(self.series_key)   # only the on-screen series is ever drawn
+            if self.series_key[2] is not None:
+                swing_levels.CACHE.drop(self.series_key)   # replay levels are never reused
+        self.series_key = key
+        self.series = chart_lod.LODSeries()
+        self.history_exhausted = False
+        kl = self._history_klines(CHART_HISTORY_BARS)
+        if kl:
+            self.series.set_data(*self._kline_columns(kl))
+        self._update_swings()
+        n = float(len(self.series))
+        self.view = (n - CHART_DEFAULT_VIEW, n)
+
+    def _load_older(self):
+        if self.history_exhausted or not len(self.series):
+            return
+        kl = self._history_klines(CHART_HISTORY_CHUNK, before_close_ms=int(self.series.base["t"][0]))
+        added = self.series.prepend(*self._kline_columns(kl)) if kl else 0
+        if added <= 0:
+            self.history_exhausted = True
+            return
+        self.view = (self.view[0] + added, self.view[1] + added)
+        swing_levels.CACHE.drop(self._swing_key())   # older bars: rebuild the levels over the longer history
+        self._update_swings()
+
+    def _chart_key(self):
+        """ (symbol, interval, replay id or None) of the candles on screen now """
+        return (self.symbol_var.get(), self.interval_var.get(), id(self.replay) if self.replay else None)
+
+    def _swing_key(self, key=None):
+        """ live series share the strategy's (symbol, interval) index; replays get their own """
+        key = key or self.series_key
+        return key[:2] if key[2] is None else key
+
+    def _update_swings(self):
+        """ feed newly closed bars (everything but the forming last one) into the swing index """
+        n = len(self.series)
+        if n < 2:
+            self.swings = None
+            return
+        base = self.series.base
+        self.swings = swing_levels.CACHE.get(self._swing_key(), base["t"][:n - 1], base["h"][:n - 1], base["l"][:n - 1])
+
+    def _format_x(self, x, pos=None):
+        n = len(self.series)
+        if not n:
+            return ""
+        i = min(max(int(round(x)), 0), n - 1)
+        return datetime.utcfromtimestamp(self.series.base["t"][i] / 1000).strftime('%m-%d %H:%M')
+
+    def _render_chart(self):
+        n = len(self.series)
+        if not n:
+            self._set_title("No data")
+            self.wick_lc.set_segments([])
+            self.body_pc.set_verts([])
+            self.vol_pc.set_verts([])
+            self.sr_lc.set_segments([])
+            for line in self.overlay_lines.values():
+                line.set_data([], [])
             self.canvas.draw_idle()
             return
+        i0, i1 = self.view
+        width_px = max(50, self.ax_candle.get_window_extent().width)
+        b = self.series.buckets(math.floor(i0), math.ceil(i1), int(width_px / CHART_PX_PER_BUCKET))
+        x, o, h, l, c, v = b["x"], b["o"], b["h"], b["l"], b["c"], b["v"]
+        if len(x):
+            half = b["width"] * CHART_CANDLE_WIDTH_MIN / 2
+            up = c >= o
+            colors = np.where(up[:, None], self._up_rgba, self._down_rgba)
+            lo, hi = float(l.min()), float(h.max())
+            bottom = np.minimum(o, c)
+            top = np.maximum(np.maximum(o, c), bottom + (hi - lo) * 0.001)
+            self.wick_lc.set_segments(np.stack([np.column_stack([x, l]), np.column_stack([x, h])], axis=1))
+            self.wick_lc.set_colors(colors)
+            self.body_pc.set_verts(np.stack([np.column_stack([x - half, bottom]), np.column_stack([x + half, bottom]),
+                                             np.column_stack([x + half, top]), np.column_stack([x - half, top])], axis=1))
+            self.body_pc.set_facecolors(colors)
+            zero = np.zeros_like(v)
+            self.vol_pc.set_verts(np.stack([np.column_stack([x - half, zero]), np.column_stack([x + half, zero]),
+                                            np.column_stack([x + half, v]), np.column_stack([x - half, v])], axis=1))
+            self.vol_pc.set_facecolors(colors)
+            pad = (hi - lo) * 0.05 or hi * 0.001 or 1.0
+            self.ax_candle.set_ylim(lo - pad, hi + pad)
+            self.ax_vol.set_ylim(0, float(v.max()) * 1.1 or 1.0)
+            self._render_overlays(b)
+        self.ax_candle.set_xlim(i0 - 0.5, i1 - 0.5)
+        per = f" ({b['width']} bars/candle)" if b["width"] > 1 else ""
+        self._set_title(f"{self.symbol_var.get()} - Candles{per}")
+        self.canvas.draw_idle()
 
-        # draw candles
-        df_plot = df.copy().tail(CANDLES_LIMIT)
-        dates = mdates.date2num(df_plot.index.to_pydatetime())
-        width = (dates[1] - dates[0]) * CHART_CANDLE_WIDTH_MIN if len(dates) > 1 else 0.0007
-
-        for idx, (dt_idx, row) in enumerate(df_plot.iterrows()):
-            o, h, l, c = row["open"], row["high"], row["low"], row["close"]
-            color = "#4caf50" if c >= o else "#f44336"
-            # wick
-            self.ax_candle.plot([dates[idx], dates[idx]], [l, h], color=color, linewidth=0.8)
-            # body
-            lower = o if c >= o else c
-            height = abs(c - o)
-            if height == 0:
-                height = (df_plot["close"].max() - df_plot["close"].min()) * 0.001 or 0.0000001
-            rect = Rectangle((dates[idx] - width/2, lower), width, height, facecolor=color, edgecolor=color)
-            self.ax_candle.add_patch(rect)
-
-        # x formatting
-        self.ax_candle.xaxis_date()
-        self.ax_candle.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
-        self.ax_candle.tick_params(axis='x', rotation=45, labelsize=8, colors='white')
-        self.ax_candle.tick_params(axis='y', colors='white')
-        self.ax_candle.set_facecolor("#121212")
-        self.ax_candle.set_title(f"{self.symbol_var.get()} - Candles", color="white")
-
-        # volume bars
-        vols = df_plot["volume"].values
-        vol_dates = dates
-        vol_colors = ["#4caf50" if df_plot["close"].iloc[i] >= df_plot["open"].iloc[i] else "#f44336" for i in range(len(df_plot))]
-        self.ax_vol.bar(vol_dates, vols, width=width*0.9, color=vol_colors)
-        self.ax_vol.set_facecolor("#121212")
-        self.ax_vol.tick_params(axis='y', colors='white')
-        self.ax_vol.xaxis_date()
-        self.ax_vol.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
-        self.ax_vol.tick_params(axis='x', rotation=45, labelsize=8, colors='white')
+    def _set_title(self, text):
+        """ only touch the title artist when the text changes (set_title allocates on every call) """
+        if text != self._chart_title:
+            self._chart_title = text
+            self.ax_candle.set_title(text, color="white")
+
+    def _render_overlays(self, b):
+        """ EMA/VWAP/RSI at each visible bucket's last bar, swing S/R levels + the strategy's breakout level """
+        base = self.series.base
+        state = self.ind_cache.get(self.series_key, base["t"], base["h"], base["l"], base["c"], base["v"])
+        x = b["x"]
+        idx = np.minimum((x + (b["width"] - 1) / 2).astype(np.int64), len(self.series) - 1)
+        for name, vals in state.values_at(idx).items():
+            self.overlay_lines[name].set_data(x, vals)
+        level = self.breakout_levels.get(self.series_key[0])
+        if level:
+            self.level_line.set_ydata([level[0], level[0]])
+            self.level_line.set_color({"BUY": "#4caf50", "SELL": "#f44336"}.get(level[1], "#ff9800"))
+            self.level_line.set_visible(True)
+        else:
+            self.level_line.set_visible(False)
+        if self.swings is not None and len(x):
+            above, below = self.swings.nearest(float(base["c"][len(self.series) - 1]), SR_LEVELS)
+            x0, x1 = float(x[0]) - b["width"], float(x[-1]) + b["width"]
+            self.sr_lc.set_segments([[(x0, lv.price), (x1, lv.price)] for lv in above + below])
+            # more touches -> more opaque
+            self.sr_lc.set_colors([(0.96, 0.26, 0.21, min(1.0, 0.25 + 0.1 * lv.touches)) for lv in above]
+                                  + [(0.30, 0.69, 0.31, min(1.0, 0.25 + 0.1 * lv.touches)) for lv in below])
+        else:
+            self.sr_lc.set_segments([])
 
-        self.fig.tight_layout()
-        self.canvas.draw_idle()
+    def set_breakout_level(self, symbol, level, kind):
+        self.breakout_levels[symbol] = (level, kind)
+        if self.canvas is not None and self.series_key and self.series_key[0] == symbol:
+            self._render_chart()
+
+    # -------------------------
+    # Chart pan / zoom
+    # -------------------------
+    def _set_view(self, i0, i1):
+        n = len(self.series)
+        width = min(max(i1 - i0, CHART_MIN_VIEW), max(n, CHART_MIN_VIEW))
+        if i0 < 0:
+            self._load_older()   # may shift the view right by the number of bars added
+            shift = len(self.series) - n
+            i0 += shift
+            i0 = max(i0, 0.0)
+        i1 = min(i0 + width, float(len(self.series)))
+        self.view = (i1 - width, i1)
+        self._render_chart()
+
+    def _on_chart_scroll(self, event):
+        if event.inaxes not in (self.ax_candle, self.ax_rsi, self.ax_vol) or not len(self.series):
+            return
+        i0, i1 = self.view
+        factor = 0.8 if event.button == "up" else 1.25
+        anchor = event.xdata if event.xdata is not None else i1
+        frac = (anchor - i0) / ((i1 - i0) or 1)
+        width = (i1 - i0) * factor
+        self._set_view(anchor - frac * width, anchor - frac * width + width)
+
+    def _on_chart_press(self, event):
+        if event.button == 1 and event.inaxes in (self.ax_candle, self.ax_rsi, self.ax_vol):
+            self._drag = (event.x, self.view)
+
+    def _on_chart_motion(self, event):
+        if self._drag is None or event.x is None:
+            return
+        x0, (i0, i1) = self._drag
+        bars_per_px = (i1 - i0) / max(1.0, self.ax_candle.get_window_extent().width)
+        dx = (event.x - x0) * bars_per_px
+        self._set_view(i0 - dx, i1 - dx)
+        if self.view[0] != i0 - dx:
+            # history got prepended / clamped: re-anchor the drag
+            self._drag = (event.x, self.view)
+
+    def _on_chart_release(self, event):
+        self._drag = None
 
     # -------------------------
     # UI callbacks
     # -------------------------
     def on_get_levels(self):
         # fetch and display levels once (non-blocking)
-        threading.Thread(target=lambda: self.fetch_and_update(show_levels=True), daemon=True).start()
+        self.request_refresh(show_levels=True, priority=io_core.PRIORITY_USER)
             # -------------------------
     # Strategy integration: Scan and optional auto-execute
     # -------------------------
     def on_scan_strategy(self):
-        """ Called by button -> runs strategy in background """
-        threading.Thread(target=self._scan_worker, daemon=True).start()
+        """ Called by button -> klines fetched on the I/O loop, strategy runs off the UI thread """
+        symbol = self.symbol_var.get()
+        interval = self.interval_var.get()
+        replaying = self.replay is not None
+        swing_key = self._swing_key(self._chart_key())
+        self.log(f"Scanning strategy for {symbol} @ {interval}...")
+
+        async def scan(c):
+            await asyncio.to_thread(heavy.ensure)  # strategy module is loaded lazily
+            # one download sized for the hungriest registered strategy, one indicator pass for all of them
+            limit = strategies.ENGINE.history()
+            src = data_client_override or get_hub()
+            if src is not None:
+                klines = await asyncio.to_thread(src.get_klines, symbol=symbol, interval=interval, limit=limit)
+            else:
+                klines = await self.io.request("get_klines", symbol=symbol, interval=interval, limit=limit)
+            return await asyncio.to_thread(strategies.ENGINE.run, symbol, interval, klines, swing_key=swing_key)
+
+        def failed(e):
+            events.publish(events.ERROR, symbol=symbol, source="strategy", message=str(e))
+            self.log(f"Strategy error: {e}")
 
-    def _scan_worker(self):
-        """ Background worker: runs strategy.detect_breakout_retest and updates UI """
+        self.io.submit(scan, io_core.PRIORITY_USER, key="scan",
+                       on_done=lambda results: self._on_scan_results(symbol, interval, results, True, replaying),
+                       on_error=failed)
+
+    def _scan_worker(self, interactive=True):
+        """
+        Synchronous scan (replay thread, "scan each bar"): runs every registered strategy and updates UI.
+        interactive=False: no progress logs, never offers to place an order.
+        """
         symbol = self.symbol_var.get()
         interval = self.interval_var.get()
+        replaying = self.replay is not None
+        swing_key = self._swing_key(self._chart_key())
         # log start
-        self.master.after(0, lambda: self.log(f"Scanning strategy for {symbol} @ {interval}..."))
+        if interactive:
+            self.master.after(0, lambda: self.log(f"Scanning strategy for {symbol} @ {interval}..."))
 
         try:
-            res = strategy.detect_breakout_retest(symbol=symbol, interval=interval)
+            heavy.ensure()  # strategy module is loaded lazily
+            results = strategies.ENGINE.run(symbol, interval, swing_key=swing_key)   # candles come from the replay client
         except Exception as e:
-            self.master.after(0, lambda: self.log(f"Strategy error: {e}"))
+            events.publish(events.ERROR, symbol=symbol, source="strategy", message=str(e))
+            self.master.after(0, lambda e=e: self.log(f"Strategy error: {e}"))
             return
+        self._on_scan_results(symbol, interval, results, interactive, replaying)
+
+    def _on_scan_results(self, symbol, interval, results, interactive, replaying):
+        """ breakout/retest drives the levels, chart marker and order prompt; other strategies only signal """
+        for name, res in results.items():
+            if "error" in res:
+                events.publish(events.ERROR, symbol=symbol, source=f"strategy {name}", message=res["error"])
+            if name == "breakout_retest":
+                self._on_scan_result(symbol, interval, res, interactive, replaying)
+            elif res.get("signal") in ("BUY", "SELL"):
+                events.publish(events.SIGNAL, symbol=symbol, interval=interval,
+                               strategy=f"{name} (replay)" if replaying else name,
+                               signal=res["signal"], confidence=res.get("confidence"), reason=res.get("reason", ""),
+                               entry=res.get("entry"), sl=res.get("sl"), tp=res.get("tp"))
+
+    def _on_scan_result(self, symbol, interval, res, interactive, replaying):
+        events.publish(events.SIGNAL, symbol=symbol, interval=interval,
+                       strategy="breakout_retest (replay)" if replaying else "breakout_retest",
+                       signal=res.get("signal"), confidence=res.get("confidence", 0), reason=res.get("reason", ""),
+                       entry=res.get("entry"), sl=res.get("sl"), tp=res.get("tp"))
+
+        if res.get("level") is not None:
+            kind = res.get("signal") if res.get("signal") in ("BUY", "SELL") else None
+            level = res["level"]
+            self.master.after(0, lambda: self.set_breakout_level(symbol, level, kind))
 
         # handle result on main thread
         if res.get("signal") in ("BUY", "SELL"):
+            if not replaying and res.get("sl") and res.get("tp"):
+                # open brackets on this symbol follow the strategy's current levels
+                self.positions.amend_symbol(symbol, res["signal"], tp=res["tp"], sl=res["sl"])
             entry = res.get("entry")
             sl = res.get("sl")
             tp = res.get("tp")
@@ -386,13 +1064,15 @@ class CryptoAppUI:
             self.master.after(0, lambda: self.sl_lbl.config(text=f"Stop Loss: {sl}"))
             self.master.after(0, lambda: self.tp_lbl.config(text=f"Target: {tp}"))
             self.master.after(0, lambda: self.log(f"STRATEGY -> {res['signal']} conf={conf} reason={reason}"))
+            if not interactive or (replaying and paper_broker is None):
+                return  # replayed prices are only tradeable on the paper broker
             # ask user whether to place order
             def ask_place():
                 place = messagebox.askyesno("Place Order?", f"{res['signal']} {symbol} ?\nEntry: {entry}\nSL: {sl}\nTP: {tp}\n\nPlace market order + OCO?")
                 if place:
-                    threading.Thread(target=lambda: self._trade_worker_with_levels(res), daemon=True).start()
+                    self.io.submit_blocking(lambda: self._trade_worker_with_levels(res))
             self.master.after(0, ask_place)
-        else:
+        elif interactive:
             reason = res.get("reason", "no_signal")
             self.master.after(0, lambda: self.log(f"STRATEGY -> No valid signal ({reason})"))
 
@@ -408,71 +1088,124 @@ class CryptoAppUI:
         except:
             self.master.after(0, lambda: messagebox.showerror("Qty Error", "Invalid qty"))
             return
+        rules = self._order_rules(symbol, qty, price=res.get("entry"))
+        if rules is None:
+            return
+        f, qty_s = rules
+        qty = float(qty_s)
+        if not self._risk_ok(symbol, side, qty, price=res.get("entry")):
+            return
 
         try:
             self.master.after(0, lambda: self.log(f"Placing MARKET {side} for {symbol} qty={qty} (strategy)"))
-            order = client.create_order(symbol=symbol, side=side, type="MARKET", quantity=qty)
+            order = get_client().create_order(symbol=symbol, side=side, type="MARKET", quantity=qty_s)
+            self._publish_order(order, symbol, side, qty, source="strategy")
             # get executed price if available
             fills = order.get("fills", [])
             exec_price = None
             if fills:
                 exec_price = safe_float(fills[0].get("price", None))
             else:
-                ticker = client.get_symbol_ticker(symbol=symbol)
+                ticker = get_client().get_symbol_ticker(symbol=symbol)
                 exec_price = safe_float(ticker.get("price", None))
             exec_price = exec_price or 0.0
 
-            # use sl/tp from res (already computed)
-            sl_price = res.get("sl")
-            tp_price = res.get("tp")
+            # use sl/tp from res (already computed), snapped to the tick size
+            sl_price = float(f.price(res.get("sl")))
+            tp_price = float(f.price(res.get("tp")))
 
-            if side == "BUY":
+            if not f.oco_allowed:
+                self.master.after(0, lambda: self.log(f"⚠️ OCO not allowed on {symbol}: position opened without bracket"))
+            elif side == "BUY":
                 # create OCO SELL (TP above, stop below)
                 try:
                     self.master.after(0, lambda: self.log(f"Placing OCO SELL: qty={qty}, TP={tp_price}, SL={sl_price}"))
-                    oco = client.create_oco_order(
+                    oco = get_client().create_oco_order(
                         symbol=symbol,
                         side="SELL",
-                        quantity=qty,
-                        price=str(tp_price),
-                        stopPrice=str(sl_price),
-                        stopLimitPrice=str(round(sl_price * 0.999, 8)),
+                        quantity=qty_s,
+                        price=f.price(tp_price),
+                        stopPrice=f.price(sl_price),
+                        stopLimitPrice=f.price(sl_price * 0.999),
                         stopLimitTimeInForce='GTC'
                     )
+                    self._publish_oco(oco, symbol, "SELL", qty, tp_price, sl_price, float(f.price(sl_price * 0.999)), source="strategy")
+                    self._track_bracket(oco, symbol, "SELL", qty, exec_price, tp_price, sl_price, float(f.price(sl_price * 0.999)), "strategy")
                     self.master.after(0, lambda: self.log(f"✅ Strategy BUY executed @{exec_price}. OCO placed. TP={tp_price} SL={sl_price}"))
                 except BinanceAPIException as e:
-                    self.master.after(0, lambda: self.log(f"❌ OCO create error: {e}"))
-                    self.master.after(0, lambda: messagebox.showerror("OCO Error", str(e)))
+                    events.publish(events.ERROR, symbol=symbol, source="oco", message=str(e))
+                    self.master.after(0, lambda e=e: self.log(f"❌ OCO create error: {e}"))
+                    self.master.after(0, lambda e=e: messagebox.showerror("OCO Error", str(e)))
             else:
                 # SELL -> OCO BUY
                 try:
                     self.master.after(0, lambda: self.log(f"Placing OCO BUY: qty={qty}, TP={tp_price}, SL={sl_price}"))
-                    oco = client.create_oco_order(
+                    oco = get_client().create_oco_order(
                         symbol=symbol,
                         side="BUY",
-                        quantity=qty,
-                        price=str(tp_price),
-                        stopPrice=str(sl_price),
-                        stopLimitPrice=str(round(sl_price * 1.001, 8)),
+                        quantity=qty_s,
+                        price=f.price(tp_price),
+                        stopPrice=f.price(sl_price),
+                        stopLimitPrice=f.price(sl_price * 1.001),
                         stopLimitTimeInForce='GTC'
                     )
+                    self._publish_oco(oco, symbol, "BUY", qty, tp_price, sl_price, float(f.price(sl_price * 1.001)), source="strategy")
+                    self._track_bracket(oco, symbol, "BUY", qty, exec_price, tp_price, sl_price, float(f.price(sl_price * 1.001)), "strategy")
                     self.master.after(0, lambda: self.log(f"✅ Strategy SELL executed @{exec_price}. OCO placed. TP={tp_price} SL={sl_price}"))
                 except BinanceAPIException as e:
-                    self.master.after(0, lambda: self.log(f"❌ OCO create error: {e}"))
-                    self.master.after(0, lambda: messagebox.showerror("OCO Error", str(e)))
+                    events.publish(events.ERROR, symbol=symbol, source="oco", message=str(e))
+                    self.master.after(0, lambda e=e: self.log(f"❌ OCO create error: {e}"))
+                    self.master.after(0, lambda e=e: messagebox.showerror("OCO Error", str(e)))
 
             self.master.after(0, lambda: self.log(f"Order response: id={order.get('orderId','NA')} status={order.get('status','NA')}"))
         except BinanceAPIException as e:
-            self.master.after(0, lambda: self.log(f"Binance API Error (strategy trade): {e}"))
-            self.master.after(0, lambda: messagebox.showerror("Trade Error", str(e)))
+            events.publish(events.ERROR, symbol=symbol, source="strategy_trade", message=str(e))
+            self.master.after(0, lambda e=e: self.log(f"Binance API Error (strategy trade): {e}"))
+            self.master.after(0, lambda e=e: messagebox.showerror("Trade Error", str(e)))
         except Exception as ex:
-            self.master.after(0, lambda: self.log(f"Trade exception: {ex}"))
-            self.master.after(0, lambda: messagebox.showerror("Trade Exception", str(ex)))
+            events.publish(events.ERROR, symbol=symbol, source="trade", message=str(ex))
+            self.master.after(0, lambda ex=ex: self.log(f"Trade exception: {ex}"))
+            self.master.after(0, lambda ex=ex: messagebox.showerror("Trade Exception", str(ex)))
+
 
+    def _risk_ok(self, symbol, side, qty, price=None):
+        """ pre-trade check (risk.py, in-memory) -> log + popup on reject """
+        decision = risk.ENGINE.check(symbol, side, qty, price=price)
+        if not decision:
+            self.master.after(0, lambda: self.log(f"⛔ Risk reject {side} {qty} {symbol}: {decision.reason}"))
+            self.master.after(0, lambda: messagebox.showwarning("Order Rejected", decision.reason))
+            return False
+        return True
 
     def on_trade(self, side):
-        # wrapper called by button to place market order then OCO
-        threading.Thread(target=lambda: self._trade_worker(side), daemon=True).start()
+        # wrapper called by button to place market order then OCO (orders run one at a time, never cancelled)
+        self.io.submit_blocking(lambda: self._trade_worker(side))
+
+    def _order_rules(self, symbol, qty, price=None):
+        """
+        exchangeInfo filters + fresh clock offset for an order (order thread; loads/fetches once if needed).
+        Returns (filters, qty rounded to step as str) or None after telling the user why not.
+        """
+        meta = exchange_meta.META
+        try:
+            meta.ensure(get_client())   # the paper broker forwards exchangeInfo to its market client
+            if meta.time_sync_due and paper_broker is None:
+                meta.sync_time(get_live_client())
+        except Exception as e:
+            self.master.after(0, lambda e=e: self.log(f"Exchange info unavailable: {e}"))
+            self.master.after(0, lambda e=e: messagebox.showerror("Order Error", f"Exchange info unavailable: {e}"))
+            return None
+        f = meta.get(symbol)
+        if f is None:
+            self.master.after(0, lambda: messagebox.showerror("Order Error", f"{symbol} is not listed on the exchange"))
+            return None
+        qty_s = f.qty(qty)
+        problem = f.check(qty_s, price or risk.ENGINE.prices.get(symbol))
+        if problem:
+            self.master.after(0, lambda: self.log(f"⛔ {symbol}: {problem}"))
+            self.master.after(0, lambda: messagebox.showwarning("Order Rejected", problem))
+            return None
+        return f, qty_s
 
     def _trade_worker(self, side):
         symbol = self.symbol_var.get()
@@ -484,11 +1217,19 @@ class CryptoAppUI:
         except:
             self.master.after(0, lambda: messagebox.showerror("Qty Error", "Invalid quantity"))
             return
+        rules = self._order_rules(symbol, qty)
+        if rules is None:
+            return
+        f, qty_s = rules
+        qty = float(qty_s)
+        if not self._risk_ok(symbol, side, qty):
+            return
 
         try:
             # Place market order first
             self.master.after(0, lambda: self.log(f"Placing MARKET {side} for {symbol} qty={qty}"))
-            order = client.create_order(symbol=symbol, side=side, type="MARKET", quantity=qty)
+            order = get_client().create_order(symbol=symbol, side=side, type="MARKET", quantity=qty_s)
+            self._publish_order(order, symbol, side, qty, source="manual")
             # try to read executed price (fills may be present)
             fills = order.get("fills", [])
             exec_price = None
@@ -496,7 +1237,7 @@ class CryptoAppUI:
                 exec_price = safe_float(fills[0].get("price", None))
             else:
                 # fallback to last price from ticker
-                ticker = client.get_symbol_ticker(symbol=symbol)
+                ticker = get_client().get_symbol_ticker(symbol=symbol)
                 exec_price = safe_float(ticker.get("price", None))
 
             if exec_price is None:
@@ -509,90 +1250,595 @@ class CryptoAppUI:
             sl_pct = safe_float(self.sl_pct_var.get(), default=SL_PCT*100) / 100.0
             tp_pct = safe_float(self.tp_pct_var.get(), default=TP_PCT*100) / 100.0
 
-            if side == "BUY":
-                sl_price = round(exec_price * (1 - sl_pct), 8 if exec_price < 1 else 6)
-                tp_price = round(exec_price * (1 + tp_pct), 8 if exec_price < 1 else 6)
+            if not f.oco_allowed:
+                self.master.after(0, lambda: self.log(f"⚠️ OCO not allowed on {symbol}: position opened without bracket"))
+            elif side == "BUY":
+                sl_price = float(f.price(exec_price * (1 - sl_pct)))
+                tp_price = float(f.price(exec_price * (1 + tp_pct)))
                 # create OCO SELL order (take profit and stop loss)
                 try:
                     self.master.after(0, lambda: self.log(f"Placing OCO SELL: qty={qty}, TP={tp_price}, SL={sl_price}"))
-                    oco = client.create_oco_order(
+                    oco = get_client().create_oco_order(
                         symbol=symbol,
                         side="SELL",
-                        quantity=qty,
-                        price=str(tp_price),
-                        stopPrice=str(sl_price),
-                        stopLimitPrice=str(round(sl_price * 0.999, 6)),
+                        quantity=qty_s,
+                        price=f.price(tp_price),
+                        stopPrice=f.price(sl_price),
+                        stopLimitPrice=f.price(sl_price * 0.999),
                         stopLimitTimeInForce='GTC'
                     )
+                    self._publish_oco(oco, symbol, "SELL", qty, tp_price, sl_price, float(f.price(sl_price * 0.999)), source="manual")
+                    self._track_bracket(oco, symbol, "SELL", qty, exec_price, tp_price, sl_price, float(f.price(sl_price * 0.999)), "manual")
                     self.master.after(0, lambda: self.log(f"✅ BUY executed @{exec_price}. OCO placed. TP={tp_price} SL={sl_price}"))
                 except BinanceAPIException as e:
-                    self.master.after(0, lambda: self.log(f"❌ OCO create error: {e}"))
-                    self.master.after(0, lambda: messagebox.showerror("OCO Error", str(e)))
+                    events.publish(events.ERROR, symbol=symbol, source="oco", message=str(e))
+                    self.master.after(0, lambda e=e: self.log(f"❌ OCO create error: {e}"))
+                    self.master.after(0, lambda e=e: messagebox.showerror("OCO Error", str(e)))
             else:
                 # SELL then OCO BUY to lock profit / SL above
-                sl_price = round(exec_price * (1 + sl_pct), 8 if exec_price < 1 else 6)
-                tp_price = round(exec_price * (1 - tp_pct), 8 if exec_price < 1 else 6)
+                sl_price = float(f.price(exec_price * (1 + sl_pct)))
+                tp_price = float(f.price(exec_price * (1 - tp_pct)))
                 try:
                     self.master.after(0, lambda: self.log(f"Placing OCO BUY: qty={qty}, TP={tp_price}, SL={sl_price}"))
-                    oco = client.create_oco_order(
+                    oco = get_client().create_oco_order(
                         symbol=symbol,
                         side="BUY",
-                        quantity=qty,
-                        price=str(tp_price),
-                        stopPrice=str(sl_price),
-                        stopLimitPrice=str(round(sl_price * 1.001, 6)),
+                        quantity=qty_s,
+                        price=f.price(tp_price),
+                        stopPrice=f.price(sl_price),
+                        stopLimitPrice=f.price(sl_price * 1.001),
                         stopLimitTimeInForce='GTC'
                     )
+                    self._publish_oco(oco, symbol, "BUY", qty, tp_price, sl_price, float(f.price(sl_price * 1.001)), source="manual")
+                    self._track_bracket(oco, symbol, "BUY", qty, exec_price, tp_price, sl_price, float(f.price(sl_price * 1.001)), "manual")
                     self.master.after(0, lambda: self.log(f"✅ SELL executed @{exec_price}. OCO placed. TP={tp_price} SL={sl_price}"))
                 except BinanceAPIException as e:
-                    self.master.after(0, lambda: self.log(f"❌ OCO create error: {e}"))
-                    self.master.after(0, lambda: messagebox.showerror("OCO Error", str(e)))
+                    events.publish(events.ERROR, symbol=symbol, source="oco", message=str(e))
+                    self.master.after(0, lambda e=e: self.log(f"❌ OCO create error: {e}"))
+                    self.master.after(0, lambda e=e: messagebox.showerror("OCO Error", str(e)))
 
             # append order summary to logs
             self.master.after(0, lambda: self.log(f"Order response: id={order.get('orderId','NA')} status={order.get('status','NA')}"))
         except BinanceAPIException as e:
-            self.master.after(0, lambda: self.log(f"Binance API Error (trade): {e}"))
-            self.master.after(0, lambda: messagebox.showerror("Trade Error", str(e)))
+            events.publish(events.ERROR, symbol=symbol, source="trade", message=str(e))
+            self.master.after(0, lambda e=e: self.log(f"Binance API Error (trade): {e}"))
+            self.master.after(0, lambda e=e: messagebox.showerror("Trade Error", str(e)))
         except Exception as ex:
-            self.master.after(0, lambda: self.log(f"Trade exception: {ex}"))
-            self.master.after(0, lambda: messagebox.showerror("Trade Exception", str(ex)))
+            events.publish(events.ERROR, symbol=symbol, source="trade", message=str(ex))
+            self.master.after(0, lambda ex=ex: self.log(f"Trade exception: {ex}"))
+            self.master.after(0, lambda ex=ex: messagebox.showerror("Trade Exception", str(ex)))
+
+    # -------------------------
+    # Historical replay (replay.py)
+    # -------------------------
+    def on_replay_csv(self):
+        path = filedialog.askopenfilename(title="Kline CSV", filetypes=[("CSV", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            klines = candle_store.load_csv(path)
+        except Exception as e:
+            messagebox.showerror("Replay", f"Could not read {path}: {e}")
+            return
+        self._start_replay(klines)
+
+    def on_replay_store(self):
+        symbol, interval = self.symbol_var.get(), self.interval_var.get()
+        span = get_candle_store().span(symbol, interval)
+        if not span:
+            messagebox.showinfo("Replay", f"No recorded {symbol} {interval} candles in the local store yet")
+            return
+        start = span[1] - REPLAY_STORE_DAYS * 86400 * 1000
+        self._start_replay(get_candle_store().load(symbol, interval, start_ms=start))
+
+    def _start_replay(self, klines):
+        global data_client_override
+        self.on_replay_stop()
+        heavy.ensure()
+        try:
+            speed = float(self.replay_speed_var.get())
+        except ValueError:
+            speed = 60.0
+        try:
+            rp = replay.CandleReplay(klines, self.symbol_var.get(), self.interval_var.get(),
+                                     on_bar=self._on_replay_bar, on_done=lambda r: self.master.after(0, self._on_replay_done),
+                                     speed=speed, warmup=max(CANDLES_LIMIT, 200))
+        except ValueError as e:
+            messagebox.showerror("Replay", str(e))
+            return
+        self.replay = rp
+        self.replay_frames_dropped = 0
+        if paper_broker is not None:
+            paper_broker.reset_market(rp.symbol)   # replayed bars are older than the live ones it has seen
+        # chart / levels / strategy read candles from the replayer from now on
+        data_client_override = rp
+        self._live_strategy_client = strategy.set_client(rp)
+        for b in (self.replay_play_btn, self.replay_step_btn, self.replay_stop_btn):
+            b.config(state="normal")
+        self.replay_play_btn.config(text="⏸")
+        self.log(f"Replay started: {len(klines)} candles {rp.symbol} {rp.interval} @ x{rp.speed:g}")
+        rp.start()
+
+    def _on_replay_bar(self, rp):
+        """ replay thread: one new bar released -> same UI path as the auto-updater """
+        df = klines_to_df(rp.get_klines(limit=CANDLES_LIMIT))
+        if paper_broker is not None:
+            paper_broker.on_klines(rp.symbol, rp.klines[rp.cursor - 1:rp.cursor])
+        self.current_df = df
+        if self.replay_scan_var.get():
+            self._scan_worker(interactive=False)
+        # at high speed the UI can't draw every bar: keep at most one frame queued, drop the rest
+        if self._replay_frame_pending:
+            self.replay_frames_dropped += 1
+            return
+        self._replay_frame_pending = True
+        self.master.after(0, self._draw_replay_frame)
+
+    def _draw_replay_frame(self):
+        self._replay_frame_pending = False
+        rp = self.replay
+        if rp is None:
+            return
+        self.update_ui_from_df(self.current_df, show_levels=False)
+        st = rp.stats()
+        self.replay_lbl.config(text=f"{st['cursor']}/{st['total']} bars  x{st['speed']:g}  "
+                                    f"{st['bars_per_sec']:.1f} bars/s  busy {st['busy_pct']:.0f}%  "
+                                    f"dropped frames {self.replay_frames_dropped}")
+
+    def on_replay_toggle(self):
+        if self.replay is None:
+            return
+        if self.replay.paused:
+            self.replay.resume()
+            self.replay_play_btn.config(text="⏸")
+        else:
+            self.replay.pause()
+            self.replay_play_btn.config(text="▶")
+
+    def on_replay_step(self):
+        if self.replay is not None:
+            if not self.replay.paused:
+                self.on_replay_toggle()
+            self.replay.step()
+
+    def on_replay_speed(self):
+        if self.replay is not None:
+            try:
+                self.replay.set_speed(float(self.replay_speed_var.get()))
+            except ValueError:
+                pass
+
+    def _on_replay_done(self):
+        if self.replay is not None and self.replay.finished:
+            st = self.replay.stats()
+            self.log(f"Replay finished: {st['bars']} bars, {st['bars_per_sec']:.1f} bars/s, "
+                     f"busy {st['busy_pct']:.0f}%, dropped frames {self.replay_frames_dropped}")
+            self.on_replay_stop()
+
+    def on_replay_stop(self):
+        global data_client_override
+        rp, self.replay = self.replay, None
+        if rp is None:
+            return
+        rp.stop()
+        data_client_override = None
+        if paper_broker is not None:
+            paper_broker.reset_market(rp.symbol)
+        strategy.set_client(self._live_strategy_client)
+        for b in (self.replay_play_btn, self.replay_step_btn, self.replay_stop_btn):
+            b.config(state="disabled")
+        self.replay_lbl.config(text="live")
+        self.log("Replay stopped -> back to live data")
+
+    # -------------------------
+    # Trade history / PnL (journal.py)
+    # -------------------------
+    def on_show_history(self):
+        if self.history_win is not None and self.history_win.winfo_exists():
+            self.history_win.lift()
+            return
+        self.history_win = HistoryWindow(self.master, self.journal)
+
+    # -------------------------
+    # Multi-symbol dashboard (dashboard.py)
+    # -------------------------
+    def on_show_dashboard(self):
+        if self.dashboard_win is not None and self.dashboard_win.winfo_exists():
+            self.dashboard_win.lift()
+            return
+        snapshot = dashboard.TickerSnapshot()
+        if DASHBOARD_STREAM:
+            feed = dashboard.StreamTickerFeed(config.API_KEY, config.API_SECRET, snapshot, testnet=True)
+        else:
+            feed = dashboard.RestTickerFeed(lambda: get_hub() or get_live_client(), snapshot)
+        symbols = None if DASHBOARD_ALL_USDT else list(self.sym_cb["values"])
+        self.dashboard_win = dashboard.DashboardWindow(self.master, feed, snapshot, symbols=symbols,
+                                                       on_select=self._on_dashboard_select)
+
+    def _on_dashboard_select(self, symbol):
+        if symbol not in self.sym_cb["values"]:
+            self.sym_cb["values"] = list(self.sym_cb["values"]) + [symbol]
+        self.symbol_var.set(symbol)
+        self.log(f"Dashboard -> {symbol}")
+
+    # -------------------------
+    # Memory / allocation tracking (memwatch.py)
+    # -------------------------
+    def on_show_memory(self):
+        if self.memory_win is not None and self.memory_win.winfo_exists():
+            self.memory_win.lift()
+            return
+        self.memory_win = MemoryWindow(self.master, self.memwatch, on_sample=self._sample_memory)
+
+    def _sample_memory(self):
+        w = self.memwatch
+        w.sample()
+        if w.tracking and w.rising() and w.growth:
+            top = w.growth[0]
+            self.log(f"Memory keeps rising ({w.summary()}); top growth {top.where} "
+                     f"+{memwatch.fmt_bytes(top.size_diff)} in {top.count_diff:+d} blocks")
+        if self.memory_win is not None and self.memory_win.winfo_exists():
+            self.memory_win.reload()
+
+    # -------------------------
+    # Open brackets (positions.py)
+    # -------------------------
+    def on_show_positions(self):
+        if self.positions_win is not None and self.positions_win.winfo_exists():
+            self.positions_win.lift()
+            return
+        self.positions_win = PositionsWindow(self.master, self.positions, log=self.log)
+
+    def _sync_bracket_streams(self):
+        """ user data stream for exchange executions; one ticker stream over the symbols with open brackets """
+        mon = self.positions
+        mon.pump()   # replaces held back by the rate limit
+        if paper_broker is None and self._user_stream is None:
+            self._user_stream = self.io.stream(positions.user_stream(), key="user_stream", on_item=mon.on_user_event,
+                                               on_error=lambda e: self._user_stream_failed(e))
+        symbols = tuple(mon.symbols())
+        if symbols == self._bracket_symbols:
+            return
+        self._bracket_symbols = symbols
+        if symbols:
+            self.io.stream(positions.price_stream(symbols), key="bracket_prices",
+                           on_item=lambda sp: mon.on_price(*sp))
+        else:
+            self.io.cancel("bracket_prices")
+
+    def _user_stream_failed(self, e):
+        self._user_stream = None   # reopened on the next tick
+        self.log(f"User data stream error: {e}")
+
+    # -------------------------
+    # Paper trading (paper.py)
+    # -------------------------
+    def on_paper_toggle(self):
+        global paper_broker
+        if self.paper_var.get():
+            if self._paper is None:
+                # market data (prices, klines, exchange info) still comes from the live client or the replay
+                self._paper = paper.PaperBroker(market=lambda: data_client_override or get_live_client())
+                self._paper.add_listener(self.positions.on_user_event)
+            paper_broker = self._paper
+            risk.ENGINE.apply_account(paper_broker.get_account())
+            self.log(f"📝 Paper trading ON: orders are matched locally (fee {paper.FEE_RATE:.2%}, "
+                     f"equity {paper_broker.equity():.2f} USDT)")
+        else:
+            paper_broker = None
+            self._risk_synced_at = 0.0   # resync the real account on the next tick
+            self.log("Paper trading OFF: orders go to the exchange")
 
     # -------------------------
     # Check balance (testnet)
     # -------------------------
     def on_check_balance(self):
-        threading.Thread(target=self._balance_worker, daemon=True).start()
+        sym = self.symbol_var.get()
+        assets = ["USDT"]
+        if sym.endswith("USDT"):
+            assets.append(sym.replace("USDT", ""))
 
-    def _balance_worker(self):
-        try:
-            sym = self.symbol_var.get()
-            assets = ["USDT"]
-            if sym.endswith("USDT"):
-                base = sym.replace("USDT", "")
-                assets.append(base)
-            balance_msgs = []
-            for a in assets:
-                try:
-                    bal = client.get_asset_balance(asset=a)
-                    if bal:
-                        free = bal.get("free", "0")
-                        locked = bal.get("locked", "0")
-                        balance_msgs.append(f"{a}: {free} free / {locked} locked")
-                except Exception as e:
-                    balance_msgs.append(f"{a}: error")
-            msg = " | ".join(balance_msgs) if balance_msgs else "No balances"
-            self.master.after(0, lambda: self.log(f"Balance -> {msg}"))
-        except Exception as e:
-            self.master.after(0, lambda: self.log(f"Balance error: {e}"))
-            self.master.after(0, lambda: messagebox.showerror("Balance Error", str(e)))
+        if paper_broker is not None:
+            self._show_balance([(a, paper_broker.get_asset_balance(asset=a)) for a in assets], prefix="Paper balance")
+            return
+
+        async def fetch(c):
+            res = await asyncio.gather(*(self.io.request("get_asset_balance", asset=a) for a in assets),
+                                       return_exceptions=True)
+            return list(zip(assets, res))
+
+        def failed(e):
+            self.log(f"Balance error: {e}")
+            messagebox.showerror("Balance Error", str(e))
+
+        self.io.submit(fetch, io_core.PRIORITY_USER, key="balance", on_done=self._show_balance, on_error=failed)
+
+    def _show_balance(self, results, prefix="Balance"):
+        balance_msgs = []
+        for a, bal in results:
+            if isinstance(bal, Exception):
+                balance_msgs.append(f"{a}: error")
+            elif bal:
+                free = bal.get("free", "0")
+                locked = bal.get("locked", "0")
+                balance_msgs.append(f"{a}: {free} free / {locked} locked")
+        msg = " | ".join(balance_msgs) if balance_msgs else "No balances"
+        self.log(f"{prefix} -> {msg}")
 
     # -------------------------
     # Shutdown
     # -------------------------
     def shutdown(self):
         self.stop_auto_updater()
+        self.on_replay_stop()
+        if self.dashboard_win is not None and self.dashboard_win.winfo_exists():
+            self.dashboard_win.close()
+        self.memwatch.stop()
+        self.io.stop()
+        self.positions.close_pool()
+        events.BUS.close()  # drains file/webhook/journal queues
+        self.journal.close()
         self.master.quit()
 
+# ---------------------------------------------------------
+# History & PnL window
+# ---------------------------------------------------------
+class HistoryWindow(tk.Toplevel):
+    """ pages through the trade journal newest-first (keyset paging -> constant cost per page) """
+
+    def __init__(self, master, journal_):
+        super().__init__(master)
+        self.journal = journal_
+        self.title("📜 Trade History & PnL")
+        self.configure(bg="#121212")
+        self.geometry("980x520")
+
+        bar = tk.Frame(self, bg="#121212")
+        bar.pack(side="top", fill="x", padx=8, pady=6)
+        tk.Label(bar, text="Table:", fg="white", bg="#121212").pack(side="left", padx=4)
+        self.table_var = tk.StringVar(value="fills")
+        table_cb = ttk.Combobox(bar, textvariable=self.table_var, values=list(journal.COLUMNS), width=8, state="readonly")
+        table_cb.pack(side="left", padx=4)
+        tk.Label(bar, text="Symbol:", fg="white", bg="#121212").pack(side="left", padx=4)
+        self.symbol_var = tk.StringVar(value="ALL")
+        self.symbol_cb = ttk.Combobox(bar, textvariable=self.symbol_var, values=["ALL"] + self.journal.symbols(), width=12, state="readonly")
+        self.symbol_cb.pack(side="left", padx=4)
+        tk.Button(bar, text="⟳", command=self.reload).pack(side="left", padx=4)
+        tk.Button(bar, text="◀ Newer", command=self.newer).pack(side="left", padx=4)
+        tk.Button(bar, text="Older ▶", command=self.older).pack(side="left", padx=4)
+        self.info_lbl = tk.Label(bar, text="", fg="#aaaaaa", bg="#121212")
+        self.info_lbl.pack(side="left", padx=8)
+        table_cb.bind("<<ComboboxSelected>>", lambda e: self.reload())
+        self.symbol_cb.bind("<<ComboboxSelected>>", lambda e: self.reload())
+
+        self.tree = ttk.Treeview(self, show="headings", height=18)
+        self.tree.pack(side="top", fill="both", expand=True, padx=8, pady=4)
+        self.pnl_lbl = tk.Label(self, text="PnL: -", fg="#74d374", bg="#121212", font=("Consolas", 10), justify="left", anchor="w")
+        self.pnl_lbl.pack(side="top", fill="x", padx=8, pady=6)
+
+        self._cursors = []   # (ts, id) of the last row of every page shown so far
+        self.reload()
+
+    def _symbol(self):
+        sym = self.symbol_var.get()
+        return None if sym == "ALL" else sym
+
+    def _show(self, before):
+        table = self.table_var.get()
+        rows = self.journal.page(table, symbol=self._symbol(), before=before)
+        cols = journal.COLUMNS[table]
+        if tuple(self.tree["columns"]) != cols:
+            self.tree.configure(columns=cols)
+            for c in cols:
+                self.tree.heading(c, text=c)
+                self.tree.column(c, width=70 if c in ("id", "side", "qty") else 110, stretch=True)
+        self.tree.delete(*self.tree.get_children())
+        for r in rows:
+            r = list(r)
+            r[1] = datetime.fromtimestamp(r[1]).strftime("%Y-%m-%d %H:%M:%S")
+            self.tree.insert("", tk.END, values=r)
+        self.info_lbl.config(text=f"page {len(self._cursors) + 1} ({len(rows)} rows)")
+        return rows
+
+    def reload(self):
+        self._cursors = []
+        self._last_rows = self._show(None)
+        self._refresh_pnl()
+
+    def older(self):
+        if not self._last_rows:
+            return
+        last = self._last_rows[-1]
+        self._cursors.append((last[1], last[0]))
+        rows = self._show(self._cursors[-1])
+        if not rows:   # already at the oldest page
+            self._cursors.pop()
+            self._last_rows = self._show(self._cursors[-1] if self._cursors else None)
+        else:
+            self._last_rows = rows
+
+    def newer(self):
+        if not self._cursors:
+            return
+        self._cursors.pop()
+        self._last_rows = self._show(self._cursors[-1] if self._cursors else None)
+
+    def _refresh_pnl(self):
+        symbol = self._symbol()
+
+        def work():
+            try:
+                rows = self.journal.pnl_summary(symbol)
+            except Exception as e:
+                rows, err = [], e
+            else:
+                err = None
+            self.after(0, lambda: self._show_pnl(rows, err))
+        threading.Thread(target=work, daemon=True).start()
+
+    def _show_pnl(self, rows, err):
+        if not self.winfo_exists():
+            return
+        if err:
+            self.pnl_lbl.config(text=f"PnL error: {err}")
+            return
+        lines = [f"{r['symbol']:<10} fills={r['fills']:<7} pos={r['position']:.6f} avg_buy={r['avg_buy']:.6f} "
+                 f"realized={r['realized']:.4f} fees(USDT)={r['fees_usdt']:.4f}"
+                 + (f" unmatched_sell={r['unmatched_sell']:.6f}" if r["unmatched_sell"] else "") for r in rows]
+        self.pnl_lbl.config(text="\n".join(lines) or "PnL: no fills yet")
+
+
+# ---------------------------------------------------------
+# Memory window (memwatch.py)
+# ---------------------------------------------------------
+class MemoryWindow(tk.Toplevel):
+    """ RSS / traced memory history and the allocation sites that grew the most """
+
+    def __init__(self, master, watch, on_sample):
+        super().__init__(master)
+        self.watch = watch
+        self.on_sample = on_sample
+        self.title("🧠 Memory")
+        self.configure(bg="#121212")
+        self.geometry("820x520")
+
+        bar = tk.Frame(self, bg="#121212")
+        bar.pack(side="top", fill="x", padx=8, pady=6)
+        self.track_btn = tk.Button(bar, command=self.toggle)
+        self.track_btn.pack(side="left", padx=4)
+        tk.Button(bar, text="📸 Snapshot now", command=self.on_sample).pack(side="left", padx=4)
+        tk.Button(bar, text="Reset baseline", command=self.reset).pack(side="left", padx=4)
+        self.info_lbl = tk.Label(bar, text="", fg="#aaaaaa", bg="#121212", anchor="w")
+        self.info_lbl.pack(side="left", padx=8, fill="x", expand=True)
+
+        self.text = tk.Text(self, bg="#0d0d0d", fg="#dddddd", font=("Consolas", 9), wrap="none")
+        self.text.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        self.reload()
+
+    def toggle(self):
+        if self.watch.tracking:
+            self.watch.stop()
+        else:
+            self.watch.start()
+        self.reload()
+
+    def reset(self):
+        if self.watch.tracking:
+            self.watch.reset_baseline()
+        self.reload()
+
+    def reload(self):
+        w = self.watch
+        self.track_btn.config(text="⏹ Stop tracking" if w.tracking else "▶ Track allocations")
+        rising = w.tracking and w.rising()
+        self.info_lbl.config(text=w.summary() + (" | RISING" if rising else ""),
+                             fg="#f44336" if rising else "#aaaaaa")
+        lines = []
+        if not w.tracking:
+            lines.append("Allocation tracking is off (RSS only). Turn it on, let the app run for a few")
+            lines.append("snapshots and the lines that keep allocating show up here.")
+        for title, sites in (("Growth since baseline", w.growth), ("Growth since previous snapshot", w.recent)):
+            if not w.tracking:
+                break
+            lines.append(f"{title}:")
+            lines.extend(f"  {memwatch.fmt_bytes(s.size_diff):>10} {s.count_diff:+8d} blocks  {s.where}" for s in sites)
+            if not sites:
+                lines.append("  (nothing grew)")
+            lines.append("")
+        lines.append(f"{'time':<10}{'RSS':>12}{'traced':>12}{'peak':>12}")
+        for s in list(w.samples)[-30:][::-1]:
+            lines.append(f"{datetime.fromtimestamp(s.t).strftime('%H:%M:%S'):<10}{memwatch.fmt_bytes(s.rss):>12}"
+                         f"{memwatch.fmt_bytes(s.traced):>12}{memwatch.fmt_bytes(s.peak):>12}")
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, "\n".join(lines))
+
+
+# ---------------------------------------------------------
+# Positions window (positions.py)
+# ---------------------------------------------------------
+class PositionsWindow(tk.Toplevel):
+    """ open brackets (and recently closed ones) from the position monitor's in-memory state """
+
+    COLUMNS = (("symbol", 90), ("side", 60), ("qty", 90), ("entry", 90), ("last", 90), ("pnl", 80),
+               ("sl", 90), ("tp", 90), ("trail", 60), ("status", 110))
+    REFRESH_MS = 1000
+
+    def __init__(self, master, monitor, log):
+        super().__init__(master)
+        self.monitor = monitor
+        self.log = log
+        self.title("📌 Positions")
+        self.configure(bg="#121212")
+        self.geometry("900x420")
+
+        bar = tk.Frame(self, bg="#121212")
+        bar.pack(side="top", fill="x", padx=8, pady=6)
+        tk.Label(bar, text="Trail %", fg="white", bg="#121212").pack(side="left", padx=4)
+        self.trail_var = tk.StringVar(value="")
+        tk.Entry(bar, textvariable=self.trail_var, width=6).pack(side="left", padx=4)
+        tk.Button(bar, text="Set trail", command=self.on_set_trail).pack(side="left", padx=4)
+        tk.Button(bar, text="Cancel bracket", command=self.on_cancel).pack(side="left", padx=4)
+        tk.Button(bar, text="Close at market", command=self.on_close).pack(side="left", padx=4)
+        self.info_lbl = tk.Label(bar, text="", fg="#aaaaaa", bg="#121212", anchor="w")
+        self.info_lbl.pack(side="left", padx=8, fill="x", expand=True)
+
+        self.tree = ttk.Treeview(self, columns=[c for c, _ in self.COLUMNS], show="headings", selectmode="browse")
+        for col, width in self.COLUMNS:
+            self.tree.heading(col, text=col.upper() if col in ("sl", "tp") else col.capitalize())
+            self.tree.column(col, width=width, anchor="e" if col not in ("symbol", "side", "status") else "w")
+        self.tree.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        self.reload()
+
+    def reload(self):
+        if not self.winfo_exists():
+            return
+        selected = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        rows = self.monitor.snapshot(closed=True)
+        for r in rows:
+            status = r["status"] if r["outcome"] is None else f"{r['status']} {r['outcome']}"
+            qty = f"{r['remaining']:g}/{r['qty']:g}" if r["remaining"] != r["qty"] else f"{r['qty']:g}"
+            self.tree.insert("", tk.END, iid=str(r["list_id"]) + ("" if r["closed_at"] is None else f"-{r['closed_at']}"),
+                             values=(r["symbol"], r["side"], qty, f"{r['entry']:.6g}", f"{r['last']:.6g}",
+                                     f"{r['pnl']:+.2f}", f"{r['sl']:.6g}", f"{r['tp']:.6g}",
+                                     f"{r['trail_pct']:g}%" if r["trail_pct"] else "-", status))
+        for iid in selected:
+            if self.tree.exists(iid):
+                self.tree.selection_set(iid)
+        c = self.monitor.counts
+        opened = sum(1 for r in rows if r["closed_at"] is None)
+        self.info_lbl.config(text=f"{opened} open | {c['replaces']} replaces, {c['replace_errors']} errors, "
+                                  f"{c['reports']} reports")
+        self.after(self.REFRESH_MS, self.reload)
+
+    def _selected(self):
+        sel = self.tree.selection()
+        if not sel or "-" in sel[0]:
+            messagebox.showinfo("Positions", "Select an open bracket first", parent=self)
+            return None
+        return int(sel[0])
+
+    def on_set_trail(self):
+        list_id = self._selected()
+        if list_id is None:
+            return
+        pct = safe_float(self.trail_var.get(), default=0.0)
+        if self.monitor.set_trail(list_id, pct):
+            self.log(f"Bracket {list_id}: trailing stop {pct:g}%" if pct else f"Bracket {list_id}: fixed stop")
+
+    def on_cancel(self):
+        list_id = self._selected()
+        if list_id is not None and messagebox.askyesno("Cancel bracket", "Cancel the OCO? The position stays open.",
+                                                       parent=self):
+            self.monitor.cancel(list_id)
+
+    def on_close(self):
+        list_id = self._selected()
+        if list_id is not None and messagebox.askyesno("Close position", "Cancel the OCO and exit at market?",
+                                                       parent=self):
+            self.monitor.close(list_id)
+
+
 # ---------------------------------------------------------
 # Run the app
 # ---------------------------------------------------------
@@ -0,0 +1,130 @@
+# indicator_cache.py
+# EMA 20/50, VWAP and RSI(14) kept per (symbol, interval) for the live chart.
+# The full history is computed once with the vectorized functions from indicators.py; after that
+# every tick only commits newly closed bars and recomputes the still-forming last bar (O(1)).
+# Semantics match indicators.py exactly (ewm(adjust=False), SMA-rolling RSI, cumulative VWAP).
+
+import math
+from collections import deque
+
+import pandas as pd
+
+import indicators
+
+EMA_SPANS = (20, 50)
+RSI_PERIOD = 14
+
+
+class IndicatorState:
+    def __init__(self, t, h, l, c, v):
+        df = pd.DataFrame({"high": h, "low": l, "close": c, "volume": v})
+        for span in EMA_SPANS:
+            df = indicators.ema(df, span)
+        df = indicators.rsi(df, RSI_PERIOD)
+        df = indicators.vwap(df)
+        n = len(df)
+        self.first_time = int(t[0]) if n else None
+        self.ema = {span: df[f"EMA_{span}"].tolist() for span in EMA_SPANS}
+        self.rsi = df["RSI"].tolist()
+        self.vwap = df["VWAP"].tolist()
+        # running state up to (and including) the last *closed* bar, index n - 2
+        closed = max(0, n - 1)
+        self.n_closed = closed
+        self._ema_prev = {span: self.ema[span][closed - 1] for span in EMA_SPANS} if closed else {}
+        tp_v = (df["high"] + df["low"] + df["close"]) / 3.0 * df["volume"]
+        self._cum_pv = float(tp_v.iloc[:closed].sum())
+        self._cum_v = float(df["volume"].iloc[:closed].sum())
+        delta = df["close"].iloc[:closed].diff().fillna(0.0).tolist()[-RSI_PERIOD:]
+        self._gains = deque((max(d, 0.0) for d in delta), maxlen=RSI_PERIOD)
+        self._losses = deque((max(-d, 0.0) for d in delta), maxlen=RSI_PERIOD)
+        self._prev_close = float(df["close"].iloc[closed - 1]) if closed else None
+
+    def __len__(self):
+        return len(self.rsi)
+
+    # -------------------------
+    # incremental core
+    # -------------------------
+    def _step(self, h, l, c, v):
+        """ values for a bar following the committed state, without mutating it """
+        ema = {}
+        for span in EMA_SPANS:
+            prev = self._ema_prev.get(span)
+            alpha = 2.0 / (span + 1)
+            ema[span] = c if prev is None else alpha * c + (1 - alpha) * prev
+        cum_pv = self._cum_pv + (h + l + c) / 3.0 * v
+        cum_v = self._cum_v + v
+        vwap = cum_pv / cum_v if cum_v else math.nan
+        # indicators.rsi: first diff is NaN -> counted as 0 gain / 0 loss
+        delta = 0.0 if self._prev_close is None else c - self._prev_close
+        gains = list(self._gains)[-(RSI_PERIOD - 1):] + [max(delta, 0.0)]
+        losses = list(self._losses)[-(RSI_PERIOD - 1):] + [max(-delta, 0.0)]
+        if len(gains) < RSI_PERIOD:
+            rsi = math.nan
+        else:
+            g, lo = sum(gains) / RSI_PERIOD, sum(losses) / RSI_PERIOD
+            rsi = (100.0 if g > 0 else math.nan) if lo == 0 else 100 - 100 / (1 + g / lo)
+        return ema, vwap, rsi, cum_pv, cum_v, delta
+
+    def _commit(self, h, l, c, v):
+        ema, vwap, rsi, cum_pv, cum_v, delta = self._step(h, l, c, v)
+        i = self.n_closed
+        self._set(i, ema, vwap, rsi)
+        self._ema_prev = ema
+        self._cum_pv, self._cum_v = cum_pv, cum_v
+        self._gains.append(max(delta, 0.0))
+        self._losses.append(max(-delta, 0.0))
+        self._prev_close = c
+        self.n_closed = i + 1
+
+    def _set(self, i, ema, vwap, rsi):
+        if i == len(self.rsi):
+            for span in EMA_SPANS:
+                self.ema[span].append(ema[span])
+            self.vwap.append(vwap)
+            self.rsi.append(rsi)
+        else:
+            for span in EMA_SPANS:
+                self.ema[span][i] = ema[span]
+            self.vwap[i] = vwap
+            self.rsi[i] = rsi
+
+    def update(self, h, l, c, v):
+        """
+        h/l/c/v: full column arrays of the series (bars before n_closed are assumed unchanged).
+        Commits bars that closed since the last call and recomputes only the last (forming) bar.
+        """
+        n = len(c)
+        for i in range(self.n_closed, n - 1):
+            self._commit(float(h[i]), float(l[i]), float(c[i]), float(v[i]))
+        if n:
+            ema, vwap, rsi, *_ = self._step(float(h[-1]), float(l[-1]), float(c[-1]), float(v[-1]))
+            self._set(n - 1, ema, vwap, rsi)
+
+    def values_at(self, idx):
+        """ {name: [values at indices]} for the chart's visible buckets """
+        return {
+            **{f"EMA_{span}": [self.ema[span][i] for i in idx] for span in EMA_SPANS},
+            "VWAP": [self.vwap[i] for i in idx],
+            "RSI": [self.rsi[i] for i in idx],
+        }
+
+
+class IndicatorCache:
+    """ (symbol, interval) -> IndicatorState, rebuilt only when the underlying history changes """
+
+    def __init__(self):
+        self._states = {}
+
+    def get(self, key, t, h, l, c, v):
+        st = self._states.get(key)
+        n = len(c)
+        if st is None or not n or st.first_time != int(t[0]) or st.n_closed > n - 1:
+            st = IndicatorState(t, h, l, c, v)
+            self._states[key] = st
+        else:
+            st.update(h, l, c, v)
+        return st
+
+    def drop(self, key):
+        self._states.pop(key, None)
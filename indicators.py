@@ -23,11 +23,22 @@ def vwap(df):
     df["VWAP"] = (p * q).cumsum() / q.cumsum()
     return df
 
+# Named columns -> computed once each ("EMA_<period>", "RSI", "VWAP"); used by strategies.py to
+# compute the union of what every registered strategy needs in one pass
+def compute(df, names):
+    for name in dict.fromkeys(names):
+        if name in df.columns:
+            continue
+        if name.startswith("EMA_"):
+            ema(df, int(name[4:]))
+        elif name == "RSI":
+            rsi(df, 14)
+        elif name == "VWAP":
+            vwap(df)
+        else:
+            raise ValueError(f"unknown indicator: {name}")
+    return df
+
 # Helper function: Apply all indicators
 def apply_indicators(data):
-    df = pd.DataFrame(data)
-    df = ema(df, 20)
-    df = ema(df, 50)
-    df = rsi(df, 14)
-    df = vwap(df)
-    return df
+    return compute(pd.DataFrame(data), ("EMA_20", "EMA_50", "RSI", "VWAP"))
@@ -0,0 +1,294 @@
+# io_core.py
+# One asyncio event loop on a background thread for all exchange I/O of a UI.
+#   - async exchange client (binance.AsyncClient), created on the loop on first use
+#   - prioritized, bounded request queue served by a fixed number of worker tasks
+#   - jobs with the same `key` supersede each other: submitting a new "refresh" cancels the queued
+#     or in-flight one (e.g. a chart fetch for the symbol the user already switched away from)
+#   - results are handed to the UI main loop through `dispatch(fn)`
+#     Tk:   dispatch=lambda fn: root.after(0, fn)
+#     Kivy: dispatch=lambda fn: Clock.schedule_once(lambda dt: fn())
+# Multi-step order workflows that still use the sync client go through submit_blocking(): same
+# queue and priorities, executed one at a time on a single worker thread (orders never overlap,
+# never get a key and are therefore never superseded).
+# Reads made through request()/call() get timeout budgets, hedging, retries and a circuit breaker
+# (resilience.py); order endpoints are passed through untouched.
+# Long-lived work (websocket streams) goes through stream(): its own task outside the worker pool,
+# superseded by key like any other job.
+
+import asyncio
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import resilience
+
+PRIORITY_ORDER = 0        # order placement / cancel
+PRIORITY_USER = 1         # button clicks (levels, balance, scan)
+PRIORITY_REFRESH = 2      # auto-updater
+PRIORITY_BACKGROUND = 3   # account sync, housekeeping
+
+MAX_QUEUE = 32
+CONCURRENCY = 4
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, fn, priority, key, on_done, on_error, blocking):
+        self.fn = fn
+        self.priority = priority
+        self.key = key
+        self.on_done = on_done
+        self.on_error = on_error
+        self.blocking = blocking
+        self.cancelled = False
+        self.finished = False
+        self.task = None
+        self.loop = None
+
+    def cancel(self):
+        """ thread-safe; a running async job is interrupted, a running blocking job just loses its result """
+        self.cancelled = True
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel_task)   # task is read on the loop, not here
+
+    def _cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+
+
+class IOCore:
+    def __init__(self, client_factory, dispatch, max_queue=MAX_QUEUE, concurrency=CONCURRENCY):
+        """
+        client_factory: coroutine function -> async client (awaited once, on the I/O loop)
+        dispatch(fn): run fn() on the UI main loop
+        """
+        self.client_factory = client_factory
+        self.dispatch = dispatch
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+        self.loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._heap = []                 # (priority, seq, job)
+        self._seq = itertools.count()
+        self._by_key = {}               # key -> newest job
+        self._wake = None
+        self._client = None
+        self._client_lock = None
+        self._workers = []
+        self._blocking = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io-orders")
+        self.counts = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "rejected": 0}
+        self.resilience = resilience.Resilience()
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="io-core", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._wake = asyncio.Condition()
+        self._client_lock = asyncio.Lock()
+        self._workers = [self.loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def stop(self, timeout=5.0):
+        if self.loop is None or not self.loop.is_running():
+            return
+        fut = asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        try:
+            fut.result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._blocking.shutdown(wait=False)
+
+    async def _shutdown(self):
+        for w in self._workers:
+            w.cancel()
+        for _, _, job in self._heap:
+            job.cancelled = True
+        self._heap.clear()
+        for job in list(self._by_key.values()):
+            job.cancelled = True
+            job._cancel_task()   # in-flight keyed jobs and streams
+        if self._client is not None and hasattr(self._client, "close_connection"):
+            await self._client.close_connection()
+
+    async def client(self):
+        async with self._client_lock:
+            if self._client is None:
+                self._client = await self.client_factory()
+            return self._client
+
+    # -------------------------
+    # Submit (any thread)
+    # -------------------------
+    def submit(self, fn, priority=PRIORITY_USER, key=None, on_done=None, on_error=None):
+        """ fn: coroutine function taking the async client. Returns the Job (cancel() to drop it). """
+        return self._submit(Job(fn, priority, key, on_done, on_error, blocking=False))
+
+    def submit_blocking(self, fn, priority=PRIORITY_ORDER, key=None, on_done=None, on_error=None):
+        """ fn(): plain callable run on the single blocking worker (sync client, order workflows) """
+        return self._submit(Job(fn, priority, key, on_done, on_error, blocking=True))
+
+    def call(self, method, priority=PRIORITY_USER, key=None, on_done=None, on_error=None, **params):
+        """ shorthand for a single async client call: call("get_klines", symbol=..., interval=...) """
+        return self.submit(lambda c: self.request(method, **params), priority, key, on_done, on_error)
+
+    def stream(self, fn, key=None, on_item=None, on_error=None):
+        """
+        long-lived job outside the worker pool (e.g. a websocket): fn(client, emit) runs until it returns
+        or the job is cancelled; emit(x) hands x to on_item on the UI loop. Same key -> replaces the old one.
+        """
+        job = Job(fn, PRIORITY_BACKGROUND, key, on_item, on_error, blocking=False)
+        job.loop = self.loop
+        self.loop.call_soon_threadsafe(self._start_stream, job)
+        return job
+
+    async def request(self, method, **params):
+        """ inside a job: one client call with the endpoint's tail-latency policy (reads only) """
+        client = await self.client()
+        return await self.resilience.call(method, lambda: getattr(client, method)(**params))
+
+    def record(self, name, seconds):
+        """ end-to-end latency of something built from several calls (e.g. a chart refresh) """
+        self.loop.call_soon_threadsafe(self.resilience.tracker(name).record, seconds)
+
+    def latency_report(self):
+        return self.resilience.report()
+
+    def cancel(self, key):
+        self.loop.call_soon_threadsafe(self._cancel_key, key)
+
+    def _submit(self, job):
+        job.loop = self.loop
+        self.loop.call_soon_threadsafe(lambda: self.loop.create_task(self._enqueue(job)))
+        return job
+
+    # -------------------------
+    # Loop side
+    # -------------------------
+    def _cancel_key(self, key):
+        old = self._by_key.pop(key, None)
+        if old is not None:
+            old.cancel()
+
+    async def _enqueue(self, job):
+        self.counts["submitted"] += 1
+        if job.key is not None:
+            self._cancel_key(job.key)
+            self._by_key[job.key] = job
+        live = [e for e in self._heap if not e[2].cancelled]
+        if len(live) != len(self._heap):
+            self._heap = live
+            heapq.heapify(self._heap)
+        if len(self._heap) >= self.max_queue and job.priority != PRIORITY_ORDER:
+            worst = max(self._heap)
+            if worst[0] <= job.priority:
+                self._reject(job)
+                return
+            self._heap.remove(worst)
+            heapq.heapify(self._heap)
+            self._reject(worst[2])
+        heapq.heappush(self._heap, (job.priority, next(self._seq), job))
+        async with self._wake:
+            self._wake.notify()
+
+    def _start_stream(self, job):
+        if job.cancelled:
+            return
+        self.counts["submitted"] += 1
+        if job.key is not None:
+            self._cancel_key(job.key)
+            self._by_key[job.key] = job
+        job.task = self.loop.create_task(self._run_stream(job))
+
+    async def _run_stream(self, job):
+        def emit(item):
+            self._deliver(job, job.on_done, item)
+        try:
+            client = await self.client()
+            await job.fn(client, emit)
+        except asyncio.CancelledError:
+            self.counts["cancelled"] += 1
+        except Exception as e:
+            self.counts["failed"] += 1
+            self._deliver(job, job.on_error, e)
+        else:
+            self.counts["done"] += 1
+        finally:
+            job.task = None
+            job.finished = True
+            if job.key is not None and self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    def _reject(self, job):
+        job.cancelled = True
+        job.finished = True
+        self.counts["rejected"] += 1
+        if job.key is not None and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+        if job.on_error:
+            err = QueueFull("I/O queue full")
+            self.dispatch(lambda: job.on_error(err))
+
+    async def _worker(self):
+        while True:
+            async with self._wake:
+                await self._wake.wait_for(lambda: bool(self._heap))
+                _, _, job = heapq.heappop(self._heap)
+            if job.cancelled:
+                job.finished = True
+                self.counts["cancelled"] += 1
+                continue
+            try:
+                if job.blocking:
+                    result = await self.loop.run_in_executor(self._blocking, job.fn)
+                else:
+                    client = await self.client()
+                    job.task = asyncio.ensure_future(job.fn(client))
+                    result = await job.task
+            except asyncio.CancelledError:
+                if not job.cancelled:
+                    raise  # the worker itself is being shut down
+                self.counts["cancelled"] += 1
+                continue
+            except Exception as e:
+                self.counts["failed"] += 1
+                self._deliver(job, job.on_error, e)
+                continue
+            finally:
+                job.task = None
+                job.finished = True
+                if job.key is not None and self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+            if job.cancelled:
+                self.counts["cancelled"] += 1   # blocking job superseded while it ran
+                continue
+            self.counts["done"] += 1
+            self._deliver(job, job.on_done, result)
+
+    def _deliver(self, job, cb, value):
+        if cb is None:
+            return
+
+        def run():
+            if not job.cancelled:   # may have been superseded while waiting for the UI loop
+                cb(value)
+        self.dispatch(run)
+
+    def stats(self):
+        return {**self.counts, "queued": len(self._heap), "keys": len(self._by_key)}
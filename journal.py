@@ -0,0 +1,260 @@
+# journal.py
+# Local trade journal (SQLite, WAL mode).
+# Records every market order, OCO leg, fill and strategy signal published on the event bus.
+#   - writes are queued and committed in batches by one writer thread (never on the UI thread)
+#   - (symbol, ts) and ts indexes + keyset pagination keep history pages fast at 100k+ rows
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import config
+import events
+
+FLUSH_INTERVAL_SEC = 0.5     # max delay before queued rows hit the disk
+BATCH_MAX = 500              # rows per transaction
+PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT,
+    type TEXT,
+    qty REAL,
+    price REAL,
+    stop_price REAL,
+    status TEXT,
+    order_id INTEGER,
+    order_list_id INTEGER,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_symbol_ts ON orders(symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_orders_ts ON orders(ts);
+
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT,
+    order_id INTEGER,
+    trade_id INTEGER,
+    price REAL,
+    qty REAL,
+    commission REAL,
+    commission_asset TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_fills_symbol_ts ON fills(symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_fills_ts ON fills(ts);
+
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    interval TEXT,
+    strategy TEXT,
+    signal TEXT,
+    confidence REAL,
+    reason TEXT,
+    entry REAL,
+    sl REAL,
+    tp REAL
+);
+CREATE INDEX IF NOT EXISTS idx_signals_symbol_ts ON signals(symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals(ts);
+"""
+
+# table -> columns shown by the history panel (id/ts always first)
+COLUMNS = {
+    "fills": ("id", "ts", "symbol", "side", "price", "qty", "commission", "commission_asset", "order_id"),
+    "orders": ("id", "ts", "symbol", "side", "type", "qty", "price", "stop_price", "status", "order_id", "order_list_id", "source"),
+    "signals": ("id", "ts", "symbol", "interval", "strategy", "signal", "confidence", "reason", "entry", "sl", "tp"),
+}
+
+
+def connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")   # safe with WAL, much cheaper commits
+    return conn
+
+
+def _num(x):
+    try:
+        return float(x) if x is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TradeJournal:
+    """
+    journal = TradeJournal()             # starts the writer thread
+    events.BUS.subscribe(journal, ...)   # or journal.attach()
+    journal.page("fills", symbol="BTCUSDT")
+    """
+
+    def __init__(self, path=None):
+        self.path = path or getattr(config, "JOURNAL_DB", "data/journal.sqlite3")
+        self._queue = queue.Queue()
+        self._write_conn = connect(self.path)
+        self._write_conn.executescript(SCHEMA)
+        self._write_conn.commit()
+        self._read_conn = None
+        self._read_lock = threading.Lock()
+        self.rows_written = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._writer, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    # -------------------------
+    # Writing (event bus consumer)
+    # -------------------------
+    def __call__(self, event):
+        """ bus consumer: convert event -> (sql, params) rows and queue them """
+        for row in self._rows_for(event):
+            self._queue.put(row)
+
+    def attach(self, bus=events.BUS):
+        # lossless: a burst of fills must never drop journal rows (the writer thread batches them anyway)
+        return bus.subscribe(self, topics=(events.SIGNAL, events.ORDER, events.OCO, events.FILL),
+                             maxsize=10000, policy=events.KEEP_ALL, name="journal")
+
+    @staticmethod
+    def _rows_for(ev):
+        d = ev.data
+        if ev.topic == events.ORDER:
+            price = None
+            if _num(d.get("quote_qty")) and _num(d.get("qty")):
+                price = _num(d.get("quote_qty")) / _num(d.get("qty"))
+            yield ("orders", (ev.ts, d.get("symbol"), d.get("side"), d.get("type", "MARKET"), _num(d.get("qty")),
+                              price, None, d.get("status"), d.get("order_id"), None, d.get("source")))
+        elif ev.topic == events.OCO:
+            legs = d.get("legs") or []
+            if not legs:
+                legs = [{"type": "OCO", "price": d.get("tp"), "stop_price": d.get("sl"), "status": None, "order_id": None}]
+            for leg in legs:
+                yield ("orders", (ev.ts, d.get("symbol"), d.get("side"), leg.get("type"), _num(d.get("qty")),
+                                  _num(leg.get("price")), _num(leg.get("stop_price")), leg.get("status"),
+                                  leg.get("order_id"), d.get("order_list_id"), d.get("source")))
+        elif ev.topic == events.FILL:
+            yield ("fills", (ev.ts, d.get("symbol"), d.get("side"), d.get("order_id"), d.get("trade_id"),
+                             _num(d.get("price")), _num(d.get("qty")), _num(d.get("commission")), d.get("commission_asset")))
+        elif ev.topic == events.SIGNAL:
+            yield ("signals", (ev.ts, d.get("symbol"), d.get("interval"), d.get("strategy"), d.get("signal"),
+                               _num(d.get("confidence")), d.get("reason"), _num(d.get("entry")), _num(d.get("sl")), _num(d.get("tp"))))
+
+    _INSERT = {
+        "orders": "INSERT INTO orders(ts, symbol, side, type, qty, price, stop_price, status, order_id, order_list_id, source) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+        "fills": "INSERT INTO fills(ts, symbol, side, order_id, trade_id, price, qty, commission, commission_asset) VALUES (?,?,?,?,?,?,?,?,?)",
+        "signals": "INSERT INTO signals(ts, symbol, interval, strategy, signal, confidence, reason, entry, sl, tp) VALUES (?,?,?,?,?,?,?,?,?,?)",
+    }
+
+    def _writer(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=FLUSH_INTERVAL_SEC)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + FLUSH_INTERVAL_SEC
+            while len(batch) < BATCH_MAX:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        by_table = {}
+        for table, params in batch:
+            by_table.setdefault(table, []).append(params)
+        try:
+            with self._write_conn:   # one transaction per batch
+                for table, rows in by_table.items():
+                    self._write_conn.executemany(self._INSERT[table], rows)
+            self.rows_written += len(batch)
+        except sqlite3.Error as e:
+            print(f"[journal] write failed ({len(batch)} rows lost): {e}")
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+        self._write_conn.close()
+        if self._read_conn is not None:
+            self._read_conn.close()
+
+    # -------------------------
+    # Queries (any thread; reads don't block the writer in WAL mode)
+    # -------------------------
+    def _reader(self):
+        if self._read_conn is None:
+            self._read_conn = connect(self.path)
+        return self._read_conn
+
+    def page(self, table, symbol=None, before=None, limit=PAGE_SIZE):
+        """
+        Newest-first page of `table`. Keyset pagination: pass before=(ts, id) of the last row
+        of the previous page -> every page is an index range scan, no OFFSET.
+        """
+        cols = COLUMNS[table]
+        where, params = [], []
+        if symbol:
+            where.append("symbol = ?")
+            params.append(symbol)
+        if before is not None:
+            where.append("(ts, id) < (?, ?)")
+            params.extend(before)
+        sql = f"SELECT {', '.join(cols)} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self._read_lock:
+            return self._reader().execute(sql, params).fetchall()
+
+    def count(self, table, symbol=None):
+        sql = f"SELECT COUNT(*) FROM {table}" + (" WHERE symbol = ?" if symbol else "")
+        with self._read_lock:
+            return self._reader().execute(sql, (symbol,) if symbol else ()).fetchone()[0]
+
+    def symbols(self):
+        with self._read_lock:
+            rows = self._reader().execute(
+                "SELECT DISTINCT symbol FROM orders UNION SELECT DISTINCT symbol FROM fills ORDER BY 1").fetchall()
+        return [r[0] for r in rows]
+
+    def pnl_summary(self, symbol=None):
+        """
+        Per-symbol totals from fills (average-cost approximation, spot = long only):
+          matched = min(bought_qty, sold_qty), realized = matched * (avg_sell - avg_buy),
+          position = bought_qty - sold_qty
+        Sells beyond what the journal saw bought (coins bought elsewhere / before the journal) have no
+        cost basis: they are reported as unmatched_sell, not counted as profit.
+        """
+        sql = """
+            SELECT symbol,
+                   SUM(CASE WHEN side = 'BUY'  THEN qty ELSE 0 END),
+                   SUM(CASE WHEN side = 'BUY'  THEN qty * price ELSE 0 END),
+                   SUM(CASE WHEN side = 'SELL' THEN qty ELSE 0 END),
+                   SUM(CASE WHEN side = 'SELL' THEN qty * price ELSE 0 END),
+                   SUM(CASE WHEN commission_asset = 'USDT' THEN commission ELSE 0 END),
+                   COUNT(*)
+            FROM fills""" + (" WHERE symbol = ?" if symbol else "") + " GROUP BY symbol"
+        with self._read_lock:
+            rows = self._reader().execute(sql, (symbol,) if symbol else ()).fetchall()
+        out = []
+        for sym, bq, bquote, sq, squote, fees, n in rows:
+            avg_buy = (bquote / bq) if bq else 0.0
+            avg_sell = (squote / sq) if sq else 0.0
+            matched = min(bq, sq)
+            out.append({"symbol": sym, "fills": n, "position": bq - sq, "avg_buy": avg_buy,
+                        "realized": matched * (avg_sell - avg_buy), "unmatched_sell": max(0.0, sq - bq),
+                        "fees_usdt": fees})
+        return out
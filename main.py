@@ -1,20 +1,42 @@
 # main.py (Kivy Version with Dropdown Menu)
-import threading
+import time
+_MODULE_T0 = time.perf_counter()
+
+import asyncio
+import os
+import startup
+import risk
+import io_core
+import exchange_meta
+import mobile_feed
 from kivy.lang import Builder
 from kivymd.app import MDApp
 from kivymd.uix.snackbar import Snackbar
 from kivymd.uix.menu import MDDropdownMenu
 from kivy.clock import Clock
 
-# Binance client
-try:
-    from binance.client import Client
-    import config
-    # Make sure you have API_KEY and API_SECRET in your config.py
-    client = Client(config.API_KEY, config.API_SECRET, testnet=True)
-except (ImportError, AttributeError):
-    client = None
-    print("Warning: Binance library or config not found. Running in UI test mode.")
+STARTUP = startup.StartupTimer(t0=_MODULE_T0)
+STARTUP.mark("kivy_imported")
+
+# Low-bandwidth mode (mobile_feed.py): one miniTicker stream for the selected symbol instead of REST
+# polling, closed while the app is in the background; last levels / balance cached on disk
+MOBILE_STREAM = True
+STATS_LOG_SEC = 600          # log the per-hour data / CPU numbers this often (0 = only on pause / stop)
+TICK_FRESH_SEC = 60          # a streamed price younger than this is good enough for GET LEVELS
+
+# Async Binance client, imported + created on the I/O thread (io_core.py) after the first frame
+async def _make_async_client():
+    try:
+        AsyncClient = STARTUP.timed_import("binance").AsyncClient
+        import config
+        # Make sure you have API_KEY and API_SECRET in your config.py
+        client = await AsyncClient.create(config.API_KEY, config.API_SECRET, testnet=True)
+    except (ImportError, AttributeError):
+        print("Warning: Binance library or config not found. Running in UI test mode.")
+        raise RuntimeError("Binance client not configured.")
+    finally:
+        STARTUP.mark("client_ready")
+    return client
 
 
 KV_STRING = """
@@ -59,6 +81,28 @@ MDScreen:
                 mode: "fill"
                 size_hint_x: 0.4
 
+        MDBoxLayout:
+            orientation: 'vertical'
+            adaptive_height: True
+            MDLabel:
+                id: price_label
+                text: "--"
+                halign: "center"
+                font_style: "H5"
+                adaptive_height: True
+            MDLabel:
+                id: levels_label
+                text: ""
+                halign: "center"
+                theme_text_color: "Secondary"
+                adaptive_height: True
+            MDLabel:
+                id: balance_label
+                text: ""
+                halign: "center"
+                theme_text_color: "Secondary"
+                adaptive_height: True
+
         # Rest of the buttons...
         MDBoxLayout:
             orientation: 'horizontal'
@@ -105,6 +149,14 @@ class CryptoBotApp(MDApp):
         return Builder.load_string(KV_STRING)
 
     def on_start(self):
+        # one asyncio loop for all exchange calls, results come back through the Kivy clock
+        self.io = io_core.IOCore(_make_async_client, dispatch=lambda fn: Clock.schedule_once(lambda dt: fn())).start()
+        self.feed_stats = mobile_feed.FeedStats()
+        self.state_cache = mobile_feed.StateCache(os.path.join(self.user_data_dir, "mobile_state.json"))
+        self.exchange_ready = False
+        self.last_tick, self._tick_at = None, 0.0
+        self._timers = []   # Clock events cancelled on pause, recreated on resume
+        self._meta_synced_at = 0.0
         # We create the dropdown menu when the app starts
         self.symbol_list = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT"]
         menu_items = [
@@ -119,11 +171,104 @@ class CryptoBotApp(MDApp):
         )
         # Set a default symbol
         Clock.schedule_once(lambda dt: self.set_symbol(self.symbol_list[0]))
+        # warm up the exchange client only after the first frame is on screen
+        Clock.schedule_once(lambda dt: self._on_first_frame(), 0)
+
+    def _on_first_frame(self):
+        STARTUP.mark("first_frame")
+        self.log("[INFO] Connecting to exchange...")
+        # first job creates the client; its result also seeds the pre-trade risk balances
+        self.io.call("get_account", io_core.PRIORITY_BACKGROUND, key="risk_sync",
+                     on_done=self._on_exchange_ready, on_error=self._on_exchange_error)
+
+    def _on_exchange_ready(self, account):
+        summary = STARTUP.summary()
+        print("Startup timings:", summary)
+        self.log(f"[INFO] Startup: {summary}")
+        risk.ENGINE.apply_account(account)  # balances for the pre-trade checks
+        self.exchange_ready = True
+        self._sync_exchange_meta()
+        self._start_live()
+
+    def _start_live(self):
+        """ stream + periodic timers; undone by on_pause """
+        self._open_stream()
+        self._timers = [Clock.schedule_interval(lambda dt: self._sync_exchange_meta(), exchange_meta.TIME_SYNC_SEC)]
+        if STATS_LOG_SEC:
+            self._timers.append(Clock.schedule_interval(lambda dt: self._log_feed_stats(), STATS_LOG_SEC))
+
+    def _stop_live(self):
+        self.io.cancel("ticker")
+        for ev in self._timers:
+            ev.cancel()
+        self._timers = []
+
+    def _open_stream(self):
+        symbol = self.root.ids.symbol_label.text
+        if not MOBILE_STREAM or not self.exchange_ready or symbol not in self.symbol_list:
+            return
+        self.last_tick = None
+        # same key -> the previous symbol's stream is closed
+        self.io.stream(mobile_feed.miniticker_stream(symbol, self.feed_stats), key="ticker",
+                       on_item=self._on_tick, on_error=lambda e: self.log(f"[WARN] Price stream: {e}"))
+
+    def _on_tick(self, tick):
+        if tick.symbol != self.root.ids.symbol_label.text:
+            return
+        self.last_tick, self._tick_at = tick, time.monotonic()
+        self.feed_stats.ui_updates += 1
+        risk.ENGINE.update_price(tick.symbol, tick.price)
+        self.root.ids.price_label.text = f"{tick.price:.2f}  ({tick.change_pct:+.2f}%)"
+        self.state_cache.put("price", {"price": tick.price, "change_pct": tick.change_pct}, tick.symbol)
+
+    def _log_feed_stats(self):
+        print("Feed stats:", self.feed_stats.report())
+
+    def _sync_exchange_meta(self):
+        """ server-time offset + exchangeInfo filters (disk cache with TTL) for order rounding """
+        meta = exchange_meta.META
+
+        async def job(c):
+            t0 = time.time()
+            st = await self.io.request("get_server_time")
+            meta.set_server_time(st["serverTime"], t0, time.time(), c)
+            if not meta.fresh and not await asyncio.to_thread(meta.load_disk):
+                info = await self.io.request("get_exchange_info")
+                await asyncio.to_thread(meta.update, info)
+            return len(meta.symbols)
+
+        def done(n):
+            self._meta_synced_at = time.monotonic()
+            meta.apply_to_risk(risk.ENGINE)
+            print(f"Exchange info: {n} symbols, clock offset {meta.time_offset_ms} ms")
+        self.io.submit(job, io_core.PRIORITY_BACKGROUND, key="exchange_meta", on_done=done,
+                       on_error=lambda e: self.log(f"[WARN] Exchange info: {e}"))
+
+    def _on_exchange_error(self, e):
+        self.log(f"[WARN] Exchange not ready: {e}")
 
     def set_symbol(self, symbol_text):
         # This function is called when a menu item is selected
+        changed = self.root.ids.symbol_label.text != symbol_text
+        if changed:
+            self.io.cancel("levels")  # don't show levels for the symbol we just left
         self.root.ids.symbol_label.text = symbol_text
         self.symbol_menu.dismiss()
+        if changed:
+            self._show_cached()
+            self._open_stream()
+
+    def _show_cached(self):
+        """ last known price / levels / balance, marked with their age, until fresh ones arrive """
+        symbol = self.root.ids.symbol_label.text
+        ids, cache = self.root.ids, self.state_cache
+        p = cache.get("price", symbol)
+        ids.price_label.text = f"{p['price']:.2f}  ({p['change_pct']:+.2f}%) · {mobile_feed.age(p)} ago" if p else "--"
+        lv = cache.get("levels", symbol)
+        ids.levels_label.text = (f"Entry {lv['entry']:.2f} · SL {lv['sl']:.2f} · TP {lv['tp']:.2f} "
+                                 f"({mobile_feed.age(lv)} ago)") if lv else ""
+        b = cache.get("balance")
+        ids.balance_label.text = f"Balance {b['free']} {b['asset']} ({mobile_feed.age(b)} ago)" if b else ""
 
     def open_symbol_menu(self):
         # This opens the dropdown menu
@@ -145,51 +290,97 @@ class CryptoBotApp(MDApp):
         show_snackbar_on_main_thread()
 
     def get_levels(self):
-        threading.Thread(target=self._get_levels_thread, daemon=True).start()
-
-    def _get_levels_thread(self):
-        if not client:
-            self.show_snackbar("Binance client not configured.")
+        symbol = self.root.ids.symbol_label.text
+        tick = self.last_tick
+        if tick is not None and tick.symbol == symbol and time.monotonic() - self._tick_at < TICK_FRESH_SEC:
+            self._show_levels(symbol, tick.price)   # streamed price is current, no request needed
             return
-        try:
-            symbol = self.root.ids.symbol_label.text
-            klines = client.get_klines(symbol=symbol, interval=Client.KLINE_INTERVAL_5MINUTE, limit=2)
-            last_close = float(klines[-1][4])
-            entry = last_close
-            stop_loss = entry * 0.99
-            target = entry * 1.02
-            self.log(f"[INFO] Levels for {symbol}: Entry: {entry:.2f}, SL: {stop_loss:.2f}, Target: {target:.2f}")
-        except Exception as e:
-            self.show_snackbar(f"Error: {str(e)}")
 
-    def check_balance(self):
-        threading.Thread(target=self._check_balance_thread, daemon=True).start()
+        def done(klines):
+            self.feed_stats.on_rest(klines)
+            self._show_levels(symbol, float(klines[-1][4]))
+        self.io.call("get_klines", io_core.PRIORITY_USER, key="levels", on_done=done,
+                     on_error=lambda e: self.show_snackbar(f"Error: {str(e)}"),
+                     symbol=symbol, interval="5m", limit=2)
 
-    def _check_balance_thread(self):
-        if not client:
-            self.show_snackbar("Binance client not configured.")
+    def _show_levels(self, symbol, last_close):
+        if symbol != self.root.ids.symbol_label.text:
             return
-        try:
-            balance = client.get_asset_balance(asset="USDT")
+        risk.ENGINE.update_price(symbol, last_close)
+        entry = last_close
+        stop_loss = entry * 0.99
+        target = entry * 1.02
+        self.state_cache.put("levels", {"entry": entry, "sl": stop_loss, "tp": target}, symbol)
+        self.root.ids.levels_label.text = f"Entry {entry:.2f} · SL {stop_loss:.2f} · TP {target:.2f}"
+        self.log(f"[INFO] Levels for {symbol}: Entry: {entry:.2f}, SL: {stop_loss:.2f}, Target: {target:.2f}")
+
+    def check_balance(self):
+        def done(balance):
+            self.feed_stats.on_rest(balance)
+            self.state_cache.put("balance", {"asset": "USDT", "free": balance["free"]})
+            self.root.ids.balance_label.text = f"Balance {balance['free']} USDT"
             self.log(f"[INFO] Balance: {balance['free']} USDT")
-        except Exception as e:
-            self.show_snackbar(f"Error: {str(e)}")
+        self.io.call("get_asset_balance", io_core.PRIORITY_USER, key="balance", on_done=done,
+                     on_error=lambda e: self.show_snackbar(f"Error: {str(e)}"),
+                     asset="USDT")
 
     def place_order(self, side):
-        threading.Thread(target=self._place_order_thread, args=(side,), daemon=True).start()
-
-    def _place_order_thread(self, side):
-        if not client:
-            self.show_snackbar("Binance client not configured.")
-            return
+        symbol = self.root.ids.symbol_label.text
         try:
-            symbol = self.root.ids.symbol_label.text
             qty = float(self.root.ids.qty_input.text)
-            order = client.create_test_order(symbol=symbol, side=side, type='MARKET', quantity=qty)
+        except ValueError:
+            self.show_snackbar("Invalid quantity")
+            return
+        f = exchange_meta.META.get(symbol)
+        if f is not None:
+            qty_s = f.qty(qty)   # floor to the lot step
+            problem = f.check(qty_s, risk.ENGINE.prices.get(symbol))
+            if problem:
+                self.log(f"[RISK] {side} {qty} {symbol} rejected: {problem}")
+                self.show_snackbar(f"Rejected: {problem}")
+                return
+            qty = float(qty_s)
+        else:
+            qty_s = str(qty)
+        decision = risk.ENGINE.check(symbol, side, qty)
+        if not decision:
+            self.log(f"[RISK] {side} {qty} {symbol} rejected: {decision.reason}")
+            self.show_snackbar(f"Rejected: {decision.reason}")
+            return
+
+        def placed(order):
             self.log(f"[SUCCESS] {side} order placed for {qty} {symbol}.")
             self.show_snackbar(f"{side} order successful!")
-        except Exception as e:
-            self.show_snackbar(f"Order Error: {str(e)}")
+
+        # orders: highest priority, no key -> never superseded or dropped
+        self.io.call("create_test_order", io_core.PRIORITY_ORDER, on_done=placed,
+                     on_error=lambda e: self.show_snackbar(f"Order Error: {str(e)}"),
+                     symbol=symbol, side=side, type="MARKET", quantity=qty_s)
+
+    # -------------------------
+    # App lifecycle (Android / iOS background)
+    # -------------------------
+    def on_pause(self):
+        """ backgrounded: close the stream and timers, keep the last values on disk """
+        self._stop_live()
+        self.io.cancel("levels")
+        self.state_cache.save()
+        self._log_feed_stats()
+        return True   # keep the app alive, resume without a restart
+
+    def on_resume(self):
+        self._show_cached()   # instant, possibly stale; the stream refreshes the price within a second
+        if not self.exchange_ready:
+            return
+        if time.monotonic() - self._meta_synced_at >= exchange_meta.TIME_SYNC_SEC:
+            self._sync_exchange_meta()   # clock may have drifted while suspended
+        self._start_live()
+
+    def on_stop(self):
+        self._stop_live()
+        self.state_cache.save()
+        self._log_feed_stats()
+        self.io.stop()
 
 
 if __name__ == "__main__":
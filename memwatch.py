@@ -0,0 +1,162 @@
+# memwatch.py
+# Allocation tracking for long-running sessions (tracemalloc + process RSS).
+#   - start(): turn tracemalloc on and take the baseline snapshot
+#   - sample(): periodic snapshot -> RSS / traced-size history, plus the top growth sites (by source
+#     line) since the baseline and since the previous snapshot
+#   - rising(): least-squares trend over the history, used by the Memory panel and test_soak.py
+# tracemalloc makes allocation-heavy code slower, so it stays off unless asked for (MEMWATCH tunable
+# in gui.py or the Memory panel). RSS is sampled either way.
+# Usage: w = memwatch.MemWatch(); w.start(); ...; s = w.sample(); w.growth[:5]; w.rising()
+
+import os
+import time
+import tracemalloc
+from collections import deque, namedtuple
+
+FRAMES = 1          # stack depth per allocation (1 = group by the allocating line)
+TOP_N = 15
+HISTORY = 720       # samples kept (12 h at one per minute)
+RISE_MIN_BYTES = 1_000_000   # growth smaller than this is never reported as a leak
+
+Sample = namedtuple("Sample", "t rss traced peak")
+Site = namedtuple("Site", "where size_diff count_diff size")
+
+
+def rss_bytes():
+    """ resident set size of this process, or None if it can't be read """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource, sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # peak, not current
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+def slope(values):
+    """ least-squares slope per sample """
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mx = (n - 1) / 2.0
+    my = sum(values) / n
+    num = sum((i - mx) * (v - my) for i, v in enumerate(values))
+    den = sum((i - mx) ** 2 for i in range(n))
+    return num / den
+
+
+def fmt_bytes(n):
+    if n is None:
+        return "-"
+    sign = "-" if n < 0 else ""
+    n = abs(n)
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{sign}{n:.0f} {unit}" if unit == "B" else f"{sign}{n:.1f} {unit}"
+        n /= 1024.0
+    return f"{sign}{n:.2f} GB"
+
+
+def _where(frame):
+    parts = frame.filename.replace("\\", "/").split("/")
+    return f"{'/'.join(parts[-2:])}:{frame.lineno}"
+
+
+class MemWatch:
+    def __init__(self, frames=FRAMES, top_n=TOP_N, history=HISTORY):
+        self.frames = frames
+        self.top_n = top_n
+        self.samples = deque(maxlen=history)
+        self.growth = []        # top Sites since the baseline
+        self.recent = []        # top Sites since the previous snapshot
+        self._baseline = None
+        self._prev = None
+        self._started_here = False
+
+    @property
+    def tracking(self):
+        return self._baseline is not None and tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_here = True
+        self.reset_baseline()
+
+    def stop(self):
+        if self._started_here:
+            tracemalloc.stop()
+            self._started_here = False
+        self._baseline = self._prev = None
+        self.growth, self.recent = [], []
+
+    def reset_baseline(self):
+        """ growth is measured from here on (also clears the history, so the trend starts fresh) """
+        self._baseline = self._prev = self._snapshot()
+        self.growth, self.recent = [], []
+        self.samples.clear()
+
+    # -------------------------
+    # Snapshots
+    # -------------------------
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def _top(self, new, old):
+        stats = new.compare_to(old, "lineno")
+        return [Site(_where(s.traceback[0]), s.size_diff, s.count_diff, s.size)
+                for s in stats[:self.top_n] if s.size_diff > 0]
+
+    def sample(self):
+        traced = peak = None
+        if self.tracking:
+            traced, peak = tracemalloc.get_traced_memory()
+            snap = self._snapshot()
+            self.growth = self._top(snap, self._baseline)
+            self.recent = self._top(snap, self._prev)
+            self._prev = snap
+        s = Sample(time.time(), rss_bytes(), traced, peak)
+        self.samples.append(s)
+        return s
+
+    # -------------------------
+    # Trend
+    # -------------------------
+    def series(self, field="traced"):
+        return [getattr(s, field) for s in self.samples if getattr(s, field) is not None]
+
+    def rising(self, field="traced", min_samples=5, min_growth=RISE_MIN_BYTES):
+        """
+        True if memory keeps climbing: positive trend over the history *and* the fitted growth
+        across it is above min_growth (so allocator noise and one-off caches don't count).
+        """
+        values = self.series(field)
+        if len(values) < min_samples:
+            return False
+        return slope(values) * (len(values) - 1) > min_growth
+
+    def summary(self):
+        s = self.samples[-1] if self.samples else None
+        if s is None:
+            return "no samples"
+        text = f"RSS {fmt_bytes(s.rss)}"
+        if s.traced is not None:
+            text += f", traced {fmt_bytes(s.traced)} (peak {fmt_bytes(s.peak)})"
+            values = self.series()
+            if len(values) > 1:
+                text += f", trend {fmt_bytes(slope(values))}/sample"
+        return text
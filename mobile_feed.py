@@ -0,0 +1,192 @@
+# mobile_feed.py
+# Low-bandwidth live price for the Kivy app (main.py).
+#   - one compact websocket per selected symbol (<symbol>@miniTicker, ~150 bytes once a second),
+#     run as an io_core stream; no REST polling while it is open
+#   - DeltaFilter: only price moves >= MIN_MOVE_PCT (or a heartbeat every HEARTBEAT_SEC) reach the UI,
+#     and never more than one update per MIN_UI_SEC, so the screen isn't redrawn for nothing
+#   - StateCache: last levels / balance / price in a small JSON file, shown instantly on start/resume
+#   - FeedStats: messages, payload bytes, UI updates, REST calls and process CPU per hour
+# The app closes the stream on pause (backgrounded = no radio, no CPU) and reopens it on resume.
+# On a desktop with the local hub (hub.py) running, the ticker comes from the hub instead of a
+# websocket of our own; when the hub can't be reached (e.g. a stale socket file left by a killed hub)
+# the stream switches to its own websocket at once and only tries the hub again after HUB_RETRY_SEC.
+
+import asyncio
+import json
+import os
+import time
+from collections import namedtuple
+
+MIN_MOVE_PCT = 0.01      # % price change worth a UI update
+MIN_UI_SEC = 1.0
+HEARTBEAT_SEC = 30.0     # push an update even if flat (keeps "age" and 24h change fresh)
+RECONNECT_MAX_SEC = 60.0
+HUB_RETRY_SEC = 60.0     # after a failed hub connection, use our own websocket this long
+
+Tick = namedtuple("Tick", "symbol price change_pct high low quote_volume event_ms")
+
+
+class DeltaFilter:
+    def __init__(self, min_move_pct=MIN_MOVE_PCT, min_ui_sec=MIN_UI_SEC, heartbeat_sec=HEARTBEAT_SEC):
+        self.min_move = min_move_pct / 100.0
+        self.min_ui_sec = min_ui_sec
+        self.heartbeat_sec = heartbeat_sec
+        self._last_price = None
+        self._last_emit = 0.0
+
+    def offer(self, msg, now=None):
+        """ raw miniTicker message -> Tick worth showing, or None """
+        now = time.monotonic() if now is None else now
+        price = float(msg["c"])
+        since = now - self._last_emit
+        if self._last_price is not None:
+            moved = abs(price - self._last_price) >= self._last_price * self.min_move
+            if since < self.min_ui_sec or (not moved and since < self.heartbeat_sec):
+                return None
+        self._last_price, self._last_emit = price, now
+        o = float(msg["o"])
+        return Tick(msg["s"], price, (price - o) / o * 100.0 if o else 0.0, float(msg["h"]), float(msg["l"]),
+                    float(msg["q"]), msg.get("E"))
+
+
+class FeedStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.cpu0 = time.process_time()
+        self.active_sec = 0.0      # time a stream was open (paused time doesn't count)
+        self._open_since = None
+        self.messages = 0
+        self.bytes = 0
+        self.ui_updates = 0
+        self.rest_calls = 0
+        self.rest_bytes = 0
+        self.reconnects = 0
+
+    def stream_open(self):
+        if self._open_since is None:
+            self._open_since = time.monotonic()
+
+    def stream_closed(self):
+        if self._open_since is not None:
+            self.active_sec += time.monotonic() - self._open_since
+            self._open_since = None
+
+    def on_message(self, msg):
+        self.messages += 1
+        self.bytes += len(json.dumps(msg, separators=(",", ":")))
+
+    def on_rest(self, result):
+        self.rest_calls += 1
+        self.rest_bytes += len(json.dumps(result, separators=(",", ":")))
+
+    def report(self):
+        """ per-hour rates over the wall time since reset (payload bytes, no TLS / HTTP overhead) """
+        hours = max(time.monotonic() - self.started, 1.0) / 3600.0
+        active = self.active_sec + (time.monotonic() - self._open_since if self._open_since else 0.0)
+        return {"stream_kb_h": round(self.bytes / 1024 / hours, 1), "msgs_h": round(self.messages / hours),
+                "ui_updates_h": round(self.ui_updates / hours), "rest_calls_h": round(self.rest_calls / hours, 1),
+                "rest_kb_h": round(self.rest_bytes / 1024 / hours, 1),
+                "cpu_s_h": round((time.process_time() - self.cpu0) / hours, 1),
+                "stream_open_pct": round(100.0 * active / (hours * 3600.0)), "reconnects": self.reconnects}
+
+
+def miniticker_stream(symbol, stats, delta=None):
+    """ io_core.stream() job: emits Ticks for one symbol, reconnecting with backoff until cancelled """
+    delta = delta or DeltaFilter()
+
+    async def run(client, emit):
+        from binance import BinanceSocketManager
+        bm = BinanceSocketManager(client)
+        backoff = 1.0
+        hub_down_until = 0.0
+        while True:
+            use_hub = _hub_running() and time.monotonic() >= hub_down_until
+            try:
+                if use_hub:
+                    import hub
+                    stats.stream_open()
+                    async for msg in hub.messages([{"topic": "ticker", "symbol": symbol}]):
+                        backoff = 1.0
+                        stats.on_message(msg)
+                        tick = delta.offer(msg)
+                        if tick is not None:
+                            emit(tick)
+                else:
+                    async with bm.symbol_miniticker_socket(symbol) as sock:
+                        stats.stream_open()
+                        backoff = 1.0
+                        while True:
+                            msg = await sock.recv()
+                            if msg.get("e") == "error":
+                                raise ConnectionError(msg.get("m", "stream error"))
+                            stats.on_message(msg)
+                            tick = delta.offer(msg)
+                            if tick is not None:
+                                emit(tick)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                stats.reconnects += 1
+                if use_hub:
+                    hub_down_until = time.monotonic() + HUB_RETRY_SEC
+                    continue   # straight to our own websocket, no backoff
+                await asyncio.sleep(backoff)
+                backoff = min(RECONNECT_MAX_SEC, backoff * 2)
+            finally:
+                stats.stream_closed()
+    return run
+
+
+def _hub_running():
+    """ local hub socket present (never on a phone; hub.py needs numpy, which the APK doesn't ship) """
+    try:
+        import config
+        path = getattr(config, "HUB_SOCKET", "/tmp/cryptobot-hub.sock")
+    except ImportError:
+        return False
+    return os.path.exists(path)
+
+
+class StateCache:
+    """ {"levels": {symbol: {...}}, "balance": {...}, "price": {symbol: {...}}}, each entry stamped with "at" """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {"levels": {}, "balance": None, "price": {}}
+        self.dirty = False
+        try:
+            with open(path, encoding="utf-8") as fh:
+                self.data.update(json.load(fh))
+        except (OSError, ValueError):
+            pass
+
+    def put(self, section, value, symbol=None):
+        value = dict(value, at=time.time())
+        if symbol is None:
+            self.data[section] = value
+        else:
+            self.data[section][symbol] = value
+        self.dirty = True
+
+    def get(self, section, symbol=None):
+        v = self.data.get(section)
+        return v.get(symbol) if symbol is not None and v else v
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.data, fh)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def age(entry):
+    """ "12s" / "5m" / "3h" since entry["at"] """
+    secs = max(0, int(time.time() - entry.get("at", time.time())))
+    return f"{secs}s" if secs < 60 else f"{secs // 60}m" if secs < 3600 else f"{secs // 3600}h"
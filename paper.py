@@ -0,0 +1,420 @@
+# paper.py
+# Paper-trading broker with the order side of the exchange client's interface:
+#   create_order / create_test_order / create_oco_order / cancel_order / get_asset_balance /
+#   get_account / get_symbol_ticker (anything else is read from the market data client).
+# Orders are matched locally:
+#   - MARKET: against a local order book if one was set (walks the levels), else at the last price
+#     +- slippage, limited to PARTICIPATION of the last bar's volume; the rest stays working and
+#     fills from the following candles (PARTIALLY_FILLED until done)
+#   - OCO legs: the limit leg fills when a candle trades through its price, the stop leg triggers
+#     on the stop price and then works as a limit at stopLimitPrice; if one candle touches both,
+#     the stop is assumed to go first. Leg fills are also limited by bar volume.
+# Fees are charged like on the exchange (base asset on buys, quote asset on sells). Fills of working
+# orders are published on the event bus (FILL / OCO_DONE) so journal, risk engine and GUI see them.
+# Listeners (add_listener) also get user-data-stream style executionReport / listStatus dicts, so the
+# position monitor (positions.py) runs on the same events as against the exchange.
+#
+# Feed it candles with on_klines(symbol, klines) (live refresh or replay bars).
+
+import itertools
+import threading
+import time
+
+import events
+
+FEE_RATE = 0.001            # 0.1% taker/maker
+SLIPPAGE_BPS = 2.0          # market orders without a book
+PARTICIPATION = 0.1         # max share of a candle's volume we may take
+START_BALANCES = {"USDT": 10000.0}
+QUOTE_ASSETS = ("USDT", "BUSD", "USDC", "FDUSD", "BTC", "ETH", "BNB")
+
+
+class PaperBrokerError(Exception):
+    """ mirrors BinanceAPIException's code / message for rejected requests """
+
+    def __init__(self, code, message):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.code = code
+        self.message = message
+
+
+def split_symbol(symbol):
+    for q in QUOTE_ASSETS:
+        if symbol.endswith(q) and len(symbol) > len(q):
+            return symbol[:-len(q)], q
+    raise PaperBrokerError(-1121, f"Invalid symbol {symbol}")
+
+
+def _fmt(x):
+    return f"{x:.8f}"
+
+
+class _Reservation:
+    """ funds locked for working orders (both OCO legs share one) """
+
+    def __init__(self, asset, amount):
+        self.asset = asset
+        self.amount = amount
+
+
+class _Working:
+    """ an order (or OCO leg) resting in the paper book """
+
+    def __init__(self, order_id, symbol, side, type_, qty, price=None, stop_price=None, list_id=-1, reservation=None):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.side = side
+        self.type = type_
+        self.qty = qty
+        self.price = price
+        self.stop_price = stop_price
+        self.list_id = list_id
+        self.reservation = reservation
+        self.filled = 0.0
+        self.quote = 0.0
+        self.triggered = type_ != "STOP_LOSS_LIMIT"
+        self.status = "NEW"
+
+    @property
+    def remaining(self):
+        return self.qty - self.filled
+
+
+class PaperBroker:
+    def __init__(self, market=None, balances=None, fee_rate=FEE_RATE, slippage_bps=SLIPPAGE_BPS,
+                 participation=PARTICIPATION, publish=True):
+        """
+        market: client-like object for prices / klines (live client or replay), or a zero-arg callable
+        returning one (so the GUI can switch live <-> replay underneath).
+        """
+        self._market = market
+        self.fee_rate = fee_rate
+        self.slippage = slippage_bps / 10000.0
+        self.participation = participation
+        self.publish = publish
+        self._lock = threading.RLock()
+        self.free = dict(START_BALANCES if balances is None else balances)
+        self.locked = {}
+        self.prices = {}            # symbol -> last price
+        self.books = {}             # symbol -> (bids, asks) [(price, qty), ...] best first
+        self.last_bar = {}          # symbol -> (open_time, volume seen so far)
+        self.bar_volume = {}        # symbol -> volume of the last complete/forming bar
+        self._reseed = set()        # symbols whose next candle batch only sets the reference bar
+        self.working = {}           # order_id -> _Working
+        self.lists = {}             # orderListId -> [order ids]
+        self._ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._list_ids = itertools.count(1)
+        self.fees_paid = {}
+        self.listeners = []         # fn(report) for executionReport / listStatus dicts
+
+    def add_listener(self, fn):
+        self.listeners.append(fn)
+
+    def _emit(self, report):
+        for fn in self.listeners:
+            try:
+                fn(report)
+            except Exception as e:
+                print(f"Paper broker listener failed: {e}")
+
+    def _report(self, w, exec_type, qty=0.0, price=0.0, fee=0.0, fee_asset=None, trade_id=-1):
+        """ executionReport for one order event (user data stream field names) """
+        if self.listeners:
+            self._emit({"e": "executionReport", "E": int(time.time() * 1000), "s": w.symbol, "S": w.side,
+                        "o": w.type, "q": _fmt(w.qty), "p": _fmt(w.price or 0.0), "P": _fmt(w.stop_price or 0.0),
+                        "x": exec_type, "X": w.status, "i": w.order_id, "g": w.list_id, "l": _fmt(qty),
+                        "z": _fmt(w.filled), "L": _fmt(price), "n": _fmt(fee), "N": fee_asset, "t": trade_id})
+
+    def _list_done(self, symbol, list_id):
+        if self.listeners:
+            self._emit({"e": "listStatus", "E": int(time.time() * 1000), "s": symbol, "g": list_id, "c": "OCO",
+                        "l": "ALL_DONE", "L": "ALL_DONE"})
+
+    @property
+    def market(self):
+        return self._market() if callable(self._market) else self._market
+
+    def __getattr__(self, name):
+        # read-only calls we don't simulate (get_klines, get_exchange_info, ...) go to the market client
+        if name.startswith("_") or self._market is None:
+            raise AttributeError(name)
+        return getattr(self.market, name)
+
+    # -------------------------
+    # Market data in
+    # -------------------------
+    def set_price(self, symbol, price):
+        self.prices[symbol] = float(price)
+
+    def set_book(self, symbol, bids, asks):
+        """ local order book snapshot: lists of (price, qty), best first """
+        with self._lock:
+            self.books[symbol] = ([(float(p), float(q)) for p, q in bids], [(float(p), float(q)) for p, q in asks])
+
+    def reset_market(self, symbol):
+        """
+        forget the candles / price / book seen for symbol (its clock jumps: replay started or stopped);
+        the next candle batch (a whole chart history) only takes its newest bar as the reference, working
+        orders stay and are matched against the bars that follow it
+        """
+        with self._lock:
+            for d in (self.last_bar, self.bar_volume, self.prices, self.books):
+                d.pop(symbol, None)
+            self._reseed.add(symbol)
+
+    def on_klines(self, symbol, klines):
+        """ new / updated candles (Binance kline rows, oldest first) -> match working orders """
+        with self._lock:
+            if symbol in self._reseed and klines:
+                self._reseed.discard(symbol)
+                k = klines[-1]
+                self.last_bar[symbol] = (int(k[0]), float(k[5]))
+                self.bar_volume[symbol] = float(k[5])
+                self.prices[symbol] = float(k[4])
+                return
+            for k in klines:
+                open_time, o, h, l, c, v = int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5])
+                prev = self.last_bar.get(symbol)
+                if prev is not None and open_time < prev[0]:
+                    continue                              # already processed
+                seen = prev[1] if prev is not None and prev[0] == open_time else 0.0
+                new_volume = max(0.0, v - seen)           # forming candle: only the volume added since last time
+                self.last_bar[symbol] = (open_time, v)
+                self.bar_volume[symbol] = v
+                self.prices[symbol] = c
+                if new_volume > 0 or seen == 0.0:
+                    self._match(symbol, o if seen == 0.0 else c, h, l, c, new_volume)
+
+    def _match(self, symbol, o, h, l, c, volume):
+        budget = volume * self.participation if volume else float("inf")
+        for w in sorted((w for w in self.working.values() if w.symbol == symbol), key=lambda w: w.order_id):
+            if budget <= 0:
+                break
+            if w.type == "MARKET":
+                price = o * (1 + self.slippage if w.side == "BUY" else 1 - self.slippage)
+            elif w.type == "STOP_LOSS_LIMIT":
+                if not w.triggered:
+                    hit = l <= w.stop_price if w.side == "SELL" else h >= w.stop_price
+                    if not hit:
+                        continue
+                    w.triggered = True
+                # triggered stop works as a limit order
+                if (w.side == "SELL" and h < w.price) or (w.side == "BUY" and l > w.price):
+                    continue
+                price = w.price
+            else:  # LIMIT / LIMIT_MAKER
+                if (w.side == "SELL" and h < w.price) or (w.side == "BUY" and l > w.price):
+                    continue
+                price = w.price
+            if w.order_id not in self.working:
+                continue   # sibling OCO leg cancelled earlier in this pass
+            qty = min(w.remaining, budget)
+            budget -= qty
+            self._fill(w, qty, price, resting=True)
+
+    # -------------------------
+    # Accounting
+    # -------------------------
+    def _fill(self, w, qty, price, resting):
+        base, quote = split_symbol(w.symbol)
+        notional = qty * price
+        if w.side == "BUY":
+            fee, fee_asset = qty * self.fee_rate, base
+            self._spend(w, quote, notional, resting)
+            self.free[base] = self.free.get(base, 0.0) + qty - fee
+        else:
+            fee, fee_asset = notional * self.fee_rate, quote
+            self._spend(w, base, qty, resting)
+            self.free[quote] = self.free.get(quote, 0.0) + notional - fee
+        self.fees_paid[fee_asset] = self.fees_paid.get(fee_asset, 0.0) + fee
+        w.filled += qty
+        w.quote += notional
+        w.status = "FILLED" if w.remaining <= 1e-12 else "PARTIALLY_FILLED"
+        fill = {"price": _fmt(price), "qty": _fmt(qty), "commission": _fmt(fee), "commissionAsset": fee_asset,
+                "tradeId": next(self._trade_ids)}
+        if resting and self.publish:
+            events.publish(events.FILL, symbol=w.symbol, side=w.side, order_id=w.order_id, price=price, qty=qty,
+                           commission=fee, commission_asset=fee_asset, trade_id=fill["tradeId"], source="paper")
+        self._report(w, "TRADE", qty, price, fee, fee_asset, fill["tradeId"])
+        if w.list_id != -1:
+            # first execution of an OCO leg cancels the other leg (it keeps the shared reservation)
+            for oid in self.lists.get(w.list_id, []):
+                other = self.working.get(oid)
+                if other is not None and other is not w:
+                    self.working.pop(oid)
+                    other.status = "CANCELED"
+                    self._report(other, "CANCELED")
+        if w.status == "FILLED":
+            self.working.pop(w.order_id, None)
+            self._release(w)
+            if w.list_id != -1:
+                self.lists.pop(w.list_id, None)
+                if self.publish:
+                    events.publish(events.OCO_DONE, symbol=w.symbol, side=w.side, order_list_id=w.list_id,
+                                   filled_type=w.type, price=w.price, source="paper")
+                self._list_done(w.symbol, w.list_id)
+        return fill
+
+    def _reserve(self, asset, amount):
+        if self.free.get(asset, 0.0) + 1e-12 < amount:
+            raise PaperBrokerError(-2010, "Account has insufficient balance for requested action.")
+        self.free[asset] = self.free.get(asset, 0.0) - amount
+        self.locked[asset] = self.locked.get(asset, 0.0) + amount
+        return _Reservation(asset, amount)
+
+    def _spend(self, w, asset, amount, resting):
+        r = w.reservation if resting else None
+        if r is not None:
+            # working order: pay from its reservation first, any shortfall (price moved) from free funds
+            from_locked = min(amount, r.amount)
+            r.amount -= from_locked
+            self.locked[asset] = self.locked.get(asset, 0.0) - from_locked
+            amount -= from_locked
+        if amount > 1e-12:
+            if self.free.get(asset, 0.0) + 1e-12 < amount:
+                raise PaperBrokerError(-2010, "Account has insufficient balance for requested action.")
+            self.free[asset] = self.free.get(asset, 0.0) - amount
+
+    def _release(self, w):
+        """ order done / cancelled: unlock whatever its reservation still holds """
+        r = w.reservation
+        if r is None or r.amount <= 0:
+            return
+        if w.list_id != -1 and any(oid in self.working for oid in self.lists.get(w.list_id, [])):
+            return  # the other OCO leg still needs the shared reservation
+        self.locked[r.asset] = self.locked.get(r.asset, 0.0) - r.amount
+        self.free[r.asset] = self.free.get(r.asset, 0.0) + r.amount
+        r.amount = 0.0
+
+    def _last_price(self, symbol):
+        p = self.prices.get(symbol)
+        if p is None and self._market is not None:
+            p = float(self.market.get_symbol_ticker(symbol=symbol)["price"])
+            self.prices[symbol] = p
+        if p is None:
+            raise PaperBrokerError(-1121, f"No price for {symbol}")
+        return p
+
+    # -------------------------
+    # Client interface
+    # -------------------------
+    def get_symbol_ticker(self, symbol=None, **kwargs):
+        with self._lock:
+            return {"symbol": symbol, "price": _fmt(self._last_price(symbol))}
+
+    def get_asset_balance(self, asset=None, **kwargs):
+        with self._lock:
+            return {"asset": asset, "free": _fmt(self.free.get(asset, 0.0)), "locked": _fmt(self.locked.get(asset, 0.0))}
+
+    def get_account(self, **kwargs):
+        with self._lock:
+            assets = set(self.free) | set(self.locked)
+            return {"canTrade": True, "accountType": "PAPER",
+                    "balances": [{"asset": a, "free": _fmt(self.free.get(a, 0.0)), "locked": _fmt(self.locked.get(a, 0.0))}
+                                 for a in sorted(assets)]}
+
+    def get_open_orders(self, symbol=None, **kwargs):
+        with self._lock:
+            return [{"symbol": w.symbol, "orderId": w.order_id, "orderListId": w.list_id, "side": w.side,
+                     "type": w.type, "origQty": _fmt(w.qty), "executedQty": _fmt(w.filled),
+                     "price": _fmt(w.price or 0.0), "stopPrice": _fmt(w.stop_price or 0.0), "status": w.status}
+                    for w in sorted(self.working.values(), key=lambda w: w.order_id)
+                    if symbol is None or w.symbol == symbol]
+
+    def create_test_order(self, **params):
+        split_symbol(params.get("symbol", ""))
+        return {}
+
+    def create_order(self, symbol, side, type, quantity=None, price=None, **kwargs):
+        if type != "MARKET":
+            raise PaperBrokerError(-1116, f"paper broker only simulates MARKET orders and OCO brackets, not {type}")
+        qty = float(quantity)
+        with self._lock:
+            base, quote = split_symbol(symbol)
+            w = _Working(next(self._ids), symbol, side, "MARKET", qty)
+            fills = []
+            book = self.books.get(symbol)
+            if book:
+                levels = book[1] if side == "BUY" else book[0]
+                for lvl_price, lvl_qty in levels:
+                    if w.remaining <= 0:
+                        break
+                    fills.append(self._fill(w, min(w.remaining, lvl_qty), lvl_price, resting=False))
+            else:
+                last = self._last_price(symbol)
+                price_ = last * (1 + self.slippage if side == "BUY" else 1 - self.slippage)
+                vol = self.bar_volume.get(symbol)
+                now = min(qty, vol * self.participation) if vol else qty
+                fills.append(self._fill(w, now, price_, resting=False))
+            if w.remaining > 1e-12:
+                # rest of the market order works against the next candles; reserve what it still needs
+                need = w.remaining * self._last_price(symbol) * 1.05 if side == "BUY" else w.remaining
+                w.reservation = self._reserve(quote if side == "BUY" else base, need)
+                self.working[w.order_id] = w
+            return {"symbol": symbol, "orderId": w.order_id, "orderListId": -1, "clientOrderId": f"paper-{w.order_id}",
+                    "transactTime": int(time.time() * 1000), "price": "0.00000000", "origQty": _fmt(qty),
+                    "executedQty": _fmt(w.filled), "cummulativeQuoteQty": _fmt(w.quote), "status": w.status,
+                    "timeInForce": "GTC", "type": "MARKET", "side": side, "fills": fills}
+
+    def create_oco_order(self, symbol, side, quantity, price, stopPrice, stopLimitPrice=None, **kwargs):
+        qty, tp, stop = float(quantity), float(price), float(stopPrice)
+        stop_limit = float(stopLimitPrice) if stopLimitPrice is not None else stop
+        with self._lock:
+            base, quote = split_symbol(symbol)
+            if side == "SELL":
+                r = self._reserve(base, qty)
+            else:
+                r = self._reserve(quote, qty * max(tp, stop_limit))
+            list_id = next(self._list_ids)
+            # stop leg gets the lower id -> matched first when one candle touches both prices
+            stop_leg = _Working(next(self._ids), symbol, side, "STOP_LOSS_LIMIT", qty, stop_limit, stop, list_id, r)
+            limit_leg = _Working(next(self._ids), symbol, side, "LIMIT_MAKER", qty, tp, None, list_id, r)
+            for w in (stop_leg, limit_leg):
+                self.working[w.order_id] = w
+                self._report(w, "NEW")
+            self.lists[list_id] = [stop_leg.order_id, limit_leg.order_id]
+            now = int(time.time() * 1000)
+            return {"orderListId": list_id, "contingencyType": "OCO", "listStatusType": "EXEC_STARTED",
+                    "listOrderStatus": "EXECUTING", "listClientOrderId": f"paper-list-{list_id}",
+                    "transactionTime": now, "symbol": symbol,
+                    "orders": [{"symbol": symbol, "orderId": w.order_id} for w in (stop_leg, limit_leg)],
+                    "orderReports": [{"symbol": symbol, "orderId": w.order_id, "orderListId": list_id,
+                                      "transactTime": now, "price": _fmt(w.price), "origQty": _fmt(qty),
+                                      "executedQty": "0.00000000", "status": "NEW", "type": w.type, "side": side,
+                                      **({"stopPrice": _fmt(w.stop_price)} if w.stop_price else {})}
+                                     for w in (stop_leg, limit_leg)]}
+
+    def cancel_order(self, symbol, orderId, **kwargs):
+        with self._lock:
+            w = self.working.pop(int(orderId), None)
+            if w is None:
+                raise PaperBrokerError(-2011, "Unknown order sent.")
+            w.status = "CANCELED"
+            self._report(w, "CANCELED")
+            if w.list_id != -1:
+                # cancelling one leg cancels the whole OCO
+                for oid in self.lists.pop(w.list_id, []):
+                    other = self.working.pop(oid, None)
+                    if other is not None:
+                        other.status = "CANCELED"
+                        self._report(other, "CANCELED")
+                self._list_done(symbol, w.list_id)
+            self._release(w)
+            return {"symbol": symbol, "orderId": w.order_id, "status": "CANCELED", "executedQty": _fmt(w.filled)}
+
+    def open_orders(self, symbol=None):
+        with self._lock:
+            return [w for w in self.working.values() if symbol is None or w.symbol == symbol]
+
+    def equity(self, quote="USDT"):
+        """ mark-to-market account value in `quote` using the last known prices """
+        with self._lock:
+            total = 0.0
+            for asset in set(self.free) | set(self.locked):
+                amount = self.free.get(asset, 0.0) + self.locked.get(asset, 0.0)
+                if asset == quote:
+                    total += amount
+                elif amount:
+                    total += amount * self.prices.get(asset + quote, 0.0)
+            return total
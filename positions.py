@@ -0,0 +1,489 @@
+# positions.py
+# Order / position monitor for the brackets the app places (market entry + OCO exit).
+#   - every bracket's state lives in memory and changes only on execution events: executionReport /
+#     listStatus from the user data stream (exchange) or the identical reports of the paper broker;
+#     nothing is polled per order, so dozens of brackets cost no extra requests
+#   - prices for trailing come from data the app already receives (chart refresh, ticker stream or
+#     the local hub) through on_price()
+#   - trailing stop: the stop follows the best price by trail_pct and only ever tightens; a move is a
+#     cancel + new OCO, at most one per REPLACE_MIN_SEC per bracket and REPLACES_PER_SEC overall
+#     (while a bracket waits, only its newest wanted levels are kept)
+#   - amend(): the same cancel/replace when the strategy moves the levels
+#   - leg fills and finished brackets go on the bus (FILL / OCO_DONE) for exchange brackets; the
+#     paper broker publishes its own fills
+# Order calls never run with the monitor's lock held (the paper broker reports back synchronously).
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import events
+
+REPLACE_MIN_SEC = 5.0       # per bracket: cancel/replace at most this often
+REPLACES_PER_SEC = 2        # all brackets together (each one = 1 cancel + 1 OCO = 3 order requests)
+TRAIL_STEP_PCT = 0.05       # move the stop only when it tightens by at least this much (%)
+STOP_LIMIT_GAP = 0.001      # stop-limit price this far beyond the stop (same as the trade workers)
+AMEND_MIN_PCT = 0.05        # amend() ignores level changes smaller than this (%), so scan jitter isn't churn
+CLOSED_KEEP = 200           # finished brackets kept for the panel
+EARLY_KEEP_SEC = 30.0       # reports for a list we don't know yet (arrived before track())
+
+OPEN, REPLACING, UNPROTECTED, CLOSED = "OPEN", "REPLACING", "UNPROTECTED", "CLOSED"
+
+
+class Bracket:
+    """ one OCO exit protecting one market entry """
+
+    def __init__(self, list_id, symbol, side, qty, entry, tp, sl, stop_limit, legs, trail_pct=None,
+                 publish=True, source=""):
+        self.list_id = list_id
+        self.symbol = symbol
+        self.side = side                # OCO side (exit); the position is the other way
+        self.qty = qty
+        self.entry = entry
+        self.tp = tp
+        self.sl = sl
+        self.stop_limit = stop_limit
+        self.legs = dict(legs)          # order_id -> order type
+        self.trail_pct = trail_pct
+        self.publish = publish          # exchange bracket: we report its fills on the bus
+        self.source = source
+        self.status = OPEN
+        self.filled = 0.0               # exit quantity executed
+        self.exit_quote = 0.0
+        self.last = entry
+        self.best = entry               # best price since entry / trail start
+        self.want = None                # (tp, sl) waiting for a replace slot
+        self.replaced_at = 0.0
+        self.replaces = 0
+        self.closing = False            # close() in progress: cancel then market exit
+        self.outcome = None
+        self.done_sent = False          # OCO_DONE already published for the current list (failed replace)
+        self.opened_at = time.time()
+        self.closed_at = None
+
+    @property
+    def long(self):
+        return self.side == "SELL"
+
+    @property
+    def remaining(self):
+        return max(0.0, self.qty - self.filled)
+
+    def pnl(self):
+        """ realized on the executed exit + unrealized on the rest at the last price """
+        sign = 1.0 if self.long else -1.0
+        realized = sign * (self.exit_quote - self.entry * self.filled)
+        return realized + sign * (self.last - self.entry) * self.remaining
+
+    def snapshot(self):
+        return {"list_id": self.list_id, "symbol": self.symbol, "side": "LONG" if self.long else "SHORT",
+                "qty": self.qty, "remaining": self.remaining, "entry": self.entry, "last": self.last,
+                "tp": self.tp, "sl": self.sl, "trail_pct": self.trail_pct, "status": self.status,
+                "pnl": self.pnl(), "replaces": self.replaces, "outcome": self.outcome,
+                "opened_at": self.opened_at, "closed_at": self.closed_at}
+
+
+class PositionMonitor:
+    def __init__(self, client_factory, execute=None, rules=None, publish_order=None):
+        """
+        client_factory(): sync order client (exchange or paper broker) for cancels / new OCOs
+        execute(fn): run order work off the calling thread (default: one private worker thread)
+        rules(symbol): exchange_meta filters for rounding, or None
+        publish_order(order, symbol, side, qty): report a market exit placed by close()
+        """
+        self.client_factory = client_factory
+        self._pool = None
+        if execute is None:
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="positions")
+            execute = self._pool.submit
+        self.execute = execute
+        self.rules = rules
+        self.publish_order = publish_order
+        self._lock = threading.RLock()
+        self.brackets = {}              # list_id -> open Bracket
+        self._by_symbol = {}            # symbol -> {list_id}
+        self._early = {}                # list_id -> (first seen, [reports])
+        self._replace_times = deque()   # start times of recent replaces (global rate limit)
+        self.closed = deque(maxlen=CLOSED_KEEP)
+        self.on_change = None           # fn() after any state change (UI refresh hint)
+        self.counts = {"reports": 0, "replaces": 0, "replace_errors": 0, "fills": 0}
+
+    # -------------------------
+    # Registration / queries
+    # -------------------------
+    def track(self, oco, symbol, side, qty, entry, tp, sl, stop_limit, trail_pct=None, publish=True, source=""):
+        """ create_oco_order() response -> tracked bracket (side = OCO side) """
+        legs = {r["orderId"]: r.get("type", "") for r in oco.get("orderReports", [])} or \
+               {o["orderId"]: "" for o in oco.get("orders", [])}
+        b = Bracket(oco["orderListId"], symbol, side, float(qty), float(entry), float(tp), float(sl),
+                    float(stop_limit), legs, trail_pct or None, publish, source)
+        with self._lock:
+            self._add(b)
+            early = self._early.pop(b.list_id, None)
+        for report in (early[1] if early else ()):
+            self.on_user_event(report)   # executions that beat us here
+        self._changed()
+        return b
+
+    def _add(self, b):
+        self.brackets[b.list_id] = b
+        self._by_symbol.setdefault(b.symbol, set()).add(b.list_id)
+
+    def _remove(self, b):
+        self.brackets.pop(b.list_id, None)
+        ids = self._by_symbol.get(b.symbol)
+        if ids is not None:
+            ids.discard(b.list_id)
+            if not ids:
+                del self._by_symbol[b.symbol]
+
+    def symbols(self):
+        with self._lock:
+            return sorted(self._by_symbol)
+
+    def snapshot(self, closed=False):
+        with self._lock:
+            rows = [b.snapshot() for b in self.brackets.values()]
+            if closed:
+                rows += [b.snapshot() for b in reversed(self.closed)]
+            return rows
+
+    # -------------------------
+    # Execution events in
+    # -------------------------
+    def on_user_event(self, msg):
+        """ user data stream message (raw, or wrapped in "data" / "event") """
+        msg = msg.get("data", msg)
+        msg = msg.get("event", msg)
+        kind = msg.get("e")
+        if kind == "executionReport":
+            self._on_execution(msg)
+        elif kind == "listStatus":
+            self._on_list_status(msg)
+
+    def _bracket_for(self, msg):
+        """ -> tracked bracket, or None (report parked if it may belong to a list not tracked yet) """
+        list_id = msg.get("g", -1)
+        if list_id in (-1, None):
+            return None   # not part of an order list (entry / manual orders)
+        b = self.brackets.get(list_id)
+        if b is None:
+            now = time.monotonic()
+            for k in [k for k, (t, _) in self._early.items() if now - t > EARLY_KEEP_SEC]:
+                del self._early[k]
+            self._early.setdefault(list_id, (now, []))[1].append(msg)
+        return b
+
+    def _on_execution(self, msg):
+        publish = None
+        with self._lock:
+            self.counts["reports"] += 1
+            b = self._bracket_for(msg)
+            if b is None or int(msg["i"]) not in b.legs:
+                return   # unknown, or a leg of the list this bracket replaced
+            if msg.get("x") == "TRADE":
+                qty, price = float(msg["l"]), float(msg["L"])
+                b.filled += qty
+                b.exit_quote += qty * price
+                b.last = price
+                self.counts["fills"] += 1
+                if b.publish:
+                    publish = dict(symbol=b.symbol, side=msg["S"], order_id=msg["i"], price=price, qty=qty,
+                                   commission=float(msg.get("n") or 0), commission_asset=msg.get("N"),
+                                   trade_id=msg.get("t"), source="bracket")
+                if msg.get("X") == "FILLED":
+                    b.outcome = "TP" if msg.get("o", "").startswith("LIMIT") else "SL"
+        if publish:
+            events.publish(events.FILL, **publish)
+        self._changed()
+
+    def _on_list_status(self, msg):
+        if msg.get("l") != "ALL_DONE":
+            return
+        with self._lock:
+            b = self._bracket_for(msg)
+            if b is None or b.status == REPLACING:
+                return   # our own cancel of the old list while replacing it
+            if b.closing:
+                return   # close(): _close_market finishes it
+            self._finish(b, b.outcome or ("PARTIAL" if b.filled else "CANCELED"))
+
+    def _finish(self, b, outcome):
+        """ under the lock: bracket is done """
+        b.status = CLOSED
+        b.outcome = outcome
+        b.closed_at = time.time()
+        self._remove(b)
+        self.closed.append(b)
+        # fills of paper brackets were published by the broker together with its own OCO_DONE; a failed
+        # replace already reported its list as done (one OCO_DONE per OCO, or the risk count goes wrong)
+        if not b.done_sent and (b.publish or outcome not in ("TP", "SL")):
+            events.publish(events.OCO_DONE, symbol=b.symbol, side=b.side, order_list_id=b.list_id,
+                           outcome=outcome, qty=b.filled, source="bracket")
+        self._changed()
+
+    # -------------------------
+    # Prices / trailing
+    # -------------------------
+    def on_price(self, symbol, price):
+        price = float(price)
+        with self._lock:
+            ids = self._by_symbol.get(symbol)
+            if not ids:
+                return
+            for list_id in ids:
+                b = self.brackets[list_id]
+                b.last = price
+                if b.trail_pct and b.status == OPEN and not b.closing:
+                    self._trail(b, price)
+            self._pump()
+
+    def _trail(self, b, price):
+        t = b.trail_pct / 100.0
+        step = TRAIL_STEP_PCT / 100.0
+        sl = (b.want or (b.tp, b.sl))[1]
+        if b.long:
+            b.best = max(b.best, price)
+            new_sl = b.best * (1 - t)
+            # only tighten, and never put the stop through the market (it would trigger at once)
+            if new_sl > sl * (1 + step) and new_sl < price:
+                b.want = (b.tp, new_sl)
+        else:
+            b.best = min(b.best, price)
+            new_sl = b.best * (1 + t)
+            if new_sl < sl * (1 - step) and new_sl > price:
+                b.want = (b.tp, new_sl)
+
+    def set_trail(self, list_id, pct):
+        """ trailing distance in % (None / 0 = fixed stop) """
+        with self._lock:
+            b = self.brackets.get(list_id)
+            if b is None:
+                return False
+            b.trail_pct = pct or None
+            b.best = b.last
+            if b.trail_pct:
+                self._trail(b, b.last)
+            self._pump()
+        self._changed()
+        return True
+
+    def amend(self, list_id, tp=None, sl=None):
+        """ new exit levels (e.g. from the strategy); applied as cancel + new OCO, rate-limited """
+        with self._lock:
+            b = self.brackets.get(list_id)
+            if b is None or b.closing:
+                return False
+            cur = b.want or (b.tp, b.sl)
+            want = (cur[0] if tp is None else float(tp), cur[1] if sl is None else float(sl))
+            eps = AMEND_MIN_PCT / 100.0
+            if abs(want[0] - b.tp) <= eps * b.tp and abs(want[1] - b.sl) <= eps * b.sl:
+                b.want = None
+                return False
+            b.want = want
+            self._pump()
+        return True
+
+    def amend_symbol(self, symbol, position_side, tp=None, sl=None):
+        """ strategy levels for symbol -> amend every open bracket holding a position that way ("BUY" = long) """
+        with self._lock:
+            ids = [i for i in self._by_symbol.get(symbol, ())
+                   if self.brackets[i].long == (position_side == "BUY")]
+        return sum(1 for i in ids if self.amend(i, tp, sl))
+
+    def pump(self):
+        """ start replaces that were waiting on the rate limit (call now and then, e.g. from a UI timer) """
+        with self._lock:
+            self._pump()
+
+    def _pump(self):
+        now = time.monotonic()
+        while self._replace_times and now - self._replace_times[0] >= 1.0:
+            self._replace_times.popleft()
+        for b in list(self.brackets.values()):
+            if len(self._replace_times) >= REPLACES_PER_SEC:
+                return
+            if b.want is None or b.status != OPEN or b.closing or now - b.replaced_at < REPLACE_MIN_SEC:
+                continue
+            tp, sl = b.want
+            b.want = None
+            b.status = REPLACING
+            b.replaced_at = now
+            self._replace_times.append(now)
+            self.execute(lambda b=b, tp=tp, sl=sl: self._replace(b, tp, sl))
+
+    # -------------------------
+    # Order work (order worker thread, never under the lock)
+    # -------------------------
+    def _round(self, symbol):
+        f = self.rules(symbol) if self.rules else None
+        return (lambda p: f.price(p)) if f is not None else (lambda p: f"{p:.8f}"), \
+               (lambda q: f.qty(q)) if f is not None else (lambda q: f"{q:.8f}")
+
+    def _replace(self, b, tp, sl):
+        price_s, qty_s = self._round(b.symbol)
+        stop_limit = sl * (1 - STOP_LIMIT_GAP) if b.long else sl * (1 + STOP_LIMIT_GAP)
+        client = self.client_factory()
+        with self._lock:
+            leg = next(iter(b.legs))
+            old_id = b.list_id
+        try:
+            client.cancel_order(symbol=b.symbol, orderId=leg)   # one leg cancels the whole list
+        except Exception as e:
+            # usually: a leg filled first; its execution report closes the bracket
+            with self._lock:
+                self.counts["replace_errors"] += 1
+                if b.status == REPLACING:
+                    b.status = OPEN
+            events.publish(events.ERROR, symbol=b.symbol, source="trailing stop", message=f"cancel: {e}")
+            self._changed()
+            return
+        with self._lock:
+            remaining = b.remaining
+        try:
+            oco = client.create_oco_order(symbol=b.symbol, side=b.side, quantity=qty_s(remaining),
+                                          price=price_s(tp), stopPrice=price_s(sl),
+                                          stopLimitPrice=price_s(stop_limit), stopLimitTimeInForce="GTC")
+        except Exception as e:
+            with self._lock:
+                self.counts["replace_errors"] += 1
+                b.status = UNPROTECTED   # old list is gone: the panel shows it, close() still works
+                b.done_sent = True
+            events.publish(events.ERROR, symbol=b.symbol, source="trailing stop",
+                           message=f"new OCO failed, position unprotected: {e}")
+            events.publish(events.OCO_DONE, symbol=b.symbol, side=b.side, order_list_id=old_id,
+                           outcome="REPLACE_FAILED", qty=b.filled, source="bracket")
+            self._changed()
+            return
+        with self._lock:
+            self.brackets.pop(old_id, None)
+            self._by_symbol.get(b.symbol, set()).discard(old_id)
+            b.list_id = oco["orderListId"]
+            b.legs = {r["orderId"]: r.get("type", "") for r in oco.get("orderReports", [])} or \
+                     {o["orderId"]: "" for o in oco.get("orders", [])}
+            b.tp, b.sl, b.stop_limit = float(price_s(tp)), float(price_s(sl)), float(price_s(stop_limit))
+            b.status = OPEN
+            b.replaces += 1
+            self.counts["replaces"] += 1
+            self._add(b)
+            early = self._early.pop(b.list_id, None)
+        events.publish(events.OCO_DONE, symbol=b.symbol, side=b.side, order_list_id=old_id,
+                       outcome="REPLACED", qty=0.0, source="bracket")
+        events.publish(events.OCO, symbol=b.symbol, side=b.side, qty=remaining, tp=b.tp, sl=b.sl,
+                       stop_limit=b.stop_limit, source="trailing" if b.trail_pct else "amend",
+                       order_list_id=b.list_id)
+        for report in (early[1] if early else ()):
+            self.on_user_event(report)
+        self._changed()
+
+    def cancel(self, list_id):
+        """ drop the bracket's OCO (the position stays open, unprotected) """
+        with self._lock:
+            b = self.brackets.get(list_id)
+            if b is None or b.status != OPEN:
+                return False
+            leg = next(iter(b.legs))
+
+        def run():
+            try:
+                self.client_factory().cancel_order(symbol=b.symbol, orderId=leg)
+            except Exception as e:
+                events.publish(events.ERROR, symbol=b.symbol, source="bracket cancel", message=str(e))
+        self.execute(run)
+        return True
+
+    def close(self, list_id):
+        """ cancel the OCO and exit what is left at market """
+        with self._lock:
+            b = self.brackets.get(list_id)
+            if b is None or b.closing or b.status == REPLACING:
+                return False
+            b.closing = True
+            b.want = None
+            leg = next(iter(b.legs)) if b.status == OPEN else None
+        self.execute(lambda: self._close_market(b, leg))
+        self._changed()
+        return True
+
+    def _close_market(self, b, leg):
+        client = self.client_factory()
+        _, qty_s = self._round(b.symbol)
+        try:
+            if leg is not None:
+                client.cancel_order(symbol=b.symbol, orderId=leg)
+            with self._lock:
+                remaining = b.remaining
+            order = client.create_order(symbol=b.symbol, side=b.side, type="MARKET", quantity=qty_s(remaining))
+        except Exception as e:
+            with self._lock:
+                b.closing = False
+            events.publish(events.ERROR, symbol=b.symbol, source="bracket close", message=str(e))
+            self._changed()
+            return
+        if self.publish_order:
+            self.publish_order(order, b.symbol, b.side, remaining)
+        with self._lock:
+            for f in order.get("fills", []):   # the exit isn't part of the list: no report ties it to us
+                qty, price = float(f["qty"]), float(f["price"])
+                b.filled += qty
+                b.exit_quote += qty * price
+                b.last = price
+            if b.status != CLOSED:
+                self._finish(b, "MANUAL")
+
+    def _changed(self):
+        cb = self.on_change
+        if cb is not None:
+            cb()
+
+    def close_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+
+# -------------------------
+# Event sources (io_core.stream jobs)
+# -------------------------
+RECONNECT_MAX_SEC = 60.0
+
+
+def user_stream():
+    """ io_core.stream() job: emits user data stream messages (executionReport / listStatus / ...) """
+    async def run(client, emit):
+        await _reconnecting(lambda bm: bm.user_socket(), client, emit)
+    return run
+
+
+def price_stream(symbols):
+    """ io_core.stream() job: (symbol, price) for the given symbols from one multiplexed miniTicker socket """
+    streams = [f"{s.lower()}@miniTicker" for s in symbols]
+
+    async def run(client, emit):
+        def on_msg(msg):
+            d = msg.get("data", msg)
+            if "s" in d and "c" in d:
+                emit((d["s"], float(d["c"])))
+        await _reconnecting(lambda bm: bm.multiplex_socket(streams), client, on_msg)
+    return run
+
+
+async def _reconnecting(open_socket, client, emit):
+    from binance import BinanceSocketManager
+    bm = BinanceSocketManager(client)
+    backoff = 1.0
+    while True:
+        try:
+            async with open_socket(bm) as sock:
+                backoff = 1.0
+                while True:
+                    msg = await sock.recv()
+                    if msg.get("e") == "error":
+                        raise ConnectionError(msg.get("m", "stream error"))
+                    emit(msg)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await asyncio.sleep(backoff)
+            backoff = min(RECONNECT_MAX_SEC, backoff * 2)
@@ -0,0 +1,132 @@
+# replay.py
+# Accelerated historical replay. Recorded klines (CSV or candle_store) are released one bar at a
+# time at 1x..1000x real time. The replayer also quacks like the read side of the exchange client
+# (get_klines / get_symbol_ticker), so chart, levels and strategy code run unchanged against it.
+
+import threading
+import time
+
+from candle_store import INTERVAL_SECONDS
+
+MIN_SPEED = 1.0
+MAX_SPEED = 1000.0
+
+
+class CandleReplay:
+    """
+    replay = CandleReplay(klines, "BTCUSDT", "1m", on_bar=callback, speed=100)
+    replay.start() / pause() / resume() / step() / stop() / set_speed(x)
+    on_bar(replay) is called from the replay thread after every released bar.
+    """
+
+    def __init__(self, klines, symbol, interval, on_bar=None, on_done=None, speed=60.0, warmup=60):
+        if not klines:
+            raise ValueError("nothing to replay")
+        self.klines = klines
+        self.symbol = symbol
+        self.interval = interval
+        self.on_bar = on_bar
+        self.on_done = on_done
+        self.bar_seconds = INTERVAL_SECONDS.get(interval, 60)
+        self.speed = self._clamp(speed)
+        self.cursor = min(max(1, warmup), len(klines))   # bars already "in the past"
+        self._run = threading.Event()       # set -> playing
+        self._stepping = threading.Semaphore(0)
+        self._stopped = threading.Event()
+        self._thread = None
+        self.bars_played = 0
+        self.started_at = None
+        self.busy_sec = 0.0                 # time spent inside on_bar (UI/strategy work)
+
+    @staticmethod
+    def _clamp(speed):
+        return max(MIN_SPEED, min(MAX_SPEED, float(speed)))
+
+    # -------------------------
+    # Controls
+    # -------------------------
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._run.set()
+        self._thread = threading.Thread(target=self._loop, name="replay", daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        self._run.clear()
+
+    def resume(self):
+        self._run.set()
+
+    def step(self):
+        """ release exactly one bar while paused """
+        self._stepping.release()
+
+    def stop(self):
+        self._stopped.set()
+        self._run.set()
+        self._stepping.release()
+
+    def set_speed(self, speed):
+        self.speed = self._clamp(speed)
+
+    @property
+    def paused(self):
+        return not self._run.is_set()
+
+    @property
+    def finished(self):
+        return self.cursor >= len(self.klines)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # -------------------------
+    # Loop
+    # -------------------------
+    def _advance(self):
+        self.cursor += 1
+        self.bars_played += 1
+        t0 = time.perf_counter()
+        if self.on_bar:
+            self.on_bar(self)
+        self.busy_sec += time.perf_counter() - t0
+
+    def _loop(self):
+        next_due = time.perf_counter()
+        while not self._stopped.is_set() and not self.finished:
+            if not self._run.is_set():
+                # paused: wait for step() / resume()
+                if self._stepping.acquire(timeout=0.1) and not self._stopped.is_set():
+                    self._advance()
+                next_due = time.perf_counter()
+                continue
+            self._advance()
+            next_due += self.bar_seconds / self.speed
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                self._stopped.wait(delay)
+            else:
+                next_due = time.perf_counter()   # can't keep up: don't accumulate debt
+        if self.on_done:
+            self.on_done(self)
+
+    # -------------------------
+    # Exchange-client look-alike (read side only)
+    # -------------------------
+    def get_klines(self, symbol=None, interval=None, limit=500, **kwargs):
+        c = self.cursor
+        return self.klines[max(0, c - int(limit)):c]
+
+    def get_symbol_ticker(self, symbol=None, **kwargs):
+        return {"symbol": self.symbol, "price": str(self.klines[self.cursor - 1][4])}
+
+    def now_ms(self):
+        """ replay clock = close time of the newest released bar """
+        return int(self.klines[self.cursor - 1][6])
+
+    def stats(self):
+        wall = (time.perf_counter() - self.started_at) if self.started_at else 0.0
+        return {"bars": self.bars_played, "cursor": self.cursor, "total": len(self.klines),
+                "bars_per_sec": self.bars_played / wall if wall else 0.0,
+                "busy_pct": 100.0 * self.busy_sec / wall if wall else 0.0, "speed": self.speed}
@@ -0,0 +1,222 @@
+# resilience.py
+# Tail-latency control for idempotent exchange reads (used by io_core for async client calls).
+#   - per-endpoint timeout budget: the whole call (all attempts) finishes or fails within it
+#   - hedging: if the first attempt is still running after the endpoint's p95, a duplicate is
+#     sent and whichever answers first wins (the loser is cancelled)
+#   - retry with full-jitter exponential backoff on timeouts / network errors / 5xx / 429
+#   - circuit breaker: after N consecutive failures the endpoint fails fast for a cooldown,
+#     then one probe call decides whether it closes again
+# Only reads get that treatment (allowlist: READ_POLICIES or get_*); every other method (orders,
+# cancels, transfers, withdrawals, futures writes, ...) is passed straight through: no hedge, no retry,
+# no breaker.
+
+import asyncio
+import random
+import time
+from collections import deque
+
+# endpoint -> (timeout budget sec, hedge allowed)
+READ_POLICIES = {
+    "get_klines": (4.0, True),
+    "get_symbol_ticker": (2.0, True),
+    "get_ticker": (4.0, True),
+    "get_orderbook_ticker": (2.0, True),
+    "get_orderbook_tickers": (3.0, True),
+    "get_asset_balance": (3.0, False),
+    "get_account": (5.0, False),
+    "get_exchange_info": (8.0, False),
+    "get_server_time": (2.0, True),
+    "get_open_orders": (3.0, False),
+}
+DEFAULT_TIMEOUT = 5.0
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.2          # sec, doubled per attempt (full jitter)
+BACKOFF_CAP = 1.5
+HEDGE_MIN_SAMPLES = 20      # don't hedge until p95 means something
+HEDGE_MIN_DELAY = 0.05      # sec, never hedge sooner than this
+BREAKER_FAILURES = 5        # consecutive failures -> open
+BREAKER_COOLDOWN = 15.0     # sec before a probe is allowed
+WINDOW = 500                # latency samples kept per endpoint
+
+def is_read(method):
+    """ safe to hedge / retry: a known read endpoint or a get_* call """
+    return method in READ_POLICIES or method.startswith("get_")
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class LatencyTracker:
+    """ rolling latency window per name (endpoint or 'refresh') -> percentiles """
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        s = sorted(self.samples)
+        return s[min(len(s) - 1, int(q / 100.0 * len(s)))]
+
+    def report(self):
+        ms = lambda v: None if v is None else round(v * 1000, 1)
+        return {"n": self.count, "p50_ms": ms(self.percentile(50)), "p95_ms": ms(self.percentile(95)),
+                "p99_ms": ms(self.percentile(99)), "timeouts": self.timeouts, "errors": self.errors,
+                "hedges": self.hedges, "hedge_wins": self.hedge_wins, "retries": self.retries}
+
+
+class CircuitBreaker:
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def before_call(self):
+        st = self.state
+        if st == "open" or (st == "half-open" and self.probing):
+            raise CircuitOpen("circuit open")
+        if st == "half-open":
+            self.probing = True
+
+    def success(self):
+        self.consecutive = 0
+        self.opened_at = None
+        self.probing = False
+
+    def abandoned(self):
+        """ the call was cancelled before it could succeed or fail: let the next call probe instead """
+        self.probing = False
+
+    def failure(self):
+        self.consecutive += 1
+        if self.probing or self.consecutive >= self.failures:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+def _retryable(e):
+    if isinstance(e, (asyncio.TimeoutError, ConnectionError, OSError)):
+        return True
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        return status >= 500 or status == 429
+    # aiohttp client errors, without importing aiohttp here
+    return type(e).__module__.startswith("aiohttp")
+
+
+class Resilience:
+    def __init__(self):
+        self.trackers = {}
+        self.breakers = {}
+
+    def tracker(self, name):
+        t = self.trackers.get(name)
+        if t is None:
+            t = self.trackers[name] = LatencyTracker()
+        return t
+
+    def breaker(self, name):
+        b = self.breakers.get(name)
+        if b is None:
+            b = self.breakers[name] = CircuitBreaker()
+        return b
+
+    async def call(self, method, make_call):
+        """
+        make_call(): new awaitable for one attempt (called again for hedges / retries).
+        Reads get budget + hedge + retry + breaker; anything else is passed straight through.
+        """
+        if not is_read(method):
+            return await make_call()
+        budget, hedge = READ_POLICIES.get(method, (DEFAULT_TIMEOUT, False))
+        tr, br = self.tracker(method), self.breaker(method)
+        br.before_call()
+        try:
+            return await self._call(method, make_call, budget, hedge, tr, br)
+        except asyncio.CancelledError:
+            br.abandoned()   # superseded keyed jobs are cancelled all the time; a lost probe must not pin it open
+            raise
+
+    async def _call(self, method, make_call, budget, hedge, tr, br):
+        deadline = time.monotonic() + budget
+        last_exc = None
+        for attempt in range(MAX_ATTEMPTS):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            t0 = time.monotonic()
+            try:
+                result = await asyncio.wait_for(self._attempt(make_call, tr, hedge), remaining)
+            except Exception as e:
+                last_exc = e
+                if isinstance(e, asyncio.TimeoutError):
+                    tr.timeouts += 1
+                else:
+                    tr.errors += 1
+                if not _retryable(e):
+                    br.success()   # the endpoint answered, the request itself was bad
+                    raise
+                # full jitter backoff, but never past the budget
+                sleep = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                if time.monotonic() + sleep >= deadline:
+                    break
+                tr.retries += 1
+                await asyncio.sleep(sleep)
+                continue
+            tr.record(time.monotonic() - t0)
+            br.success()
+            return result
+        br.failure()
+        if last_exc is None or isinstance(last_exc, asyncio.TimeoutError):
+            raise asyncio.TimeoutError(f"{method}: no answer within {budget:.1f}s budget")
+        raise last_exc
+
+    async def _attempt(self, make_call, tr, hedge):
+        first, second = asyncio.ensure_future(make_call()), None
+        try:
+            p95 = tr.percentile(95) if hedge and len(tr.samples) >= HEDGE_MIN_SAMPLES else None
+            if p95 is None:
+                return await first
+            done, _ = await asyncio.wait({first}, timeout=max(HEDGE_MIN_DELAY, p95))
+            if done:
+                return first.result()
+            tr.hedges += 1
+            second = asyncio.ensure_future(make_call())
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for f in done:
+                    if f.exception() is None:
+                        if f is second:
+                            tr.hedge_wins += 1
+                        return f.result()
+                # the one that finished failed: keep waiting for the other
+            raise first.exception()
+        finally:
+            for f in (first, second):
+                if f is not None and not f.done():
+                    f.cancel()
+
+    def report(self):
+        return {name: {**t.report(), "breaker": self.breakers[name].state if name in self.breakers else "-"}
+                for name, t in list(self.trackers.items())}
@@ -0,0 +1,232 @@
+# risk.py
+# In-memory pre-trade risk engine. Every order (Tk buttons, strategy path, Kivy place_order) goes
+# through RiskEngine.check() right before create_order. All inputs are cached in memory:
+#   balances / positions  - synced from get_account() in the background + updated from fill events
+#   open OCO brackets     - counted from OCO events
+#   last prices           - fed by chart / ticker updates
+#   symbol filters        - min qty / step / min notional (set_symbol_filters)
+# so a check is a handful of dict lookups (microseconds), never a REST call.
+
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+import config
+import events
+
+# limits (override in config.py); 0 / None disables a limit
+MAX_ORDER_NOTIONAL = getattr(config, "RISK_MAX_ORDER_NOTIONAL", 1000.0)      # quote (USDT) per order
+MAX_SYMBOL_NOTIONAL = getattr(config, "RISK_MAX_SYMBOL_NOTIONAL", 2500.0)    # open position per symbol
+MAX_TOTAL_EXPOSURE = getattr(config, "RISK_MAX_TOTAL_EXPOSURE", 5000.0)      # sum over symbols
+MAX_DAILY_LOSS = getattr(config, "RISK_MAX_DAILY_LOSS", 200.0)               # realized, resets 00:00 UTC
+MAX_OPEN_OCO_PER_SYMBOL = getattr(config, "RISK_MAX_OPEN_OCO_PER_SYMBOL", 3)
+DUPLICATE_WINDOW_SEC = getattr(config, "RISK_DUPLICATE_WINDOW_SEC", 5.0)     # same symbol/side/qty
+QUOTE_ASSET = "USDT"
+
+
+class RiskDecision:
+    __slots__ = ("ok", "reason", "notional", "elapsed_us")
+
+    def __init__(self, ok, reason="", notional=None, elapsed_us=0.0):
+        self.ok = ok
+        self.reason = reason
+        self.notional = notional
+        self.elapsed_us = elapsed_us
+
+    def __bool__(self):
+        return self.ok
+
+    def __repr__(self):
+        return f"RiskDecision(ok={self.ok}, reason={self.reason!r}, notional={self.notional}, {self.elapsed_us:.1f}us)"
+
+
+def _base_asset(symbol):
+    return symbol[:-len(QUOTE_ASSET)] if symbol.endswith(QUOTE_ASSET) else symbol
+
+
+def _utc_day(ts=None):
+    return datetime.fromtimestamp(ts if ts is not None else time.time(), tz=timezone.utc).date()
+
+
+class RiskEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.balances = {}        # asset -> free
+        self.positions = {}       # symbol -> base qty held (spot, long only)
+        self.avg_cost = {}        # symbol -> average entry price of the position
+        self.prices = {}          # symbol -> last price
+        self.filters = {}         # symbol -> {"min_qty", "step_size", "min_notional"}
+        self.open_oco = {}        # symbol -> open bracket count
+        self.recent = {}          # (symbol, side, qty) -> monotonic time of last accepted order
+        self.realized_today = 0.0
+        self._day = _utc_day()
+        self.checks = 0
+        self.rejects = 0
+        self.max_check_us = 0.0
+        self.synced_at = None
+
+    # -------------------------
+    # Cache updates (cheap, any thread)
+    # -------------------------
+    def update_price(self, symbol, price):
+        if price:
+            self.prices[symbol] = float(price)
+
+    def set_symbol_filters(self, symbol, min_qty=None, step_size=None, min_notional=None):
+        self.filters[symbol] = {"min_qty": min_qty, "step_size": step_size, "min_notional": min_notional}
+
+    def sync_from_account(self, client):
+        """ get_account() + get_open_orders() -> balances/positions/open OCO snapshot (run in a background thread) """
+        self.apply_account(client.get_account())
+        self.apply_open_orders(client.get_open_orders())
+
+    def apply_account(self, account):
+        """
+        get_account() response (fetched elsewhere, e.g. by the async I/O core) -> snapshot
+        balances = free (what a new order can spend); positions = free + locked, so coins held by a
+        resting OCO still count against the symbol / exposure caps
+        """
+        with self._lock:
+            rows = account.get("balances", [])
+            self.balances = {b["asset"]: float(b["free"]) for b in rows}
+            for b in rows:
+                asset = b["asset"]
+                if asset == QUOTE_ASSET:
+                    continue
+                sym = asset + QUOTE_ASSET
+                held = float(b["free"]) + float(b.get("locked") or 0)
+                if held > 0 or sym in self.positions:
+                    self.positions[sym] = held
+            self.synced_at = time.time()
+
+    def apply_open_orders(self, orders):
+        """
+        get_open_orders() response -> open OCO brackets per symbol. The exchange's count replaces the one
+        kept from OCO / OCO_DONE events, so brackets that ended without an OCO_DONE (nothing watching the
+        user data stream, app restarted, cancelled elsewhere) stop counting against the limit.
+        """
+        lists = {}
+        for o in orders:
+            if o.get("orderListId", -1) != -1:
+                lists.setdefault(o["symbol"], set()).add(o["orderListId"])
+        with self._lock:
+            self.open_oco = {sym: len(ids) for sym, ids in lists.items()}
+
+    def on_event(self, ev):
+        """ event bus consumer: keep positions / OCO counts / realized loss current from fills """
+        d = ev.data
+        sym = d.get("symbol")
+        with self._lock:
+            if ev.topic == events.FILL:
+                qty, price = float(d.get("qty") or 0), float(d.get("price") or 0)
+                pos = self.positions.get(sym, 0.0)
+                if d.get("side") == "BUY":
+                    cost = self.avg_cost.get(sym, price) * pos + price * qty
+                    pos += qty
+                    self.avg_cost[sym] = cost / pos if pos else price
+                    self.balances[QUOTE_ASSET] = self.balances.get(QUOTE_ASSET, 0.0) - price * qty
+                else:
+                    self._roll_day()
+                    if sym in self.avg_cost:
+                        self.realized_today += (price - self.avg_cost[sym]) * min(qty, pos)
+                    pos -= qty
+                    self.balances[QUOTE_ASSET] = self.balances.get(QUOTE_ASSET, 0.0) + price * qty
+                self.positions[sym] = pos
+                self.balances[_base_asset(sym)] = pos
+                self.prices[sym] = price or self.prices.get(sym, 0.0)
+            elif ev.topic == events.OCO:
+                self.open_oco[sym] = self.open_oco.get(sym, 0) + 1
+            elif ev.topic == events.OCO_DONE:
+                self.open_oco[sym] = max(0, self.open_oco.get(sym, 0) - 1)
+
+    def attach(self, bus=events.BUS):
+        return bus.subscribe(self.on_event, topics=(events.FILL, events.OCO, events.OCO_DONE), maxsize=10000, name="risk")
+
+    def _roll_day(self):
+        today = _utc_day()
+        if today != self._day:
+            self._day = today
+            self.realized_today = 0.0
+
+    # -------------------------
+    # Pre-trade check
+    # -------------------------
+    def check(self, symbol, side, qty, price=None, reserve=True):
+        """
+        Validate one order against the cached state. With reserve=True an accepted order is
+        remembered for the duplicate guard. Returns RiskDecision (truthy when accepted).
+        """
+        t0 = time.perf_counter()
+        with self._lock:
+            decision = self._check(symbol, side, qty, price)
+            if decision.ok and reserve:
+                self.recent[(symbol, side, qty)] = time.monotonic()
+        elapsed = (time.perf_counter() - t0) * 1e6
+        decision.elapsed_us = elapsed
+        self.checks += 1
+        self.max_check_us = max(self.max_check_us, elapsed)
+        if not decision.ok:
+            self.rejects += 1
+            events.publish(events.ERROR, symbol=symbol, source="risk", side=side, qty=qty,
+                           message=f"order rejected: {decision.reason}")
+        return decision
+
+    def _check(self, symbol, side, qty, price):
+        if side not in ("BUY", "SELL"):
+            return RiskDecision(False, f"invalid side {side!r}")
+        if not qty or qty <= 0 or math.isnan(qty):
+            return RiskDecision(False, "quantity must be > 0")
+        price = price or self.prices.get(symbol)
+        if not price:
+            return RiskDecision(False, "no cached price for symbol (refresh levels first)")
+        notional = qty * price
+
+        f = self.filters.get(symbol)
+        if f:
+            if f.get("min_qty") and qty < f["min_qty"]:
+                return RiskDecision(False, f"qty {qty} below min qty {f['min_qty']}", notional)
+            step = f.get("step_size")
+            if step and abs(round(qty / step) * step - qty) > step * 1e-6:
+                return RiskDecision(False, f"qty {qty} not a multiple of step {step}", notional)
+            if f.get("min_notional") and notional < f["min_notional"]:
+                return RiskDecision(False, f"notional {notional:.4f} below min notional {f['min_notional']}", notional)
+
+        # duplicate guard (double clicks, strategy re-firing the same signal)
+        last = self.recent.get((symbol, side, qty))
+        if DUPLICATE_WINDOW_SEC and last is not None and time.monotonic() - last < DUPLICATE_WINDOW_SEC:
+            return RiskDecision(False, f"duplicate {side} {qty} {symbol} within {DUPLICATE_WINDOW_SEC}s", notional)
+
+        if MAX_ORDER_NOTIONAL and notional > MAX_ORDER_NOTIONAL:
+            return RiskDecision(False, f"order notional {notional:.2f} > limit {MAX_ORDER_NOTIONAL}", notional)
+
+        pos = self.positions.get(symbol, 0.0)
+        if side == "BUY":
+            free_quote = self.balances.get(QUOTE_ASSET)
+            if free_quote is not None and notional > free_quote:
+                return RiskDecision(False, f"insufficient {QUOTE_ASSET}: need {notional:.2f}, free {free_quote:.2f}", notional)
+            if MAX_SYMBOL_NOTIONAL and (pos + qty) * price > MAX_SYMBOL_NOTIONAL:
+                return RiskDecision(False, f"{symbol} position would be {(pos + qty) * price:.2f} > cap {MAX_SYMBOL_NOTIONAL}", notional)
+            if MAX_TOTAL_EXPOSURE:
+                exposure = notional + sum(q * self.prices.get(s, 0.0) for s, q in self.positions.items() if q > 0)
+                if exposure > MAX_TOTAL_EXPOSURE:
+                    return RiskDecision(False, f"total exposure would be {exposure:.2f} > limit {MAX_TOTAL_EXPOSURE}", notional)
+            self._roll_day()
+            if MAX_DAILY_LOSS and self.realized_today <= -MAX_DAILY_LOSS:
+                return RiskDecision(False, f"daily loss limit hit ({self.realized_today:.2f})", notional)
+            if MAX_OPEN_OCO_PER_SYMBOL and self.open_oco.get(symbol, 0) >= MAX_OPEN_OCO_PER_SYMBOL:
+                return RiskDecision(False, f"{self.open_oco[symbol]} open OCO brackets on {symbol}", notional)
+        else:
+            free_base = self.balances.get(_base_asset(symbol))
+            if free_base is not None and qty > free_base:
+                return RiskDecision(False, f"insufficient {_base_asset(symbol)}: need {qty}, free {free_base}", notional)
+
+        return RiskDecision(True, "ok", notional)
+
+    def stats(self):
+        return {"checks": self.checks, "rejects": self.rejects, "max_check_us": round(self.max_check_us, 1),
+                "realized_today": self.realized_today, "synced_at": self.synced_at}
+
+
+# one engine per process, shared by every order path
+ENGINE = RiskEngine()
@@ -1,45 +1,159 @@
-from data_fetch import get_historical_data
-from indicators import apply_indicators
+import heapq
+import math
+import sys
+
+from data_fetch import client
 import config
+import correlation
+import events
+import hub
+import strategies
+
+# Universe scan (two stages): one bulk 24h ticker + one bulk book ticker rank the whole exchange,
+# only the best UNIVERSE_TOP_K pairs get the per-symbol kline download + strategy logic.
+UNIVERSE_QUOTE = "USDT"
+UNIVERSE_TOP_K = 20
+MIN_QUOTE_VOLUME = 1_000_000    # 24h quote volume floor
+MIN_VOLATILITY_PCT = 1.0        # 24h (high - low) / last, in %
+MAX_SPREAD_PCT = 0.15           # (ask - bid) / mid, in %
+
+# every registered strategy (strategies.py) runs on one kline download + one indicator pass per symbol;
+# with a local hub (hub.py) running, candles and bulk tickers come from it instead of our own client
+ENGINE = strategies.StrategyEngine(client_factory=lambda: hub.data_client(client))
+
+# rolling return correlation across everything scanned (correlation.py): fed with the closed candles of
+# each pass, used to group signals that are really one bet and down-weight them
+CORR = correlation.RollingCorrelation(config.INTERVAL)
+CORR_HISTORY = correlation.WINDOW + 1   # candles fetched per symbol, so the first pass fills the window
+
+def _fetch_and_run(symbol, names):
+    """ one kline download per symbol, shared by the strategies and the correlation matrix """
+    klines = ENGINE.client_factory().get_klines(symbol=symbol, interval=config.INTERVAL,
+                                                limit=max(ENGINE.history(names), CORR_HISTORY))
+    return klines, ENGINE.run(symbol, config.INTERVAL, klines=klines, only=names)
+
+def weigh_signals(signals):
+    """ {symbol: "BUY"/"SELL"/...} -> {symbol: {"group", "group_size", "weight"}} for the BUY / SELL ones """
+    return {w["symbol"]: w for w in CORR.weigh(list(signals.items()))}
+
+def _unpack(res):
+    """ ema_rsi_vwap result -> the (signal, candle, entry, sl, tp) tuple callers print / publish """
+    return res["signal"], res["candle"], res["entry"], res["sl"], res["tp"]
 
 def generate_signals(symbol):
-    data = get_historical_data(symbol, config.INTERVAL)
-    df = apply_indicators(data)
-
-    latest = df.iloc[-1]  # आखिरी candle
-    signal = None
-    entry = sl = tp = None
-
-    # Entry Long condition
-    if latest["close"] > latest["EMA_20"] and latest["RSI"] > 50 and latest["close"] > latest["VWAP"]:
-        signal = "BUY"
-        entry = latest["close"]
-        sl = latest["VWAP"]  # VWAP को Stop Loss मान रहे हैं
-        risk = entry - sl
-        tp = entry + (risk * 2)  # Risk:Reward = 1:2
-
-    # Exit / Short condition
-    elif latest["close"] < latest["EMA_20"] and latest["RSI"] < 50 and latest["close"] < latest["VWAP"]:
-        signal = "SELL"
-        entry = latest["close"]
-        sl = latest["VWAP"]  # VWAP को Stop Loss मान रहे हैं
-        risk = sl - entry
-        tp = entry - (risk * 2)  # Risk:Reward = 1:2
+    return _unpack(ENGINE.run(symbol, config.INTERVAL, only=("ema_rsi_vwap",))["ema_rsi_vwap"])
 
-    else:
-        signal = "HOLD"
+def publish_signal(symbol, signal, candle, entry, sl, tp, corr=None):
+    """ scanner result -> event bus (file log / webhook / notifier consumers); corr: weigh_signals() entry """
+    reason = f"close={candle['close']:.2f} RSI={candle['RSI']:.2f} VWAP={candle['VWAP']:.2f}"
+    if corr and corr["group_size"] > 1:
+        reason += f" corr-group={corr['group']} ({corr['group_size']} signals)"
+    events.publish(events.SIGNAL, symbol=symbol, interval=config.INTERVAL, strategy="ema_rsi_vwap",
+                   signal=signal, confidence=corr["weight"] if corr else None, reason=reason,
+                   entry=entry, sl=sl, tp=tp, corr_group=corr["group"] if corr else None)
+
+def rank_universe(k=UNIVERSE_TOP_K, quote=UNIVERSE_QUOTE, min_quote_volume=MIN_QUOTE_VOLUME,
+                  min_volatility_pct=MIN_VOLATILITY_PCT, max_spread_pct=MAX_SPREAD_PCT):
+    """
+    Stage 1: two requests for the whole exchange (24h stats + best bid/ask).
+    Returns up to k dicts sorted best first: symbol, score, quote_volume, volatility_pct, spread_pct.
+    Score = log10(quote volume) * volatility / (1 + spread): liquid, moving, cheap to trade.
+    """
+    src = hub.data_client(client)
+    stats = src.get_ticker()                    # 24h stats, all symbols
+    books = {b["symbol"]: b for b in src.get_orderbook_tickers()}      # bookTicker, all symbols
 
-    return signal, latest, entry, sl, tp
+    heap = []   # min-heap of (score, symbol, row), never more than k entries
+    for s in stats:
+        symbol = s["symbol"]
+        if not symbol.endswith(quote):
+            continue
+        qvol, last = float(s["quoteVolume"]), float(s["lastPrice"])
+        if qvol < min_quote_volume or last <= 0:
+            continue
+        volatility = (float(s["highPrice"]) - float(s["lowPrice"])) / last * 100.0
+        if volatility < min_volatility_pct:
+            continue
+        book = books.get(symbol)
+        if not book:
+            continue
+        bid, ask = float(book["bidPrice"]), float(book["askPrice"])
+        if bid <= 0 or ask <= 0:
+            continue
+        spread = (ask - bid) / ((ask + bid) / 2) * 100.0
+        if spread > max_spread_pct:
+            continue
+        score = math.log10(qvol) * volatility / (1.0 + spread)
+        row = {"symbol": symbol, "score": score, "quote_volume": qvol,
+               "volatility_pct": volatility, "spread_pct": spread}
+        if len(heap) < k:
+            heapq.heappush(heap, (score, symbol, row))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, symbol, row))
+    return [row for _, _, row in sorted(heap, reverse=True)]
+
+def scan_universe(k=UNIVERSE_TOP_K, breakout=True, **filters):
+    """
+    Stage 2: deep-scan only the ranked top k (one kline download per symbol, shared by the strategies
+    and the correlation matrix).
+    Yields (rank_row, (signal, candle, entry, sl, tp), breakout_result or None) once every symbol is in;
+    rank_row gets "corr" = weigh_signals() entry (group / weight) when the signal is BUY / SELL.
+    """
+    names = ("ema_rsi_vwap", "breakout_retest") if breakout else ("ema_rsi_vwap",)
+    scanned, klines = [], {}
+    for row in rank_universe(k, **filters):
+        symbol = row["symbol"]
+        try:
+            klines[symbol], results = _fetch_and_run(symbol, names)
+        except Exception as e:
+            events.publish(events.ERROR, symbol=symbol, source="scanner", message=str(e))
+            continue
+        scanned.append((row, _unpack(results["ema_rsi_vwap"]), results.get("breakout_retest")))
+    CORR.update(klines)
+    weights = weigh_signals({row["symbol"]: sig[0] for row, sig, _ in scanned})
+    for row, sig, bo in scanned:
+        row["corr"] = weights.get(row["symbol"])
+        yield row, sig, bo
+
+def _print_signal(symbol, signal, candle, entry, sl, tp, corr=None):
+    if signal in ["BUY", "SELL"]:
+        print(f"\n{symbol}: {signal}")
+        print(f"  Entry  = {entry:.2f}")
+        print(f"  StopLoss = {sl:.2f}")
+        print(f"  Target = {tp:.2f}")
+        print(f"  (Close={candle['close']:.2f}, RSI={candle['RSI']:.2f}, VWAP={candle['VWAP']:.2f})")
+        if corr and corr["group_size"] > 1:
+            print(f"  Correlated: group {corr['group']} ({corr['group_size']} signals), weight {corr['weight']:.2f}")
+    else:
+        print(f"\n{symbol}: HOLD (No trade)")
 
 if __name__ == "__main__":
+    events.attach_default_consumers()
+    if "--universe" in sys.argv:
+        # python scanner.py --universe [k]
+        i = sys.argv.index("--universe")
+        k = int(sys.argv[i + 1]) if len(sys.argv) > i + 1 else UNIVERSE_TOP_K
+        for row, (signal, candle, entry, sl, tp), bo in scan_universe(k):
+            publish_signal(row["symbol"], signal, candle, entry, sl, tp, corr=row["corr"])
+            print(f"\n#{row['symbol']}: score={row['score']:.1f} qvol={row['quote_volume']:,.0f} "
+                  f"vol={row['volatility_pct']:.2f}% spread={row['spread_pct']:.3f}%")
+            _print_signal(row["symbol"], signal, candle, entry, sl, tp, corr=row["corr"])
+            if bo and bo.get("signal") in ("BUY", "SELL"):
+                events.publish(events.SIGNAL, symbol=row["symbol"], interval=config.INTERVAL, strategy="breakout_retest",
+                               signal=bo["signal"], confidence=bo.get("confidence"), reason=bo.get("reason"),
+                               entry=bo.get("entry"), sl=bo.get("sl"), tp=bo.get("tp"))
+                print(f"  breakout/retest: {bo['signal']} ({bo.get('reason')})")
+        events.BUS.close()
+        sys.exit(0)
+
+    results, klines = {}, {}
     for symbol in config.SYMBOLS:
-        signal, candle, entry, sl, tp = generate_signals(symbol)
-
-        if signal in ["BUY", "SELL"]:
-            print(f"\n{symbol}: {signal}")
-            print(f"  Entry  = {entry:.2f}")
-            print(f"  StopLoss = {sl:.2f}")
-            print(f"  Target = {tp:.2f}")
-            print(f"  (Close={candle['close']:.2f}, RSI={candle['RSI']:.2f}, VWAP={candle['VWAP']:.2f})")
-        else:
-            print(f"\n{symbol}: HOLD (No trade)")
+        klines[symbol], res = _fetch_and_run(symbol, ("ema_rsi_vwap",))
+        results[symbol] = _unpack(res["ema_rsi_vwap"])
+    CORR.update(klines)
+    weights = weigh_signals({s: r[0] for s, r in results.items()})
+    for symbol, (signal, candle, entry, sl, tp) in results.items():
+        publish_signal(symbol, signal, candle, entry, sl, tp, corr=weights.get(symbol))
+        _print_signal(symbol, signal, candle, entry, sl, tp, corr=weights.get(symbol))
+
+    events.BUS.close()  # flush queued events before exit
@@ -0,0 +1,95 @@
+# startup.py
+# Cold-start helpers shared by the Tk app (gui.py) and the Kivy app (main.py):
+#   - StartupTimer: records import durations and named milestones (first frame, chart ready...)
+#   - LazyLoader: runs an expensive loader exactly once, either in the background or on first use
+
+import importlib
+import threading
+import time
+
+
+class StartupTimer:
+    """ Collects startup timings in seconds, measured from t0 (usually process/module start). """
+
+    def __init__(self, t0=None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.imports = {}   # module name -> seconds spent importing it
+        self.marks = {}     # milestone name -> seconds since t0
+        self._lock = threading.Lock()
+
+    def timed_import(self, name):
+        """ importlib.import_module(name) + remember how long it took """
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        with self._lock:
+            # only the first (real) import is interesting, later ones hit sys.modules
+            self.imports.setdefault(name, time.perf_counter() - start)
+        return module
+
+    def mark(self, name):
+        """ record milestone `name` (first call wins) and return its offset from t0 """
+        with self._lock:
+            if name not in self.marks:
+                self.marks[name] = time.perf_counter() - self.t0
+            return self.marks[name]
+
+    def summary(self):
+        """ one-line human readable report, e.g. 'first_frame=0.21s | imports: pandas 0.40s, ...' """
+        with self._lock:
+            marks = sorted(self.marks.items(), key=lambda kv: kv[1])
+            imports = sorted(self.imports.items(), key=lambda kv: -kv[1])
+        parts = [f"{k}={v:.2f}s" for k, v in marks]
+        if imports:
+            parts.append("imports: " + ", ".join(f"{k} {v:.2f}s" for k, v in imports))
+        return " | ".join(parts) if parts else "no timings"
+
+
+class LazyLoader:
+    """
+    Wraps a loader function so it runs exactly once.
+      - start_background(on_done, on_error): warm it up in a daemon thread (window already visible)
+      - ensure(): block until loaded (used by workers that need it "on first use")
+    on_done / on_error are called from the loader thread -> callers marshal to their UI thread.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._error = None
+        self.loaded = False
+
+    def ensure(self):
+        with self._lock:
+            if not self.loaded:
+                try:
+                    self._loader()
+                    self.loaded = True
+                    self._error = None
+                except Exception as e:
+                    self._error = e
+                    raise
+                finally:
+                    self._done.set()
+        return True
+
+    def start_background(self, on_done=None, on_error=None):
+        def run():
+            try:
+                self.ensure()
+            except Exception as e:
+                if on_error:
+                    on_error(e)
+                return
+            if on_done:
+                on_done()
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+        return t
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @property
+    def error(self):
+        return self._error
@@ -0,0 +1,134 @@
+# strategies.py
+# Strategy registry + engine: one kline fetch and one indicator pass per (symbol, interval), shared by
+# every registered strategy.
+#   - a strategy is a function ctx -> result dict, registered with the indicator columns it reads
+#     (names understood by indicators.compute) and how many candles it needs
+#   - StrategyEngine.run() fetches max(history) candles once; strategies with the same history share
+#     one frame of their last `history` candles and one indicator pass (cumulative VWAP / EMA seeds
+#     depend on where the frame starts, so nobody sees more candles than it asked for); calling it
+#     again on unchanged candles returns the previous results
+# Result dict: {"signal": "BUY"/"SELL"/"NONE"/"HOLD", "confidence", "entry", "sl", "tp", "reason", ...}
+# ctx.df is shared between strategies: read it, never add or change columns.
+# Adding a strategy:
+#   @strategies.register("my_rule", needs=("EMA_50", "RSI"), history=150)
+#   def my_rule(ctx): ...
+
+import threading
+from collections import namedtuple
+
+import indicators
+import strategy
+
+Spec = namedtuple("Spec", "name fn needs history")
+Context = namedtuple("Context", "symbol interval df swing_key")
+
+REGISTRY = {}   # name -> Spec, in registration order
+
+
+def register(name, needs=(), history=100):
+    def deco(fn):
+        REGISTRY[name] = Spec(name, fn, tuple(needs), history)
+        return fn
+    return deco
+
+
+class StrategyEngine:
+    def __init__(self, names=None, client_factory=None):
+        """
+        names: strategies to run (None = everything registered, looked up at run time)
+        client_factory(): sync client with get_klines (default: strategy.get_client, which follows replay)
+        """
+        self.names = names
+        self.client_factory = client_factory or strategy.get_client
+        self._lock = threading.Lock()
+        self._last = {}        # (symbol, interval, names) -> (candle stamp, results)
+        self.fetches = 0
+        self.passes = 0
+
+    def specs(self, only=None):
+        return [REGISTRY[n] for n in (only or self.names or list(REGISTRY))]
+
+    def history(self, only=None):
+        """ candles one fetch must cover for these strategies """
+        return max(s.history for s in self.specs(only))
+
+    def run(self, symbol, interval, klines=None, only=None, swing_key=None):
+        """
+        -> {strategy name: result}; klines: raw get_klines() rows if the caller already has them.
+        swing_key: swing_levels.CACHE key of the candle series (default (symbol, interval), the live one)
+        """
+        specs = self.specs(only)
+        if klines is None:
+            klines = self.client_factory().get_klines(symbol=symbol, interval=interval,
+                                                      limit=max(s.history for s in specs))
+            self.fetches += 1
+        if not klines:
+            return {s.name: {"signal": "NONE", "confidence": 0.0, "reason": "no_data"} for s in specs}
+        key = (symbol, interval, tuple(s.name for s in specs))
+        stamp = (len(klines), klines[0][0], klines[-1][0], klines[-1][4], klines[-1][5])
+        with self._lock:
+            last = self._last.get(key)
+        if last is not None and last[0] == stamp:
+            return last[1]
+
+        by_history = {}
+        for s in specs:
+            by_history.setdefault(s.history, []).append(s)
+        found = {}
+        for history, group in by_history.items():
+            df = strategy.ohlcv_from_klines(klines[-history:])
+            indicators.compute(df, [n for s in group for n in s.needs])
+            self.passes += 1
+            ctx = Context(symbol, interval, df, swing_key or (symbol, interval))
+            for s in group:
+                try:
+                    found[s.name] = s.fn(ctx)
+                except Exception as e:
+                    # one broken strategy must not hide the others
+                    found[s.name] = {"signal": "NONE", "confidence": 0.0, "reason": "error", "error": str(e)}
+        results = {s.name: found[s.name] for s in specs}
+        with self._lock:
+            self._last[key] = (stamp, results)
+        return results
+
+
+# -------------------------
+# Built-in strategies
+# -------------------------
+@register("breakout_retest", needs=("VWAP", "RSI"), history=strategy.BREAKOUT_BARS)
+def breakout_retest(ctx):
+    return strategy.detect_breakout_retest(ctx.symbol, ctx.interval, df=ctx.df, swing_key=ctx.swing_key)
+
+
+@register("ema_rsi_vwap", needs=("EMA_20", "RSI", "VWAP"), history=100)
+def ema_rsi_vwap(ctx):
+    """ close vs EMA 20 / VWAP with RSI 50 as the tie-break; SL at VWAP, RR 1:2 (was scanner.generate_signals) """
+    latest = ctx.df.iloc[-1]
+    signal, entry, sl, tp = "HOLD", None, None, None
+    if latest["close"] > latest["EMA_20"] and latest["RSI"] > 50 and latest["close"] > latest["VWAP"]:
+        signal = "BUY"
+        entry = latest["close"]
+        sl = latest["VWAP"]
+        tp = entry + (entry - sl) * 2
+    elif latest["close"] < latest["EMA_20"] and latest["RSI"] < 50 and latest["close"] < latest["VWAP"]:
+        signal = "SELL"
+        entry = latest["close"]
+        sl = latest["VWAP"]
+        tp = entry - (sl - entry) * 2
+    return {"signal": signal, "confidence": None, "entry": entry, "sl": sl, "tp": tp, "candle": latest,
+            "reason": f"close={latest['close']:.2f} RSI={latest['RSI']:.2f} VWAP={latest['VWAP']:.2f}"}
+
+
+FIXED_SL_PCT = 0.01
+FIXED_TP_PCT = 0.02
+
+@register("fixed_levels", history=20)
+def fixed_levels(ctx):
+    """ entry = last close, SL / TP a fixed percentage away (was backend.get_levels); never a signal """
+    entry = round(float(ctx.df["close"].iloc[-1]), 2)
+    return {"signal": "NONE", "confidence": 0.0, "entry": entry, "reason": "fixed_levels",
+            "sl": round(entry * (1 - FIXED_SL_PCT), 2), "tp": round(entry * (1 + FIXED_TP_PCT), 2)}
+
+
+# shared engine (strategy.get_client(): testnet, or the replay while one runs)
+ENGINE = StrategyEngine()
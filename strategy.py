@@ -6,25 +6,30 @@ import pandas as pd
 from binance.client import Client
 import config
 import numpy as np
+import swing_levels
+import indicators
 
-# reuse client from config (testnet)
-client = Client(config.API_KEY, config.API_SECRET)
-client.API_URL = 'https://testnet.binance.vision/api'
+# reuse client from config (testnet), created on first use so importing this module stays cheap
+client = None
 
-def vwap(df: pd.DataFrame):
-    p = (df["high"] + df["low"] + df["close"]) / 3.0
-    q = df["volume"]
-    return (p * q).cumsum() / q.cumsum()
+def get_client():
+    global client
+    if client is None:
+        client = Client(config.API_KEY, config.API_SECRET)
+        client.API_URL = 'https://testnet.binance.vision/api'
+    return client
 
-def rsi(df: pd.Series, period: int = 14):
-    delta = df.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+def set_client(c):
+    """ swap the candle source (e.g. replay.CandleReplay); returns the previous one """
+    global client
+    prev, client = client, c
+    return prev
 
 def fetch_ohlcv(symbol: str, interval: str = "15m", limit: int = 100):
-    klines = client.get_klines(symbol=symbol, interval=interval, limit=limit)
+    return ohlcv_from_klines(get_client().get_klines(symbol=symbol, interval=interval, limit=limit))
+
+def ohlcv_from_klines(klines):
+    """ raw get_klines() rows -> OHLCV DataFrame (for callers that fetched the klines themselves) """
     if not klines:
         return pd.DataFrame()
     df = pd.DataFrame(klines, columns=[
@@ -36,7 +41,10 @@ def fetch_ohlcv(symbol: str, interval: str = "15m", limit: int = 100):
     df.set_index("datetime", inplace=True)
     return df[["open","high","low","close","volume"]]
 
-def detect_breakout_retest(symbol: str, interval: str = "15m"):
+BREAKOUT_BARS = 200   # candles detect_breakout_retest looks at
+
+def detect_breakout_retest(symbol: str, interval: str = "15m", df: pd.DataFrame = None, swings=None,
+                           swing_key=None):
     """
     Logic:
       1) Identify recent swing high/low as resistance/support (using rolling max/min of last N bars)
@@ -46,9 +54,15 @@ def detect_breakout_retest(symbol: str, interval: str = "15m"):
            - For BUY require price > VWAP and RSI between 40-80 (not extreme)
            - For SELL require price < VWAP and RSI between 20-60
       5) Compute entry = retest close (or next candle open), SL = retest low/break level - small buffer, TP = entry + (risk * RR)
+    df: optional OHLCV frame from ohlcv_from_klines() (skips the kline download); VWAP / RSI columns
+        from indicators.compute() are reused when present (strategies.py computes them once).
+    swings: optional swing_levels.SwingIndex; by default the shared one under swing_key (default
+            (symbol, interval); replays pass the chart's replay key), fed with the closed bars of df it
+            hasn't seen yet.
     Returns dict with signal/confidence/levels/reason.
     """
-    df = fetch_ohlcv(symbol, interval=interval, limit=200)
+    if df is None:
+        df = fetch_ohlcv(symbol, interval=interval, limit=BREAKOUT_BARS)
     if df.empty or len(df) < 30:
         return {"signal":"NONE","confidence":0.0,"reason":"no_data"}
 
@@ -64,6 +78,17 @@ def detect_breakout_retest(symbol: str, interval: str = "15m"):
     resistance = highs[:-3].rolling(window=10, min_periods=5).max().iloc[-1]  # approximate recent resistance
     support = lows[:-3].rolling(window=10, min_periods=5).min().iloc[-1]
 
+    # real S/R when there is one: nearest swing levels around the close just before the scanned bars,
+    # only counting levels already confirmed then (the rolling max/min above is the fallback)
+    t = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    if swings is None:
+        swings = swing_levels.CACHE.get(swing_key or (symbol, interval), t[:-1], df["high"].values[:-1], df["low"].values[:-1])
+    above, below = swings.nearest(float(df["close"].iloc[-11]), n=1, before_t=int(t[-11]))
+    if above:
+        resistance = above[0].price
+    if below:
+        support = below[0].price
+
     # find last 5 candles for breakout detection
     last_bars = df.iloc[-6:]  # include breakout + 1-5 retest bars
     breakout_bar = last_bars.iloc[-6]  # candidate: 6th last as breakout (we'll scan)
@@ -87,6 +112,9 @@ def detect_breakout_retest(symbol: str, interval: str = "15m"):
     if breakout_index is None:
         return {"signal":"NONE","confidence":0.0,"reason":"no_breakout"}
 
+    # breakout level (resistance for BUY, support for SELL) -> reported so the chart can mark it
+    level = float(resistance if breakout_type == "BUY" else support)
+
     # now look for retest in the 1-3 candles after breakout
     bi = df.index.get_loc(breakout_index)
     # examine next up to 3 candles
@@ -108,44 +136,46 @@ def detect_breakout_retest(symbol: str, interval: str = "15m"):
 
     if confirm_index is None:
         # no retest confirmation yet
-        return {"signal":"NONE","confidence":0.2,"reason":"no_retest_yet"}
+        return {"signal":"NONE","confidence":0.2,"reason":"no_retest_yet","level":level}
 
-    # compute indicators to filter
-    df_for_v = df.iloc[: (df.index.get_loc(confirm_index)+1) ]
-    vwap_series = vwap(df_for_v)
-    cur_vwap = vwap_series.iloc[-1]
-    cur_rsi = rsi(df_for_v["close"], period=14).iloc[-1]
+    # indicators to filter (cumulative VWAP / rolling RSI at the confirm bar)
+    if "VWAP" not in df.columns or "RSI" not in df.columns:
+        df = indicators.compute(df.copy(), ("VWAP", "RSI"))
+    ci = df.index.get_loc(confirm_index)
+    df_for_v = df.iloc[: ci + 1]
+    cur_vwap = df["VWAP"].iloc[ci]
+    cur_rsi = df["RSI"].iloc[ci]
 
     # filter rules
     if breakout_type == "BUY":
         if confirm_close < cur_vwap:
-            return {"signal":"NONE","confidence":0.25,"reason":"vwap_below"}
+            return {"signal":"NONE","confidence":0.25,"reason":"vwap_below","level":level}
         if not (40 <= cur_rsi <= 80):
-            return {"signal":"NONE","confidence":0.3,"reason":"rsi_filter"}
+            return {"signal":"NONE","confidence":0.3,"reason":"rsi_filter","level":level}
         # levels
         entry = float(confirm_close)
         sl = float(min(df_for_v["low"].iloc[-3:])) * 0.999  # small buffer below recent lows
         risk = entry - sl
         if risk <= 0:
-            return {"signal":"NONE","confidence":0.0,"reason":"invalid_risk"}
+            return {"signal":"NONE","confidence":0.0,"reason":"invalid_risk","level":level}
         tp = entry + risk * rr
         confidence = 0.8  # good confirmation
         reason = f"breakout+retest confirmed vol+vwap+rsi"
         return {"signal":"BUY","confidence":confidence,"entry":round(entry,6),
-                "sl":round(sl,6),"tp":round(tp,6),"reason":reason}
+                "sl":round(sl,6),"tp":round(tp,6),"reason":reason,"level":level}
     else:
         # SELL case
         if confirm_close > cur_vwap:
-            return {"signal":"NONE","confidence":0.25,"reason":"vwap_above"}
+            return {"signal":"NONE","confidence":0.25,"reason":"vwap_above","level":level}
         if not (20 <= cur_rsi <= 60):
-            return {"signal":"NONE","confidence":0.3,"reason":"rsi_filter"}
+            return {"signal":"NONE","confidence":0.3,"reason":"rsi_filter","level":level}
         entry = float(confirm_close)
         sl = float(max(df_for_v["high"].iloc[-3:])) * 1.001
         risk = sl - entry
         if risk <= 0:
-            return {"signal":"NONE","confidence":0.0,"reason":"invalid_risk"}
+            return {"signal":"NONE","confidence":0.0,"reason":"invalid_risk","level":level}
         tp = entry - risk * rr
         confidence = 0.8
         reason = "breakdown+retest confirmed vol+vwap+rsi"
         return {"signal":"SELL","confidence":confidence,"entry":round(entry,6),
-                "sl":round(sl,6),"tp":round(tp,6),"reason":reason}
+                "sl":round(sl,6),"tp":round(tp,6),"reason":reason,"level":level}
@@ -0,0 +1,165 @@
+# swing_levels.py
+# Incremental swing-high / swing-low index -> multi-level support & resistance per (symbol, interval).
+#   - swings are fractal pivots: a bar whose high (low) is the extreme of the PIVOT_BARS bars on each
+#     side. Two monotonic deques over the last 2 * PIVOT_BARS + 1 closed bars find them in O(1)
+#     amortized per bar, so the index is fed one closed candle at a time, never recomputed
+#   - swings within ZONE_PCT of an existing level count as another touch of that level, otherwise
+#     they start a new one
+#   - levels are kept sorted by price and by (touches, price): "nearest N above / below price" and
+#     "levels touched >= K times" are bisect lookups
+# Usage: idx = swing_levels.CACHE.get(("BTCUSDT", "5m"), t, h, l)   (closed bars only)
+#        above, below = idx.nearest(price, n=3); idx.touched(3)
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque, namedtuple
+
+PIVOT_BARS = 5       # bars on each side a swing must dominate
+ZONE_PCT = 0.002     # swings closer than this (relative) are the same level
+MAX_KEYS = 256       # (symbol, interval) indexes kept by the cache, least recently used dropped
+
+# first_t: close time of the bar that confirmed the level (the level is "known" from then on)
+Level = namedtuple("Level", "price touches highs lows first_t last_t")
+
+
+class SwingIndex:
+    def __init__(self, pivot=PIVOT_BARS, zone_pct=ZONE_PCT):
+        self.pivot = pivot
+        self.zone_pct = zone_pct
+        self._lock = threading.Lock()
+        self.bars = 0
+        self.first_t = None
+        self.last_t = None
+        self.swings = 0
+        self._hi = deque()         # (bar no, high), highs non-increasing -> front is the window max
+        self._lo = deque()         # (bar no, low), lows non-decreasing -> front is the window min
+        self._prices = []          # level prices, sorted
+        self._levels = []          # [price, touches, highs, lows, first_t, last_t], same order
+        self._by_touches = []      # (touches, price), sorted
+
+    def __len__(self):
+        return len(self._prices)
+
+    # -------------------------
+    # Feeding (closed candles, oldest first)
+    # -------------------------
+    def update(self, t, h, l):
+        """ consume the bars newer than the last one seen; returns how many were added """
+        with self._lock:
+            start = 0 if self.last_t is None else bisect_right(t, self.last_t)
+            for i in range(start, len(t)):
+                self._push(int(t[i]), float(h[i]), float(l[i]))
+            return len(t) - start
+
+    def _push(self, t, h, l):
+        i = self.bars
+        self.bars += 1
+        if self.first_t is None:
+            self.first_t = t
+        self.last_t = t
+        w = 2 * self.pivot
+        hi, lo = self._hi, self._lo
+        while hi and hi[-1][1] < h:
+            hi.pop()
+        hi.append((i, h))
+        while lo and lo[-1][1] > l:
+            lo.pop()
+        lo.append((i, l))
+        while hi[0][0] < i - w:
+            hi.popleft()
+        while lo[0][0] < i - w:
+            lo.popleft()
+        if i < w:
+            return
+        # the bar in the middle of the window is a swing if it is the (leftmost) extreme of the window
+        c = i - self.pivot
+        if hi[0][0] == c:
+            self._touch(hi[0][1], t, high=True)
+        if lo[0][0] == c:
+            self._touch(lo[0][1], t, high=False)
+
+    def _touch(self, price, t, high):
+        self.swings += 1
+        prices = self._prices
+        j = bisect_left(prices, price)
+        best, dist = None, price * self.zone_pct
+        for k in (j - 1, j):
+            if 0 <= k < len(prices) and abs(prices[k] - price) <= dist:
+                best, dist = k, abs(prices[k] - price)
+        if best is None:
+            prices.insert(j, price)
+            self._levels.insert(j, [price, 1, int(high), int(not high), t, t])
+            insort(self._by_touches, (1, price))
+            return
+        lv = self._levels[best]
+        del self._by_touches[bisect_left(self._by_touches, (lv[1], lv[0]))]
+        lv[1] += 1
+        lv[2 if high else 3] += 1
+        lv[5] = t
+        insort(self._by_touches, (lv[1], lv[0]))
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def nearest(self, price, n=3, min_touches=1, before_t=None):
+        """
+        -> (above, below): up to n Levels strictly above / at or below price, closest first.
+        before_t: only levels already confirmed at that close time (no look-ahead for backtests).
+        """
+        with self._lock:
+            j = bisect_right(self._prices, price)
+            return (self._walk(range(j, len(self._prices)), n, min_touches, before_t),
+                    self._walk(range(j - 1, -1, -1), n, min_touches, before_t))
+
+    def _walk(self, indexes, n, min_touches, before_t):
+        out = []
+        for k in indexes:
+            lv = self._levels[k]
+            if lv[1] >= min_touches and (before_t is None or lv[4] <= before_t):
+                out.append(Level(*lv))
+                if len(out) >= n:
+                    break
+        return out
+
+    def touched(self, k):
+        """ Levels touched at least k times, by price """
+        with self._lock:
+            i = bisect_left(self._by_touches, (k, float("-inf")))
+            return sorted((Level(*self._levels[bisect_left(self._prices, p)]) for _, p in self._by_touches[i:]),
+                          key=lambda lv: lv.price)
+
+    def levels(self):
+        with self._lock:
+            return [Level(*lv) for lv in self._levels]
+
+
+class SwingCache:
+    """
+    key -> SwingIndex, fed incrementally; rebuilt when the bars go back in time (replay restart) or start
+    before the first bar it has seen (older history loaded)
+    """
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+
+    def get(self, key, t, h, l):
+        with self._lock:
+            idx = self._indexes.get(key)
+            if idx is None or (len(t) and idx.last_t is not None
+                               and (int(t[-1]) < idx.last_t or int(t[0]) < idx.first_t)):
+                idx = self._indexes[key] = SwingIndex()
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_keys:
+                self._indexes.popitem(last=False)
+        idx.update(t, h, l)
+        return idx
+
+    def drop(self, key):
+        with self._lock:
+            self._indexes.pop(key, None)
+
+
+# one cache per process: the chart (full stored history) and the strategy scans share it
+CACHE = SwingCache()
@@ -0,0 +1,83 @@
+# test_paper.py
+# Paper broker (paper.py) against candles only, no exchange: market orders, OCO legs and the switch
+# between live and replayed candles.
+# Run:  python test_paper.py      (or via pytest)
+
+import paper
+
+SYMBOL = "BTCUSDT"
+MIN = 60_000
+
+
+def bar(open_ms, o, h, l, c, v=1000.0):
+    return [open_ms, str(o), str(h), str(l), str(c), str(v), open_ms + MIN - 1]
+
+
+def make_broker():
+    return paper.PaperBroker(market=None, balances={"USDT": 100_000.0}, publish=False)
+
+
+def test_replay_bars_after_live_bars_are_matched():
+    pb = make_broker()
+    live_t = 1_800_000_000_000
+    pb.on_klines(SYMBOL, [bar(live_t, 100, 100, 100, 100)])
+    # replay starts: its bars are much older than the live bar the broker has seen
+    pb.reset_market(SYMBOL)
+    pb.on_klines(SYMBOL, [bar(live_t - 1000 * MIN, 50, 50, 50, 50)])
+    order = pb.create_order(symbol=SYMBOL, side="BUY", type="MARKET", quantity="1")
+    price = float(order["fills"][0]["price"])
+    assert 49 < price < 51, price
+
+
+def test_replay_bars_fill_working_oco():
+    pb = make_broker()
+    live_t = 1_800_000_000_000
+    pb.on_klines(SYMBOL, [bar(live_t, 100, 100, 100, 100)])
+    pb.create_order(symbol=SYMBOL, side="BUY", type="MARKET", quantity="1")
+    pb.create_oco_order(symbol=SYMBOL, side="SELL", quantity="0.99", price="110", stopPrice="95",
+                        stopLimitPrice="94.9")
+    pb.reset_market(SYMBOL)
+    t = live_t - 1000 * MIN
+    pb.on_klines(SYMBOL, [bar(t - MIN, 100, 101, 99, 100), bar(t, 100, 101, 99, 100)])
+    assert pb.working, "the replay history up to the cursor only seeds the reference bar"
+    pb.on_klines(SYMBOL, [bar(t, 100, 101, 99, 100), bar(t + MIN, 100, 111, 100, 110)])
+    assert not pb.working, "take-profit leg should have filled on the replayed bar"
+    assert pb.get_open_orders() == []
+
+
+def test_back_to_live_after_replay():
+    pb = make_broker()
+    t = 1_800_000_000_000
+    pb.on_klines(SYMBOL, [bar(t, 100, 100, 100, 100)])
+    pb.reset_market(SYMBOL)
+    pb.on_klines(SYMBOL, [bar(t + 5000 * MIN, 50, 50, 50, 50)])   # replay of a later stretch
+    pb.reset_market(SYMBOL)                                       # replay stopped
+    pb.on_klines(SYMBOL, [bar(t + MIN, 100, 100, 100, 100)])
+    assert pb.prices[SYMBOL] == 100.0
+
+
+def test_live_history_after_replay_does_not_fill_replay_orders():
+    pb = make_broker()
+    t = 1_800_000_000_000
+    pb.on_klines(SYMBOL, [bar(t, 100, 100, 100, 100)])
+    pb.reset_market(SYMBOL)                                       # replay started
+    replay_t = t - 1000 * MIN
+    pb.on_klines(SYMBOL, [bar(replay_t, 100, 100, 100, 100)])
+    pb.on_klines(SYMBOL, [bar(replay_t + MIN, 100, 100, 100, 100)])
+    pb.create_order(symbol=SYMBOL, side="BUY", type="MARKET", quantity="1")
+    pb.create_oco_order(symbol=SYMBOL, side="SELL", quantity="0.99", price="110", stopPrice="95",
+                        stopLimitPrice="94.9")
+    pb.reset_market(SYMBOL)                                       # replay stopped
+    # the first live refresh is the whole chart history, bars from long before the order included
+    history = [bar(t - i * MIN, 100, 120 if i == 5 else 100, 100, 100) for i in range(10, -1, -1)]
+    pb.on_klines(SYMBOL, history)
+    assert len(pb.get_open_orders()) == 2, "bars before the order existed must not fill it"
+    pb.on_klines(SYMBOL, [bar(t + MIN, 100, 111, 100, 110)])
+    assert not pb.working
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: ok")
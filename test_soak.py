@@ -0,0 +1,239 @@
+# test_soak.py
+# Memory soak test: runs the GUI's refresh -> chart -> scan cycle thousands of times against local
+# (generated) candles and fails if memory keeps rising.
+#   - refresh goes through the real io_core queue and the UI callback path (dispatch closures are
+#     drained like the Tk queue would), then update_ui_from_df / draw_chart render on an Agg canvas
+#   - every cycle also runs the registered strategies (strategies.py) on the same candles, and the
+#     symbol is switched now and then so per-symbol caches get exercised
+#   - after a warm-up, RSS is sampled every SAMPLE_EVERY cycles (memwatch.py); the test fails when
+#     the fitted growth over the run is above RSS_RISE_MIN_BYTES
+#   - --trace (or SOAK_TRACE=1) also turns tracemalloc on: traced memory must stay flat too and the
+#     top growth sites are printed. Roughly 4x slower, so it's off by default.
+# Run:  python test_soak.py [cycles] [--trace]      (SOAK_CYCLES overrides the default)
+#       pytest skips it (several minutes) unless SOAK=1 or SOAK_CYCLES is set
+
+import os
+import sys
+import time
+from collections import deque
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.ticker import FuncFormatter
+
+import chart_lod
+import indicator_cache
+import io_core
+import memwatch
+import positions
+import strategy
+import strategies
+import gui
+
+CYCLES = int(os.environ.get("SOAK_CYCLES", 3000))
+WARMUP = 300
+SAMPLE_EVERY = 100
+CYCLES_PER_BAR = 100         # 5m candles refreshed every 3 s
+SWITCH_EVERY = 500           # symbol change (new series + indicator state)
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+RSS_RISE_MIN_BYTES = 4_000_000   # RSS also moves with allocator fragmentation, so a bit more slack
+TRACE = os.environ.get("SOAK_TRACE") == "1"
+INTERVAL_MS = 5 * 60_000
+
+
+class LocalMarket:
+    """ random-walk candles per symbol; the last one is still forming and moves every tick """
+
+    def __init__(self, bars=500, seed=7):
+        self.rng = np.random.default_rng(seed)
+        self.klines = {s: self._history(bars, 100.0 * (i + 1)) for i, s in enumerate(SYMBOLS)}
+        self.ticks = 0
+
+    def _history(self, n, price):
+        rows = []
+        t = 1_700_000_000_000
+        for _ in range(n):
+            rows.append(self._bar(t, price))
+            price = float(rows[-1][4])
+            t += INTERVAL_MS
+        return rows
+
+    def _bar(self, open_ms, price):
+        c = price * (1 + self.rng.normal(0, 0.002))
+        h, l = max(price, c) * 1.001, min(price, c) * 0.999
+        v = float(self.rng.random() * 10)
+        return [open_ms, str(price), str(h), str(l), str(c), str(v), open_ms + INTERVAL_MS - 1,
+                str(v * c), 10, "0", "0", "0"]
+
+    def tick(self):
+        self.ticks += 1
+        for kl in self.klines.values():
+            last = kl[-1]
+            if self.ticks % CYCLES_PER_BAR == 0:
+                kl.append(self._bar(last[0] + INTERVAL_MS, float(last[4])))
+                del kl[0]
+            else:
+                kl[-1] = self._bar(last[0], float(last[1]))
+
+    def get_klines(self, symbol, interval=None, limit=500):
+        return [list(k) for k in self.klines[symbol][-limit:]]
+
+
+class LocalAsyncClient:
+    def __init__(self, market):
+        self.market = market
+
+    async def get_klines(self, **params):
+        return self.market.get_klines(**params)
+
+
+class _Widget:
+    def __init__(self, *a, **kw):
+        self.options = {}
+
+    def config(self, **kw):
+        self.options.update(kw)
+
+    def pack(self, **kw):
+        pass
+
+    def destroy(self):
+        pass
+
+
+class _Var:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class _Master:
+    """ stands in for the Tk root: after() callbacks go to the same queue io_core dispatches to """
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def after(self, ms, fn):
+        self.queue.append(fn)
+
+
+def _bind_chart_modules():
+    gui.np, gui.pd, gui.plt, gui.matplotlib = np, pd, plt, matplotlib
+    gui.LineCollection, gui.PolyCollection, gui.FuncFormatter = LineCollection, PolyCollection, FuncFormatter
+    gui.chart_lod, gui.indicator_cache, gui.strategy, gui.strategies = chart_lod, indicator_cache, strategy, strategies
+
+    class AggCanvas(FigureCanvasAgg):
+        def __init__(self, fig, master=None):
+            super().__init__(fig)
+
+        def get_tk_widget(self):
+            return _Widget()
+    gui.FigureCanvasTkAgg = AggCanvas
+    gui.RECORD_CANDLES = False   # keep the soak off the candle store
+
+
+def make_app(market, queue):
+    """ CryptoAppUI without a Tk window: the chart, refresh and scan paths are the real ones """
+    _bind_chart_modules()
+    app = object.__new__(gui.CryptoAppUI)
+    app.master = _Master(queue)
+    app.symbol_var, app.interval_var = _Var(SYMBOLS[0]), _Var("5m")
+    app.price_lbl, app.entry_lbl, app.sl_lbl, app.tp_lbl = _Widget(), _Widget(), _Widget(), _Widget()
+    app.logs = deque(maxlen=50)
+    app.log = app.logs.append
+    app.replay = None
+    app.current_df = None
+    app.chart_placeholder = _Widget()
+    app.chart_frame = None
+
+    async def client_factory():
+        return LocalAsyncClient(market)
+    app.io = io_core.IOCore(client_factory, dispatch=queue.append).start()
+    # no brackets are placed here; the monitor just sees every refreshed price and strategy level
+    app.positions = positions.PositionMonitor(lambda: None, execute=lambda fn: None)
+    app._build_chart()
+    app.fig.set_size_inches(10, 4)
+    return app
+
+
+def cycle(app, market, queue, i):
+    market.tick()
+    if i % SWITCH_EVERY == 0:
+        app.symbol_var.set(SYMBOLS[(i // SWITCH_EVERY) % len(SYMBOLS)])
+    job = app.request_refresh(show_levels=i % 20 == 0)
+    deadline = time.monotonic() + 10
+    while not job.finished or queue:
+        if queue:
+            queue.popleft()()
+        elif time.monotonic() > deadline:
+            raise AssertionError(f"refresh {i} did not finish")
+        else:
+            time.sleep(0.0005)
+    symbol = app.symbol_var.get()
+    results = strategies.ENGINE.run(symbol, "5m", market.get_klines(symbol, limit=strategies.ENGINE.history()))
+    app._on_scan_results(symbol, "5m", results, interactive=False, replaying=False)
+    while queue:
+        queue.popleft()()
+
+
+def run(cycles=CYCLES, trace=TRACE, verbose=True):
+    """ -> (list of failure messages, MemWatch) """
+    market = LocalMarket()
+    queue = deque()
+    app = make_app(market, queue)
+    watch = memwatch.MemWatch(history=cycles // SAMPLE_EVERY + 2)
+    t0 = time.perf_counter()
+    try:
+        for i in range(WARMUP):
+            cycle(app, market, queue, i)
+        if trace:
+            watch.start()
+        for i in range(WARMUP, WARMUP + cycles):
+            cycle(app, market, queue, i)
+            if (i - WARMUP) % SAMPLE_EVERY == 0:
+                watch.sample()
+                if verbose:
+                    print(f"cycle {i - WARMUP:>6}: {watch.summary()}")
+        watch.sample()
+    finally:
+        app.io.stop()
+    if verbose:
+        print(f"{cycles} cycles in {time.perf_counter() - t0:.1f}s, io {app.io.stats()}")
+        for s in watch.growth[:10]:
+            print(f"  {memwatch.fmt_bytes(s.size_diff):>10} {s.count_diff:+8d} blocks  {s.where}")
+    failures = []
+    checks = [("rss", RSS_RISE_MIN_BYTES)] + ([("traced", memwatch.RISE_MIN_BYTES)] if trace else [])
+    for field, limit in checks:
+        values = watch.series(field)
+        growth = memwatch.slope(values) * (len(values) - 1) if values else 0.0
+        if verbose:
+            print(f"{field}: fitted growth {memwatch.fmt_bytes(growth)} (limit {memwatch.fmt_bytes(limit)})")
+        if watch.rising(field, min_growth=limit):
+            failures.append(f"{field} rose by {memwatch.fmt_bytes(growth)} over {cycles} cycles")
+    watch.stop()
+    return failures, watch
+
+
+def test_memory_does_not_keep_rising():
+    if os.environ.get("SOAK") != "1" and "SOAK_CYCLES" not in os.environ:
+        import pytest
+        pytest.skip("long soak run: set SOAK=1 (or SOAK_CYCLES=<n>) to include it")
+    failures, _ = run(verbose=False)
+    assert not failures, "; ".join(failures)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    failures, _ = run(int(args[0]) if args else CYCLES, trace=TRACE or "--trace" in sys.argv)
+    print("FAIL: " + "; ".join(failures) if failures else "OK: memory stays flat")
+    sys.exit(1 if failures else 0)